@@ -0,0 +1,101 @@
+"""Measure the memory held by imported chunks with tracemalloc.
+
+Compares the slotted Chunk with float32 vectors against the plain class that
+kept a __dict__ and a list of floats per chunk. The plain class is measured
+with an int token count like the current Chunk, and separately with the list
+of token ids it used to keep, so both savings are reported on their own.
+
+    python -m benchmarks.chunk_memory --chunks 100000
+"""
+import argparse
+import gc
+import tracemalloc
+
+import numpy as np
+
+from goldenverba.components.chunking.chunk import Chunk
+
+
+class PlainChunk:
+    """Chunk as it was stored before, with a __dict__ and a list vector."""
+
+    def __init__(self, text, doc_name, doc_type, doc_uuid, chunk_id):
+        self._text = text
+        self._doc_name = doc_name
+        self._doc_type = doc_type
+        self._doc_uuid = doc_uuid
+        self._chunk_id = chunk_id
+        self._tokens = 0
+        self._vector = None
+        self._score = 0
+
+
+def build_plain_token_lists(
+    texts: list[str], vectors: np.ndarray, tokens: int
+) -> list:
+    chunks = []
+    for i, text in enumerate(texts):
+        chunk = PlainChunk(text, "doc", "Documentation", "uuid", i)
+        chunk._tokens = list(range(tokens))
+        chunk._vector = vectors[i].tolist()
+        chunks.append(chunk)
+    return chunks
+
+
+def build_plain(texts: list[str], vectors: np.ndarray, tokens: int) -> list:
+    chunks = []
+    for i, text in enumerate(texts):
+        chunk = PlainChunk(text, "doc", "Documentation", "uuid", i)
+        chunk._tokens = tokens
+        chunk._vector = vectors[i].tolist()
+        chunks.append(chunk)
+    return chunks
+
+
+def build_slotted(texts: list[str], vectors: np.ndarray, tokens: int) -> list:
+    chunks = []
+    for i, text in enumerate(texts):
+        chunk = Chunk(text, "doc", "Documentation", "uuid", i)
+        chunk.set_tokens(tokens)
+        chunk.set_vector(vectors[i])
+        chunks.append(chunk)
+    return chunks
+
+
+def measure(build, texts: list[str], dimensions: int, tokens: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    # The batch matrix is allocated inside the measurement, it backs the slotted vectors
+    vectors = np.random.default_rng(0).random((len(texts), dimensions), np.float32)
+    chunks = build(texts, vectors, tokens)
+    del vectors
+    gc.collect()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del chunks
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    texts = [f"chunk {i} " + "text " * 80 for i in range(args.chunks)]
+
+    token_lists = measure(build_plain_token_lists, texts, args.dimensions, args.tokens)
+    plain = measure(build_plain, texts, args.dimensions, args.tokens)
+    slotted = measure(build_slotted, texts, args.dimensions, args.tokens)
+
+    print(f"{args.chunks} chunks, {args.dimensions} dimensions, {args.tokens} tokens")
+    print(f"plain chunks, token lists: {token_lists / 1024 / 1024:10.1f} MiB")
+    print(f"plain chunks:              {plain / 1024 / 1024:10.1f} MiB")
+    print(f"slotted chunks:            {slotted / 1024 / 1024:10.1f} MiB")
+    print(f"token counts as ints:      {token_lists / plain:10.1f}x")
+    print(f"slots and float32 vectors: {plain / slotted:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,7 +34,7 @@ class VerbaNativeAdapter():
             document_count = chunks_count = 0
         else:
             document_count = len(documents)
-            chunks_count = sum([len(document.chunks) for document in documents])
+            chunks_count = sum([document.chunk_count for document in documents])
         logger.info(f"{document_count} docs and {chunks_count} chunks have been inserted to Weaviate")
         return document_count, chunks_count
 
@@ -44,8 +44,9 @@ class VerbaNativeAdapter():
         else:
             documents = self._verba_manager.search_documents(doc_name, doc_type)
         logger.info(f"Starting to delete {len(documents)} documents of type '{doc_type}' and name '{doc_name}'")
-        for doc in documents:
-            self._verba_manager.delete_document_by_id(doc['_additional']['id'])
+        self._verba_manager.delete_documents_by_id(
+            [doc['_additional']['id'] for doc in documents]
+        )
         logger.info(f"Deletion documents of type '{doc_type}' and name '{doc_name}' finished")
 
     def retrieve_all_documents(self, doc_type: str = ''):
@@ -56,9 +57,23 @@ class VerbaNativeAdapter():
         else:
             return result
 
-    def update_document(self, old_doc_uuid, doc_type, new_doc_name, new_doc_content):
-        self._verba_manager.delete_document_by_id(old_doc_uuid)
-        self.upload_documents(doc_type, [new_doc_content], [new_doc_name])
+    def update_document(
+        self,
+        old_doc_uuid,
+        doc_type,
+        new_doc_name,
+        new_doc_content,
+        units: int | None = None,
+        overlap: int | None = None,
+    ):
+        documents = self._verba_manager.reader_manager.load(
+            [], [new_doc_content], [], [new_doc_name], doc_type
+        )
+        stats = self._verba_manager.update_document(
+            old_doc_uuid, documents[0], units, overlap
+        )
+        logger.info(f"Document '{new_doc_name}' updated: {stats}")
+        return stats
 
     @staticmethod
     def _init_verba_manager():
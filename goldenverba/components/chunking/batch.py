@@ -0,0 +1,104 @@
+
+import numpy as np
+
+from goldenverba.components.reader.document import Document
+
+
+class ChunkBatch:
+    """
+    Columnar batch of the chunks of many documents.
+    Chunk fields are stored as parallel arrays and vectors as one (N, d) float32 matrix,
+    the chunks of document i are the rows doc_offsets[i]:doc_offsets[i + 1].
+    """
+
+    __slots__ = (
+        "documents",
+        "texts",
+        "doc_indices",
+        "doc_offsets",
+        "chunk_ids",
+        "tokens",
+        "vectors",
+    )
+
+    def __init__(
+        self,
+        documents: list[Document],
+        texts: list[str],
+        doc_indices: np.ndarray,
+        chunk_ids: np.ndarray,
+        tokens: np.ndarray,
+        vectors: np.ndarray | None = None,
+    ):
+        self.documents = documents
+        self.texts = texts
+        self.doc_indices = doc_indices
+        self.doc_offsets = np.searchsorted(
+            doc_indices, np.arange(len(documents) + 1), side="left"
+        )
+        self.chunk_ids = chunk_ids
+        self.tokens = tokens
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @classmethod
+    def from_documents(cls, documents: list[Document]) -> "ChunkBatch":
+        """Collect the chunks of chunked documents into columns
+        @parameter: documents : list[Document] - Chunked Verba documents
+        @returns ChunkBatch - Batch with vectors if every chunk already has one.
+        """
+        chunks = [chunk for document in documents for chunk in document.chunks]
+        doc_indices = np.repeat(
+            np.arange(len(documents), dtype=np.int64),
+            [len(document.chunks) for document in documents],
+        )
+
+        vectors = None
+        if len(chunks) > 0 and all(chunk.vector is not None for chunk in chunks):
+            vectors = np.stack([chunk.vector for chunk in chunks]).astype(
+                np.float32, copy=False
+            )
+
+        return cls(
+            documents=documents,
+            texts=[chunk.text for chunk in chunks],
+            doc_indices=doc_indices,
+            chunk_ids=np.fromiter(
+                (int(chunk.chunk_id) for chunk in chunks), np.int64, len(chunks)
+            ),
+            tokens=np.fromiter((chunk.tokens for chunk in chunks), np.int64, len(chunks)),
+            vectors=vectors,
+        )
+
+    def set_vectors(self, vectors) -> None:
+        """
+        @parameter: vectors : list[list[float]] | np.ndarray - One vector per chunk, in batch order.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] != len(self):
+            raise ValueError(
+                f"Expected {len(self)} vectors for the chunk batch, got {vectors.shape[0]}"
+            )
+        self.vectors = vectors
+
+    def document_rows(self, doc_index: int) -> slice:
+        """
+        @parameter: doc_index : int - Index of the document in the batch
+        @returns slice - Rows of the document's chunks.
+        """
+        return slice(
+            int(self.doc_offsets[doc_index]), int(self.doc_offsets[doc_index + 1])
+        )
+
+    def to_documents(self) -> list[Document]:
+        """Write token counts and vectors back to the Chunk objects, vectors become views of the batch matrix
+        @returns list[Document] - Documents of the batch.
+        """
+        chunks = [chunk for document in self.documents for chunk in document.chunks]
+        for row, chunk in enumerate(chunks):
+            chunk.set_tokens(int(self.tokens[row]))
+            if self.vectors is not None:
+                chunk.set_vector(self.vectors[row])
+        return self.documents
@@ -1,4 +1,30 @@
+import hashlib
+
+import numpy as np
+
+
+def content_hash(text: str) -> str:
+    """Hash the content of a document or chunk to detect changes between imports
+    @parameter: text : str - Content
+    @returns str - SHA-256 hex digest of the content.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class Chunk:
+    # Slots instead of a per-instance __dict__ keep large imports compact
+    __slots__ = (
+        "_text",
+        "_doc_name",
+        "_doc_type",
+        "_doc_uuid",
+        "_chunk_id",
+        "_tokens",
+        "_vector",
+        "_score",
+        "_chunk_hash",
+    )
+
     def __init__(
         self,
         text: str = "",
@@ -15,11 +41,17 @@ class Chunk:
         self._tokens = 0
         self._vector = None
         self._score = 0
+        self._chunk_hash = None
 
     @property
     def text(self):
         return self._text
 
+    @text.setter
+    def text(self, text: str):
+        self._text = text
+        self._chunk_hash = None
+
     @property
     def text_no_overlap(self):
         return self._text_no_overlap
@@ -40,6 +72,13 @@ class Chunk:
     def chunk_id(self):
         return self._chunk_id
 
+    @property
+    def chunk_hash(self):
+        # Hashed once, chunks are diffed and written by hash on every import
+        if self._chunk_hash is None:
+            self._chunk_hash = content_hash(self._text)
+        return self._chunk_hash
+
     @property
     def tokens(self):
         return self._tokens
@@ -55,11 +94,12 @@ class Chunk:
     def set_uuid(self, uuid):
         self._doc_uuid = uuid
 
-    def set_tokens(self, token):
-        self._tokens = token
+    def set_tokens(self, token_count: int):
+        self._tokens = token_count
 
     def set_vector(self, vector):
-        self._vector = vector
+        # Stored as float32, rows of a float32 batch matrix are kept as views without a copy
+        self._vector = None if vector is None else np.asarray(vector, dtype=np.float32)
 
     def set_score(self, score):
         self._score = score
@@ -73,7 +113,7 @@ class Chunk:
             "doc_uuid": self.doc_uuid,
             "chunk_id": self.chunk_id,
             "tokens": self.tokens,
-            "vector": self.vector,
+            "vector": self.vector.tolist() if self.vector is not None else None,
             "score": self.score,
         }
 
@@ -87,7 +127,9 @@ class Chunk:
             doc_uuid=data.get("doc_uuid", ""),
             chunk_id=data.get("chunk_id", ""),
         )
-        chunk.set_tokens(data.get("tokens", 0))
+        tokens = data.get("tokens", 0)
+        # Older exports stored the token list instead of the count
+        chunk.set_tokens(len(tokens) if isinstance(tokens, list) else tokens)
         chunk.set_vector(data.get("vector", None))
         chunk.set_score(data.get("score", 0))
         return chunk
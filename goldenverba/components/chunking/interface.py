@@ -15,13 +15,34 @@ class Chunker(VerbaComponent):
         self.default_overlap = 50
 
     def chunk(
-        self, documents: list[Document], units: int, overlap: int
+        self, documents: list[Document], units: int, overlap: int, workers: int = 1
     ) -> list[Document]:
         """Chunk verba documents into chunks based on units and overlap.
 
         @parameter: documents : list[Document] - List of Verba documents
         @parameter: units : int - How many units per chunk (words, sentences, etc.)
         @parameter: overlap : int - How much overlap between the chunks
+        @parameter: workers : int - Number of processes to chunk with
         @returns list[str] - List of documents that contain the chunks.
         """
         raise NotImplementedError("chunk method must be implemented by a subclass.")
+
+    def get_chunking(self, units: int, overlap: int) -> str:
+        """Describe the chunking parameters, a stored document is rechunked when they change
+        @parameter: units : int - How many units per chunk (words, sentences, etc.)
+        @parameter: overlap : int - How much overlap between the chunks
+        @returns str - Chunker class, units and overlap.
+        """
+        return f"{type(self).__name__}:{units}:{overlap}"
+
+    @staticmethod
+    def parse_chunking(chunking: str) -> tuple[int, int] | None:
+        """Read units and overlap back from a chunking description of get_chunking
+        @parameter: chunking : str - Stored chunking description
+        @returns tuple[int, int] | None - Units and overlap, None if the description can't be read.
+        """
+        try:
+            _, units, overlap = chunking.split(":")
+            return int(units), int(overlap)
+        except (AttributeError, ValueError):
+            return None
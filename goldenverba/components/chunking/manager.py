@@ -1,6 +1,9 @@
+import os
+
 import tiktoken
 from wasabi import msg
 
+from goldenverba.components.chunking.batch import ChunkBatch
 from goldenverba.components.chunking.interface import Chunker
 from goldenverba.components.chunking.sentencechunker import SentenceChunker
 from goldenverba.components.chunking.tiktokenchunker import TokenChunker
@@ -16,6 +19,10 @@ class ChunkerManager:
             "SentenceChunker": SentenceChunker(),
         }
         self.selected_chunker: Chunker = self.chunker["TokenChunker"]
+        # Counts the tokens of chunks whose chunker doesn't use tiktoken, loaded on first use
+        self.encoding = None
+        # Number of processes to chunk with, 0 uses all cores
+        self.workers = int(os.getenv("VERBA_CHUNKER_WORKERS", "1")) or os.cpu_count()
 
     def chunk(
         self, documents: list[Document], units: int, overlap: int
@@ -27,12 +34,27 @@ class ChunkerManager:
         @parameter: overlap : int - How much overlap between the chunks
         @returns list[str] - List of documents that contain the chunks.
         """
-        chunked_docs = self.selected_chunker.chunk(documents, units, overlap)
+        chunked_docs = self.selected_chunker.chunk(
+            documents, units, overlap, workers=self.workers
+        )
+        for document in chunked_docs:
+            document.chunking = self.selected_chunker.get_chunking(units, overlap)
         msg.good("Chunking completed")
         if self.check_chunks(chunked_docs):
             return chunked_docs
         return []
 
+    def chunk_batch(
+        self, documents: list[Document], units: int, overlap: int
+    ) -> ChunkBatch:
+        """Chunk verba documents and collect their chunks into a columnar batch
+        @parameter: documents : list[Document] - List of Verba documents
+        @parameter: units : int - How many units per chunk (words, sentences, etc.)
+        @parameter: overlap : int - How much overlap between the chunks
+        @returns ChunkBatch - Chunks of all documents.
+        """
+        return ChunkBatch.from_documents(self.chunk(documents, units, overlap))
+
     def set_chunker(self, chunker: str) -> bool:
         if chunker in self.chunker:
             self.selected_chunker = self.chunker[chunker]
@@ -45,18 +67,29 @@ class ChunkerManager:
         return self.chunker
 
     def check_chunks(self, documents: list[Document]) -> bool:
-        """Checks token count of chunks which are hardcapped to 1000 tokens per chunk
+        """Checks token count of chunks which are hardcapped to 1000 tokens per chunk.
+        Only chunks without a token count from their chunker are encoded.
         @parameter: documents : list[Document] - List of Verba documents
         @returns bool - Whether the chunks are within the token range.
         """
-        encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        uncounted = [
+            chunk
+            for document in documents
+            for chunk in document.chunks
+            if chunk.tokens == 0 and chunk.text != ""
+        ]
+        if len(uncounted) > 0:
+            if self.encoding is None:
+                self.encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+            encoded_chunks = self.encoding.encode_batch(
+                [chunk.text for chunk in uncounted], disallowed_special=()
+            )
+            for chunk, tokens in zip(uncounted, encoded_chunks):
+                chunk.set_tokens(len(tokens))
 
         for document in documents:
-            chunks = document.chunks
-            for chunk in chunks:
-                tokens = encoding.encode(chunk.text, disallowed_special=())
-                chunk.set_tokens(tokens)
-                if len(tokens) > 1000:
+            for chunk in document.chunks:
+                if chunk.tokens > 1000:
                     raise Exception(
                         "Chunk detected with more than 1000 tokens which exceeds the maximum size. Please reduce size of your chunk."
                     )
@@ -24,6 +24,8 @@ class SentenceChunker(Chunker):
         self.default_units = 3
         self.default_overlap = 2
         self.description = "Chunk documents by sentences. You can specify how many sentences should overlap between chunks to improve retrieval."
+        # Number of documents per batch that nlp.pipe sends to a worker process
+        self.batch_size = 32
         try:
             self.nlp = spacy.blank("en")
             self.nlp.add_pipe("sentencizer")
@@ -31,22 +33,28 @@ class SentenceChunker(Chunker):
             self.nlp = None
 
     def chunk(
-        self, documents: list[Document], units: int, overlap: int
+        self, documents: list[Document], units: int, overlap: int, workers: int = 1
     ) -> list[Document]:
         """Chunk verba documents into chunks based on units and overlap
         @parameter: documents : list[Document] - List of Verba documents
         @parameter: units : int - How many units per chunk (words, sentences, etc.)
         @parameter: overlap : int - How much overlap between the chunks
+        @parameter: workers : int - Number of processes spaCy parses the documents with
         @returns list[str] - List of documents that contain the chunks.
         """
-        for document in tqdm(
-            documents, total=len(documents), desc="Chunking documents"
-        ):
-            # Skip if document already contains chunks
-            if len(document.chunks) > 0:
-                continue
+        # Skip if document already contains chunks
+        pending = [document for document in documents if len(document.chunks) == 0]
 
-            doc = list(self.nlp(document.text).sents)
+        parsed_docs = self.nlp.pipe(
+            (document.text for document in pending),
+            n_process=workers,
+            batch_size=self.batch_size,
+        )
+
+        for document, parsed_doc in tqdm(
+            zip(pending, parsed_docs), total=len(pending), desc="Chunking documents"
+        ):
+            doc = list(parsed_doc.sents)
 
             if units > len(doc) or units < 1:
                 msg.warn(
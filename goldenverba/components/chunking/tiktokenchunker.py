@@ -1,4 +1,8 @@
 import contextlib
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, repeat
 
 from tqdm import tqdm
 from wasabi import msg
@@ -10,6 +14,26 @@ from goldenverba.components.chunking.chunk import Chunk
 from goldenverba.components.chunking.interface import Chunker
 from goldenverba.components.reader.document import Document
 
+# TokenChunker of a chunking worker process, created on first use
+_worker_chunker = None
+
+
+def _split_text(
+    text: str, units: int, overlap: int, slice_by_offsets: bool
+) -> list[tuple[str, int]]:
+    """Split a text into token windows inside a worker process
+    @parameter: text : str - Text to split
+    @parameter: units : int - How many tokens per window
+    @parameter: overlap : int - How many tokens overlap between the windows
+    @parameter: slice_by_offsets : bool - Whether to slice by byte offsets instead of decoding
+    @returns list[tuple[str, int]] - Text and token count of every window in order.
+    """
+    global _worker_chunker
+    if _worker_chunker is None:
+        _worker_chunker = TokenChunker()
+    _worker_chunker.slice_by_offsets = slice_by_offsets
+    return list(_worker_chunker.split_text(text, units, overlap))
+
 
 class TokenChunker(Chunker):
     """
@@ -24,62 +48,158 @@ class TokenChunker(Chunker):
         self.default_overlap = 50
         self.description = "Chunk documents by tokens powered by tiktoken. You can specify how many tokens should overlap between chunks to improve retrieval."
         self.encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        # Build chunk texts by slicing the document at token byte offsets instead of decoding every window
+        self.slice_by_offsets = (
+            os.getenv("VERBA_TOKEN_CHUNKER_OFFSETS", "True") == "True"
+        )
+        self._token_byte_lengths: list[int] = None
+
+    def get_token_byte_lengths(self) -> list[int]:
+        """Decode every token of the vocabulary once, the table is built on first use
+        @returns list[int] - Length in bytes per token id.
+        """
+        if self._token_byte_lengths is None:
+            token_byte_lengths = []
+            for token in range(self.encoding.n_vocab):
+                try:
+                    token_byte_lengths.append(
+                        len(self.encoding.decode_single_token_bytes(token))
+                    )
+                except KeyError:
+                    # Unused token ids between the regular and special tokens
+                    token_byte_lengths.append(0)
+            self._token_byte_lengths = token_byte_lengths
+        return self._token_byte_lengths
 
     def chunk(
-        self, documents: list[Document], units: int, overlap: int
+        self, documents: list[Document], units: int, overlap: int, workers: int = 1
     ) -> list[Document]:
         """Chunk verba documents into chunks based on units and overlap
         @parameter: documents : list[Document] - List of Verba documents
         @parameter: units : int - How many units per chunk (words, sentences, etc.)
         @parameter: overlap : int - How much overlap between the chunks
+        @parameter: workers : int - Number of processes to split the documents with
         @returns list[str] - List of documents that contain the chunks.
         """
-        for document in tqdm(
-            documents, total=len(documents), desc="Chunking documents"
+        # Skip if document already contains chunks
+        pending = [document for document in documents if len(document.chunks) == 0]
+
+        if workers > 1 and len(pending) > 1 and overlap < units:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_texts = executor.map(
+                    _split_text,
+                    [document.text for document in pending],
+                    repeat(units),
+                    repeat(overlap),
+                    repeat(self.slice_by_offsets),
+                    chunksize=max(1, len(pending) // (workers * 4)),
+                )
+                # Results arrive in document order, chunk ids are assigned here
+                for document, windows in tqdm(
+                    zip(pending, chunk_texts),
+                    total=len(pending),
+                    desc="Chunking documents",
+                ):
+                    document.chunks.extend(
+                        self.make_chunk(document, text, chunk_id, token_count)
+                        for chunk_id, (text, token_count) in enumerate(windows)
+                    )
+            return documents
+
+        for _document in self.chunk_stream(
+            tqdm(documents, total=len(documents), desc="Chunking documents"),
+            units,
+            overlap,
         ):
-            # Skip if document already contains chunks
-            if len(document.chunks) > 0:
-                continue
-
-            encoded_tokens = self.encoding.encode(document.text, disallowed_special=())
+            pass
 
-            if units > len(encoded_tokens) or units < 1:
-                doc_chunk = Chunk(
-                    text=document.text,
-                    doc_name=document.name,
-                    doc_type=document.type,
-                    chunk_id=0,
-                )
+        return documents
 
-            if overlap >= units:
-                msg.warn(
-                    f"Overlap value is greater than unit (Units {units}/ Overlap {overlap})"
-                )
-                continue
-
-            i = 0
-            split_id_counter = 0
-            while i < len(encoded_tokens):
-                # Overlap
-                start_i = i
-                end_i = min(i + units, len(encoded_tokens))
-
-                chunk_tokens = encoded_tokens[start_i:end_i]
-                chunk_text = self.encoding.decode(chunk_tokens)
-
-                doc_chunk = Chunk(
-                    text=chunk_text,
-                    doc_name=document.name,
-                    doc_type=document.type,
-                    chunk_id=split_id_counter,
+    def chunk_stream(
+        self, documents: Iterable[Document], units: int, overlap: int
+    ) -> Iterator[Document]:
+        """Lazily chunk a stream of verba documents, each document is yielded once it is chunked
+        @parameter: documents : Iterable[Document] - Verba documents, e.g. from a generator
+        @parameter: units : int - How many units per chunk (words, sentences, etc.)
+        @parameter: overlap : int - How much overlap between the chunks
+        @returns Iterator[Document] - Documents that contain the chunks.
+        """
+        for document in documents:
+            # Skip if document already contains chunks
+            if len(document.chunks) == 0:
+                document.chunks.extend(self.iter_chunks(document, units, overlap))
+            yield document
+
+    def iter_chunks(
+        self, document: Document, units: int, overlap: int
+    ) -> Iterator[Chunk]:
+        """Lazily split a single document into overlapping token chunks
+        @parameter: document : Document - Verba document
+        @parameter: units : int - How many tokens per chunk
+        @parameter: overlap : int - How many tokens overlap between the chunks
+        @returns Iterator[Chunk] - Chunks of the document in order.
+        """
+        if overlap >= units:
+            msg.warn(
+                f"Overlap value is greater than unit (Units {units}/ Overlap {overlap})"
+            )
+            return
+
+        for chunk_id, (text, token_count) in enumerate(
+            self.split_text(document.text, units, overlap)
+        ):
+            yield self.make_chunk(document, text, chunk_id, token_count)
+
+    def make_chunk(
+        self, document: Document, text: str, chunk_id: int, token_count: int
+    ) -> Chunk:
+        chunk = Chunk(
+            text=text,
+            doc_name=document.name,
+            doc_type=document.type,
+            chunk_id=chunk_id,
+        )
+        # The window size is the token count, check_chunks doesn't need to encode it again
+        chunk.set_tokens(token_count)
+        return chunk
+
+    def split_text(
+        self, text: str, units: int, overlap: int
+    ) -> Iterator[tuple[str, int]]:
+        """Lazily split a text into overlapping token windows
+        @parameter: text : str - Text to split
+        @parameter: units : int - How many tokens per window
+        @parameter: overlap : int - How many tokens overlap between the windows, must be smaller than units
+        @returns Iterator[tuple[str, int]] - Text and token count of every window in order.
+        """
+        encoded_tokens = self.encoding.encode(text, disallowed_special=())
+
+        if self.slice_by_offsets:
+            # Look up the byte length of every token once and slice the original text at the byte offsets
+            text_bytes = text.encode("utf-8")
+            token_lengths = self.get_token_byte_lengths()
+            offsets = list(
+                accumulate(map(token_lengths.__getitem__, encoded_tokens), initial=0)
+            )
+
+        i = 0
+        while i < len(encoded_tokens):
+            # Overlap
+            start_i = i
+            end_i = min(i + units, len(encoded_tokens))
+
+            if self.slice_by_offsets:
+                # Same replacement of split multi-byte characters as encoding.decode
+                chunk_text = text_bytes[offsets[start_i] : offsets[end_i]].decode(
+                    "utf-8", errors="replace"
                 )
-                document.chunks.append(doc_chunk)
-                split_id_counter += 1
+            else:
+                chunk_text = self.encoding.decode(encoded_tokens[start_i:end_i])
 
-                # Exit loop if this was the last possible chunk
-                if end_i == len(encoded_tokens):
-                    break
+            yield chunk_text, end_i - start_i
 
-                i += units - overlap  # Step forward, considering overlap
+            # Exit loop if this was the last possible chunk
+            if end_i == len(encoded_tokens):
+                break
 
-        return documents
+            i += units - overlap  # Step forward, considering overlap
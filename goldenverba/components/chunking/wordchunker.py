@@ -24,29 +24,35 @@ class WordChunker(Chunker):
         self.default_units = 100
         self.default_overlap = 50
         self.description = "Chunk documents by words. You can specify how many words should overlap between chunks to improve retrieval."
+        # Number of documents per batch that nlp.pipe sends to a worker process
+        self.batch_size = 32
         try:
             self.nlp = spacy.blank("en")
         except:
             self.nlp = None
 
     def chunk(
-        self, documents: list[Document], units: int, overlap: int
+        self, documents: list[Document], units: int, overlap: int, workers: int = 1
     ) -> list[Document]:
         """Chunk verba documents into chunks based on units and overlap
         @parameter: documents : list[Document] - List of Verba documents
         @parameter: units : int - How many units per chunk (words, sentences, etc.)
         @parameter: overlap : int - How much overlap between the chunks
+        @parameter: workers : int - Number of processes spaCy parses the documents with
         @returns list[str] - List of documents that contain the chunks.
         """
-        for document in tqdm(
-            documents, total=len(documents), desc="Chunking documents"
-        ):
-            # Skip if document already contains chunks
-            if len(document.chunks) > 0:
-                continue
+        # Skip if document already contains chunks
+        pending = [document for document in documents if len(document.chunks) == 0]
 
-            doc = self.nlp(document.text)
+        parsed_docs = self.nlp.pipe(
+            (document.text for document in pending),
+            n_process=workers,
+            batch_size=self.batch_size,
+        )
 
+        for document, doc in tqdm(
+            zip(pending, parsed_docs), total=len(pending), desc="Chunking documents"
+        ):
             if units > len(doc) or units < 1:
                 doc_chunk = Chunk(
                     text=doc.text,
@@ -1,11 +1,59 @@
+import os
+import threading
+
 from tqdm import tqdm
 from wasabi import msg
 from weaviate import Client
 
+from goldenverba.components.chunking.batch import ChunkBatch
+from goldenverba.components.embedding.cache import EmbeddingCache
 from goldenverba.components.embedding.interface import Embedder
 from goldenverba.components.reader.document import Document
 
 
+def split_token_windows(
+    input_ids: list[int],
+    offsets: list[tuple[int, int]],
+    max_tokens: int,
+    stride: int = 0,
+) -> list[list[int]]:
+    """Split the token ids of a single tokenizer pass into model-sized windows
+    @parameter: input_ids : list[int] - Token ids without special tokens
+    @parameter: offsets : list[tuple[int, int]] - Character offsets of every token
+    @parameter: max_tokens : int - Maximum number of token ids per window
+    @parameter: stride : int - Number of token ids shared by consecutive windows
+    @returns list[list[int]] - Windows of token ids, cut on word boundaries where possible.
+    """
+    if stride < 0 or stride >= max_tokens:
+        raise ValueError(
+            f"Window stride must be between 0 and {max_tokens - 1} (stride {stride})"
+        )
+
+    if len(input_ids) <= max_tokens:
+        return [list(input_ids)]
+
+    windows = []
+    start = 0
+    while True:
+        end = min(start + max_tokens, len(input_ids))
+        if end < len(input_ids):
+            # Tokens without a gap in their offsets belong to the same word, don't cut between them
+            cut = end
+            while cut > start + stride + 1 and offsets[cut][0] == offsets[cut - 1][1]:
+                cut -= 1
+            if offsets[cut][0] != offsets[cut - 1][1]:
+                end = cut
+
+        windows.append(list(input_ids[start:end]))
+
+        if end == len(input_ids):
+            break
+
+        start = end - stride
+
+    return windows
+
+
 class MiniLMEmbedder(Embedder):
     """
     MiniLMEmbedder for Verba.
@@ -17,8 +65,14 @@ class MiniLMEmbedder(Embedder):
         self.requires_library = ["torch", "transformers"]
         self.description = "Embeds and retrieves objects using SentenceTransformer's all-MiniLM-L6-v2 model"
         self.vectorizer = "MiniLM"
+        self.model_id = "sentence-transformers/all-MiniLM-L6-v2"
         self.model = None
         self.tokenizer = None
+        # Number of token windows per forward pass when embedding whole documents
+        self.batch_size = int(os.getenv("MINILM_BATCH_SIZE", "32"))
+        # Number of tokens shared between windows of texts longer than the model's max length
+        self.window_stride = int(os.getenv("MINILM_WINDOW_STRIDE", "0"))
+        self.tokenizer_lock = threading.Lock()
         try:
             import torch
             from transformers import AutoModel, AutoTokenizer
@@ -34,13 +88,21 @@ class MiniLMEmbedder(Embedder):
             self.device = get_device()
 
             self.model = AutoModel.from_pretrained(
-                "sentence-transformers/all-MiniLM-L6-v2", device_map=self.device
+                self.model_id, device_map=self.device
             )
             self.tokenizer = AutoTokenizer.from_pretrained(
-                "sentence-transformers/all-MiniLM-L6-v2", device_map=self.device
+                self.model_id, device_map=self.device
             )
             self.model = self.model.to(self.device)
 
+            # Reuse embeddings of unchanged chunks across imports, only if a cache file is configured
+            cache_path = os.getenv("VERBA_EMBEDDING_CACHE_PATH", "")
+            if cache_path != "":
+                self.embedding_cache = EmbeddingCache(
+                    cache_path,
+                    float(os.getenv("VERBA_EMBEDDING_CACHE_MAX_MB", "1024")),
+                )
+
         except Exception as e:
             msg.warn(str(e))
             pass
@@ -56,68 +118,139 @@ class MiniLMEmbedder(Embedder):
         @parameter: batch_size : int - Batch Size of Input
         @returns bool - Bool whether the embedding what successful.
         """
-        for document in tqdm(
-            documents, total=len(documents), desc="Vectorizing document chunks"
-        ):
-            for chunk in document.chunks:
-                chunk.set_vector(self.vectorize_chunk(chunk.text))
+        self.vectorize_documents(documents)
 
         return self.import_data(documents, client)
 
-    def vectorize_chunk(self, chunk) -> list[float]:
-        try:
-            import torch
+    def vectorize_documents(self, documents: list[Document]) -> None:
+        """Vectorize the chunks of all documents in length-sorted, padded batches
+        @parameter: documents : list[Document] - List of Verba documents
+        @returns None - The vectors are set on the Chunk objects.
+        """
+        chunk_batch = ChunkBatch.from_documents(documents)
+        if len(chunk_batch) == 0:
+            return
 
-            text = chunk
-            tokens = self.tokenizer.tokenize(text)
+        self.vectorize_chunk_batch(chunk_batch)
+        # Every chunk holds a view of its row of the batch matrix
+        chunk_batch.to_documents()
 
-            max_length = (
-                self.tokenizer.model_max_length
-            )  # Get the max sequence length for the model
-            batches = []
-            batch = []
-            token_count = 0
+    def vectorize_chunk_batch(self, chunk_batch: ChunkBatch) -> ChunkBatch:
+        """Vectorize all texts of a chunk batch into its vector matrix, cached embeddings are reused
+        @parameter: chunk_batch : ChunkBatch - Columnar chunks
+        @returns ChunkBatch - The same batch with its vectors set.
+        """
+        texts = chunk_batch.texts
 
-            for token in tokens:
-                token_length = len(
-                    self.tokenizer.encode(token, add_special_tokens=False)
-                )
-                if token_count + token_length <= max_length:
-                    batch.append(token)
-                    token_count += token_length
-                else:
-                    batches.append(" ".join(batch))
-                    batch = [token]
-                    token_count = token_length
+        if self.embedding_cache is None:
+            vectors = self.vectorize_batch(texts, progress=True)
+        else:
+            vectors = self.embedding_cache.get_many(self.model_id, texts)
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            msg.info(
+                f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses"
+            )
+            missing_vectors = self.vectorize_batch(
+                [texts[i] for i in missing], progress=True
+            )
+            self.embedding_cache.set_many(
+                self.model_id, [texts[i] for i in missing], missing_vectors
+            )
+            for i, vector in zip(missing, missing_vectors):
+                vectors[i] = vector
 
-            # Don't forget to add the last batch
-            if batch:
-                batches.append(" ".join(batch))
+        if len(texts) > 0:
+            chunk_batch.set_vectors(vectors)
+        return chunk_batch
 
-            embeddings = []
+    def vectorize_batch(
+        self, texts: list[str], progress: bool = False
+    ) -> list[list[float]]:
+        """Vectorize many texts with one tokenizer call and one forward pass per batch.
+        Texts longer than the model's max length are split into windows whose embeddings are averaged.
+        @parameter: texts : list[str] - Texts to vectorize
+        @parameter: progress : bool - Whether to show a progress bar
+        @returns list[list[float]] - One vector per text, in input order.
+        """
+        import torch
+
+        if len(texts) == 0:
+            return []
+
+        # Fast tokenizers fail with "Already borrowed" when called from several threads at once
+        with self.tokenizer_lock:
+            encodings = self.tokenizer(
+                texts,
+                add_special_tokens=False,
+                truncation=False,
+                return_offsets_mapping=True,
+            )
 
-            for batch in batches:
-                inputs = self.tokenizer(
-                    batch, return_tensors="pt", padding=True, truncation=True
+        # Reserve room for the special tokens added to every window
+        max_tokens = self.tokenizer.model_max_length - 2
+        windows = []
+        for text_index, (ids, offsets) in enumerate(
+            zip(encodings["input_ids"], encodings["offset_mapping"])
+        ):
+            for window in split_token_windows(
+                ids, offsets, max_tokens, self.window_stride
+            ):
+                windows.append(
+                    (
+                        text_index,
+                        [self.tokenizer.cls_token_id]
+                        + window
+                        + [self.tokenizer.sep_token_id],
+                    )
                 )
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                # Taking the mean of the hidden states to obtain an embedding for the batch
-                embedding = outputs.last_hidden_state.mean(dim=1)
-                embeddings.append(embedding)
 
-            # Concatenate the embeddings to make averaging easier
-            all_embeddings = torch.cat(embeddings)
+        # Sorting by length keeps padding within a batch to a minimum
+        order = sorted(range(len(windows)), key=lambda i: len(windows[i][1]))
+        pad_token_id = self.tokenizer.pad_token_id or 0
+        window_embeddings = [[] for _ in texts]
 
-            averaged_embedding = all_embeddings.mean(dim=0)
+        for batch_start in tqdm(
+            range(0, len(order), self.batch_size),
+            total=(len(order) + self.batch_size - 1) // self.batch_size,
+            desc="Vectorizing chunk batches",
+            disable=not progress,
+        ):
+            batch = [windows[i] for i in order[batch_start : batch_start + self.batch_size]]
+            max_length = max(len(ids) for _, ids in batch)
 
-            averaged_embedding_list = averaged_embedding.tolist()
+            batch_input_ids = torch.full(
+                (len(batch), max_length), pad_token_id, dtype=torch.long
+            )
+            attention_mask = torch.zeros((len(batch), max_length), dtype=torch.long)
+            for row, (_, ids) in enumerate(batch):
+                batch_input_ids[row, : len(ids)] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, : len(ids)] = 1
+
+            batch_input_ids = batch_input_ids.to(self.device)
+            attention_mask = attention_mask.to(self.device)
+            with torch.no_grad():
+                outputs = self.model(
+                    input_ids=batch_input_ids, attention_mask=attention_mask
+                )
 
-            return averaged_embedding_list
+            # Mean over real tokens only, padding must not dilute the embedding
+            mask = attention_mask.unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            pooled = summed / mask.sum(dim=1).clamp(min=1)
 
-        except Exception:
-            raise
+            for row, (text_index, _) in enumerate(batch):
+                window_embeddings[text_index].append(pooled[row])
+
+        return [
+            torch.stack(embeddings).mean(dim=0).tolist()
+            for embeddings in window_embeddings
+        ]
+
+    def vectorize_chunk(self, chunk) -> list[float]:
+        return self.vectorize_batch([chunk])[0]
 
     def vectorize_query(self, query: str) -> list[float]:
         return self.vectorize_chunk(query)
+
+    def vectorize_queries(self, queries: list[str]) -> list[list[float]]:
+        return self.vectorize_batch(queries)
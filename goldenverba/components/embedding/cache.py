@@ -0,0 +1,565 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+from wasabi import msg
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed cache for chunk embeddings, stored in a SQLite file.
+    Entries are keyed by (model id, normalized text hash) and evicted least recently used first once the cache exceeds its size limit.
+    """
+
+    def __init__(self, path: str, max_size_mb: float = 1024):
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+            )
+            self._size_bytes = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()[0]
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        """Create the cache key of a text, texts that only differ in whitespace share a key
+        @parameter: model_id : str - Identifier of the model that produced the embedding
+        @parameter: text : str - Text that was embedded
+        @returns str - Hex digest of the model id and normalized text.
+        """
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{model_id}\0{normalized}".encode()).hexdigest()
+
+    def get_many(self, model_id: str, texts: list[str]) -> list[list[float] | None]:
+        """Look up the embeddings of many texts
+        @parameter: model_id : str - Identifier of the model
+        @parameter: texts : list[str] - Texts to look up
+        @returns list[list[float] | None] - Cached vector per text, None on a miss.
+        """
+        keys = [self.make_key(model_id, text) for text in texts]
+        found = {}
+
+        with self._lock, self._connection:
+            # The keys are bound as one JSON array, no matter how many there are
+            rows = self._connection.execute(
+                "SELECT key, vector FROM embeddings WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(keys),),
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+
+            self._connection.execute(
+                "UPDATE embeddings SET last_access = ? WHERE key IN (SELECT value FROM json_each(?))",
+                (time.time(), json.dumps(keys)),
+            )
+
+            vectors = [found.get(key) for key in keys]
+            hits = sum(1 for vector in vectors if vector is not None)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+
+        return vectors
+
+    def set_many(
+        self, model_id: str, texts: list[str], vectors: list[list[float]]
+    ) -> None:
+        """Store the embeddings of many texts and evict old entries if the cache is too large
+        @parameter: model_id : str - Identifier of the model
+        @parameter: texts : list[str] - Texts that were embedded
+        @parameter: vectors : list[list[float]] - Embedding per text.
+        """
+        now = time.time()
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows[self.make_key(model_id, text)] = (blob, len(blob), now)
+
+        with self._lock, self._connection:
+            replaced = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(rows)),),
+            ).fetchone()[0]
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                [(key, *row) for key, row in rows.items()],
+            )
+            self._size_bytes += sum(row[1] for row in rows.values()) - replaced
+
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its size limit, expects the lock to be held."""
+        evicted = 0
+        while self._size_bytes > self.max_size_bytes:
+            rows = self._connection.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                break
+
+            victims = []
+            for key, size in rows:
+                if self._size_bytes <= self.max_size_bytes:
+                    break
+                victims.append((key,))
+                self._size_bytes -= size
+
+            self._connection.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            evicted += len(victims)
+
+        if evicted > 0:
+            msg.info(f"Evicted {evicted} embeddings from the embedding cache")
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Hit and miss counters, number of entries and size of the cache.
+        """
+        with self._lock:
+            entries = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "entries": entries,
+                "size_bytes": self._size_bytes,
+                "max_size_bytes": self.max_size_bytes,
+            }
+
+    def clear(self) -> None:
+        """Remove all cached embeddings."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM embeddings")
+            self._size_bytes = 0
+
+
+class QueryVectorCache:
+    """
+    Bounded, thread-safe in-process LRU cache for query vectors with a time to live.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+
+    def get(self, query: str) -> list[float] | None:
+        """
+        @parameter: query : str - Query text
+        @returns list[float] | None - Cached vector or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None or (self.ttl > 0 and time.monotonic() - entry[0] > self.ttl):
+                if entry is not None:
+                    del self._entries[query]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, query: str, vector: list[float]) -> None:
+        """
+        @parameter: query : str - Query text
+        @parameter: vector : list[float] - Vector of the query.
+        """
+        if self.max_entries < 1:
+            return
+
+        with self._lock:
+            self._entries[query] = (time.monotonic(), vector)
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Hit, miss and eviction counters and the number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+    def clear(self) -> None:
+        """Remove all cached query vectors."""
+        with self._lock:
+            self._entries.clear()
+
+
+class ChunkCache:
+    """
+    Bounded, thread-safe in-process LRU cache for chunk texts keyed by (chunk class, doc_uuid, chunk_id).
+    A chunk id that does not exist in its document is cached as None, so missing neighbors aren't fetched again.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            tuple[str, str, int], tuple[str, str, str, int] | None
+        ] = OrderedDict()
+        # Cached chunk ids per (chunk class, doc_uuid) for invalidation
+        self._documents: dict[tuple[str, str], set[int]] = {}
+
+    def get(
+        self, chunk_class: str, doc_uuid: str, chunk_id: int, default=None
+    ) -> tuple[str, str, str, int] | None:
+        """
+        @parameter: chunk_class : str - Chunk class of the embedder
+        @parameter: doc_uuid : str - Document UUID
+        @parameter: chunk_id : int - Chunk id within the document
+        @parameter: default : Any - Returned if the chunk is not cached
+        @returns tuple[str, str, str, int] | None - Text, doc name, doc type and token count, None if the chunk doesn't exist.
+        """
+        key = (chunk_class, doc_uuid, chunk_id)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def set(
+        self,
+        chunk_class: str,
+        doc_uuid: str,
+        chunk_id: int,
+        entry: tuple[str, str, str, int] | None,
+    ) -> None:
+        """
+        @parameter: chunk_class : str - Chunk class of the embedder
+        @parameter: doc_uuid : str - Document UUID
+        @parameter: chunk_id : int - Chunk id within the document
+        @parameter: entry : tuple[str, str, str, int] | None - Text, doc name, doc type and token count, None if the chunk doesn't exist.
+        """
+        if self.max_entries < 1:
+            return
+
+        key = (chunk_class, doc_uuid, chunk_id)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._documents.setdefault((chunk_class, doc_uuid), set()).add(chunk_id)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _entry = self._entries.popitem(last=False)
+                document = self._documents[evicted_key[:2]]
+                document.discard(evicted_key[2])
+                if not document:
+                    del self._documents[evicted_key[:2]]
+                self.evictions += 1
+
+    def invalidate_document(self, chunk_class: str, doc_uuid: str) -> None:
+        """Remove all cached chunks of a document
+        @parameter: chunk_class : str - Chunk class of the embedder
+        @parameter: doc_uuid : str - Document UUID.
+        """
+        with self._lock:
+            for chunk_id in self._documents.pop((chunk_class, doc_uuid), set()):
+                self._entries.pop((chunk_class, doc_uuid, chunk_id), None)
+
+    def invalidate_document_name(self, chunk_class: str, doc_name: str) -> None:
+        """Remove all cached chunks of the documents with a name
+        @parameter: chunk_class : str - Chunk class of the embedder
+        @parameter: doc_name : str - Document name.
+        """
+        with self._lock:
+            doc_uuids = {
+                doc_uuid
+                for (cached_class, doc_uuid, _), entry in self._entries.items()
+                if cached_class == chunk_class
+                and entry is not None
+                and entry[1] == doc_name
+            }
+        for doc_uuid in doc_uuids:
+            self.invalidate_document(chunk_class, doc_uuid)
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Hit, miss and eviction counters and the number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self) -> None:
+        """Remove all cached chunks."""
+        with self._lock:
+            self._entries.clear()
+            self._documents.clear()
+
+
+class SemanticCacheTier:
+    """
+    Bounded, thread-safe in-process LRU tier in front of the Cache_* class in Weaviate.
+    Exact queries are found in a dict, similar queries with one dot product against a matrix of normalized query vectors.
+    Evicted entries free their matrix row for the next entry.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Query -> (system message, matrix row)
+        self._entries: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._vectors: np.ndarray | None = None  # Allocated on the first vector
+        self._valid = np.zeros(max(max_entries, 0), dtype=bool)
+        self._row_queries: list[str | None] = [None] * max(max_entries, 0)
+        self._free_rows = list(range(max(max_entries, 0) - 1, -1, -1))
+
+    def get(
+        self, query: str, vector=None, max_distance: float = 0.04
+    ) -> tuple[str | None, float | None]:
+        """
+        @parameter: query : str - User query
+        @parameter: vector : list[float] | None - Query vector, only exact matches are found if None
+        @parameter: max_distance : float - Maximum cosine distance of a similar query
+        @returns tuple[str | None, float | None] - Cached system message and its distance, (None, None) on a miss.
+        """
+        _, system, distance = self.match(query, vector, max_distance)
+        return system, distance
+
+    def match(
+        self, query: str, vector=None, max_distance: float = 0.04
+    ) -> tuple[str | None, str | None, float | None]:
+        """
+        @parameter: query : str - User query
+        @parameter: vector : list[float] | None - Query vector, only exact matches are found if None
+        @parameter: max_distance : float - Maximum cosine distance of a similar query
+        @returns tuple[str | None, str | None, float | None] - Query of the matched entry, its system message and distance.
+        """
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None:
+                self._entries.move_to_end(query)
+                self.hits += 1
+                return query, entry[0], 0.0
+
+            if vector is not None and self._vectors is not None and self._valid.any():
+                vector = np.asarray(vector, dtype=np.float32)
+                if vector.shape[0] == self._vectors.shape[1]:
+                    similarities = self._vectors @ (
+                        vector / max(float(np.linalg.norm(vector)), 1e-12)
+                    )
+                    similarities[~self._valid] = -np.inf
+                    row = int(np.argmax(similarities))
+                    distance = 1.0 - float(similarities[row])
+                    if distance <= max_distance:
+                        cached_query = self._row_queries[row]
+                        self._entries.move_to_end(cached_query)
+                        self.hits += 1
+                        return cached_query, self._entries[cached_query][0], distance
+
+            self.misses += 1
+            return None, None, None
+
+    def set(self, query: str, system: str, vector=None) -> None:
+        """
+        @parameter: query : str - User query
+        @parameter: system : str - System message answering the query
+        @parameter: vector : list[float] | None - Query vector, the entry only matches exactly if None.
+        """
+        if self.max_entries < 1:
+            return
+
+        with self._lock:
+            if query in self._entries:
+                row = self._entries[query][1]
+            else:
+                if len(self._free_rows) == 0:
+                    _, (_, evicted_row) = self._entries.popitem(last=False)
+                    self._valid[evicted_row] = False
+                    self._row_queries[evicted_row] = None
+                    self._free_rows.append(evicted_row)
+                    self.evictions += 1
+                row = self._free_rows.pop()
+
+            self._entries[query] = (system, row)
+            self._entries.move_to_end(query)
+            self._row_queries[row] = query
+            self._valid[row] = False
+
+            if vector is not None:
+                vector = np.asarray(vector, dtype=np.float32)
+                if self._vectors is None:
+                    self._vectors = np.zeros(
+                        (self.max_entries, vector.shape[0]), dtype=np.float32
+                    )
+                if vector.shape[0] == self._vectors.shape[1]:
+                    self._vectors[row] = vector / max(
+                        float(np.linalg.norm(vector)), 1e-12
+                    )
+                    self._valid[row] = True
+
+    def remove(self, queries: list[str]) -> None:
+        """
+        @parameter: queries : list[str] - Queries whose entries were evicted from Weaviate.
+        """
+        with self._lock:
+            for query in queries:
+                entry = self._entries.pop(query, None)
+                if entry is not None:
+                    self._valid[entry[1]] = False
+                    self._row_queries[entry[1]] = None
+                    self._free_rows.append(entry[1])
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Hit, miss and eviction counters and the number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        with self._lock:
+            self._entries.clear()
+            self._valid[:] = False
+            self._row_queries = [None] * max(self.max_entries, 0)
+            self._free_rows = list(range(max(self.max_entries, 0) - 1, -1, -1))
+
+
+# Upper bounds of the distance histogram buckets, the last bucket holds all larger distances
+DISTANCE_BUCKETS = [0.01, 0.02, 0.03, 0.04, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5]
+
+
+class SemanticCacheMetrics:
+    """
+    Thread-safe counters of the semantic cache: hits per tier, the nearest-neighbor distance histogram
+    and the generation time saved by hits, estimated from the moving average of uncached generations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record_lookup(
+        self, hit: bool, distance: float | None, seconds: float, tier: str = None
+    ) -> None:
+        """
+        @parameter: hit : bool - Whether the lookup returned a cached answer
+        @parameter: distance : float | None - Distance of the nearest cached query, None if there is none
+        @parameter: seconds : float - Duration of the lookup
+        @parameter: tier : str - Tier that answered a hit (local, exact, similar).
+        """
+        with self._lock:
+            self.lookup_seconds += seconds
+            if distance is not None:
+                bucket = len(DISTANCE_BUCKETS)
+                for index, upper in enumerate(DISTANCE_BUCKETS):
+                    if distance <= upper:
+                        bucket = index
+                        break
+                self.distances[bucket] += 1
+
+            if not hit:
+                self.misses += 1
+                return
+
+            self.hits[tier] = self.hits.get(tier, 0) + 1
+            if self.generation_seconds is not None:
+                self.saved_seconds += max(self.generation_seconds - seconds, 0.0)
+
+    def record_generation(self, seconds: float) -> None:
+        """
+        @parameter: seconds : float - Duration of an uncached generation.
+        """
+        with self._lock:
+            self.generations += 1
+            self.generation_seconds = (
+                seconds
+                if self.generation_seconds is None
+                else 0.9 * self.generation_seconds + 0.1 * seconds
+            )
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Hit rate, hits per tier, distance histogram and saved generation time.
+        """
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            labels = [f"<={upper}" for upper in DISTANCE_BUCKETS] + [
+                f">{DISTANCE_BUCKETS[-1]}"
+            ]
+            return {
+                "hits": hits,
+                "hits_by_tier": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups > 0 else 0.0,
+                "distance_histogram": dict(zip(labels, self.distances)),
+                "avg_lookup_seconds": self.lookup_seconds / lookups
+                if lookups > 0
+                else 0.0,
+                "generations": self.generations,
+                "avg_generation_seconds": self.generation_seconds,
+                "saved_seconds": self.saved_seconds,
+                "saved_seconds_per_hit": self.saved_seconds / hits if hits > 0 else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Reset all counters."""
+        with self._lock:
+            self.hits: dict[str, int] = {}
+            self.misses = 0
+            self.distances = [0] * (len(DISTANCE_BUCKETS) + 1)
+            self.lookup_seconds = 0.0
+            self.generations = 0
+            self.generation_seconds: float | None = None
+            self.saved_seconds = 0.0
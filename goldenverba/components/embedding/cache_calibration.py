@@ -0,0 +1,72 @@
+import json
+
+from tqdm import tqdm
+from weaviate import Client
+
+
+def read_query_log(path: str) -> list[dict]:
+    """Read a query log for calibration
+    @parameter: path : str - JSONL file, every line has a "query" and the cached "match" that answers it correctly (null if none does)
+    @returns list[dict] - Logged queries.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+def replay_query_log(
+    client: Client, embedder, entries: list[dict]
+) -> list[tuple[float | None, bool]]:
+    """Look up the nearest cached query of every logged query in the Cache_* class, without touching the semantic cache or its metrics
+    @parameter: client : Client - Weaviate client
+    @parameter: embedder : Embedder - Embedder of the Cache_* class
+    @parameter: entries : list[dict] - Logged queries with their expected match
+    @returns list[tuple[float | None, bool]] - Distance of the nearest cached query and whether it is the expected match.
+    """
+    samples = []
+    for entry in tqdm(entries, desc="Replaying queries"):
+        result = embedder.get_nearest_cached_query(client, entry["query"])
+        if result is None:
+            samples.append((None, False))
+        else:
+            samples.append(
+                (
+                    float(result["_additional"]["distance"]),
+                    result["query"] == entry.get("match"),
+                )
+            )
+    return samples
+
+
+def calibrate_threshold(
+    samples: list[tuple[float | None, bool]], target_precision: float = 0.95
+) -> dict:
+    """Pick the distance threshold with the highest hit rate whose hits reach the target precision
+    @parameter: samples : list[tuple[float | None, bool]] - Nearest distance and correctness per logged query
+    @parameter: target_precision : float - Minimum share of hits that return the expected answer
+    @returns dict - Threshold (None if no threshold reaches the precision), its hit rate and precision and the full curve.
+    """
+    hits = sorted(
+        (distance, correct) for distance, correct in samples if distance is not None
+    )
+    best = {"threshold": None, "hit_rate": 0.0, "precision": None}
+    curve = []
+    correct_hits = 0
+    for index, (distance, correct) in enumerate(hits):
+        correct_hits += int(correct)
+        # Every distinct distance is a candidate, equal distances are all hits or all misses
+        if index + 1 < len(hits) and hits[index + 1][0] == distance:
+            continue
+
+        hit_rate = (index + 1) / len(samples)
+        precision = correct_hits / (index + 1)
+        curve.append(
+            {"threshold": distance, "hit_rate": hit_rate, "precision": precision}
+        )
+        if precision >= target_precision and hit_rate > best["hit_rate"]:
+            best = curve[-1]
+
+    return {**best, "queries": len(samples), "curve": curve}
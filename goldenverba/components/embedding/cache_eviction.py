@@ -0,0 +1,344 @@
+import threading
+import time
+from collections.abc import Callable
+
+from wasabi import msg
+from weaviate import Client
+from weaviate.util import generate_uuid5
+
+# Properties by which each policy orders the entries it evicts first
+OVERFLOW_ORDER = {"LRU": ["last_hit", "created_at"], "LFU": ["hit_count", "last_hit"]}
+
+
+def semantic_cache_uuid(query: str, class_name: str) -> str:
+    """Deterministic UUID of a semantic cache entry, repeated writes of a query overwrite its entry
+    @parameter: query : str - User query
+    @parameter: class_name : str - Name of the Cache_* class
+    @returns str - UUID of the entry.
+    """
+    return generate_uuid5(str(query), class_name)
+
+
+CACHE_PROPERTIES = [
+    "query",
+    "system",
+    "created_at",
+    "last_hit",
+    "hit_count",
+    "corpus_version",
+    "doc_uuids",
+]
+
+
+def get_eviction_filters(
+    now: float, corpus_version: int, max_age: float = 0
+) -> dict[str, dict]:
+    """Build the where filters of the semantic cache entries that are evicted regardless of the size limit
+    @parameter: now : float - Current unix time
+    @parameter: corpus_version : int - Current corpus version, entries of older versions are stale
+    @parameter: max_age : float - Maximum age in seconds, 0 for no limit
+    @returns dict[str, dict] - Where filter by reason (stale, expired).
+    """
+    filters = {
+        "stale": {
+            "path": ["corpus_version"],
+            "operator": "LessThan",
+            "valueInt": corpus_version,
+        }
+    }
+    if max_age > 0:
+        filters["expired"] = {
+            "path": ["created_at"],
+            "operator": "LessThan",
+            "valueNumber": now - max_age,
+        }
+    return filters
+
+
+def get_overflow_sort(policy: str = "LRU") -> list[dict]:
+    """Order in which overflowing semantic cache entries are evicted. Entries without metadata,
+    written before the properties existed, have null values and are sorted first
+    @parameter: policy : str - LRU evicts the least recently hit entries first, LFU the least often hit
+    @returns list[dict] - Weaviate sort.
+    """
+    return [
+        {"path": [path], "order": "asc"}
+        for path in OVERFLOW_ORDER.get(policy, OVERFLOW_ORDER["LRU"])
+    ]
+
+
+class SemanticCacheEvictor:
+    """
+    Enforces a size limit, a maximum age and the corpus version on a Cache_* class.
+    Lookups only count hits in memory, a periodic sweep writes the hit counters of the touched entries
+    in one batch and removes the evicted entries with bulk deletes. Every request of a sweep is
+    filtered or sorted by Weaviate, so a sweep reads only the entries it evicts or updates.
+    Sweeps and invalidations hold the same lock, a hit counter is never written back to an entry
+    that was deleted after it was read.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_age: float = 0,
+        policy: str = "LRU",
+        interval: float = 60.0,
+        page_size: int = 1000,
+        client_factory: Callable[[], Client] | None = None,
+    ):
+        if policy not in OVERFLOW_ORDER:
+            msg.warn(f"Unknown semantic cache policy {policy}, using LRU")
+            policy = "LRU"
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.policy = policy
+        self.interval = interval
+        self.page_size = page_size
+        # client.batch is shared with imports and is not thread-safe, the hit counters are written
+        # through a client of their own, or updated one by one if there is no factory
+        self.client_factory = client_factory
+        self._client: Client = None
+        self.sweeps = 0
+        self.evictions = {"stale": 0, "expired": 0, "overflow": 0}
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        # Query -> (hits since the last sweep, time of the last hit), bounded by max_pending_hits
+        self._pending_hits: dict[str, tuple[int, float]] = {}
+        self.max_pending_hits = max(max_entries, 1000)
+
+    def record_hit(self, query: str, now: float | None = None) -> None:
+        """Count a hit of an entry, written to Weaviate by the next sweep
+        @parameter: query : str - Query of the cached entry
+        @parameter: now : float | None - Unix time of the hit.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            hits = self._pending_hits.get(query)
+            if hits is not None:
+                self._pending_hits[query] = (hits[0] + 1, now)
+            elif len(self._pending_hits) < self.max_pending_hits:
+                self._pending_hits[query] = (1, now)
+
+    def is_due(self, force: bool = False) -> bool:
+        """
+        @parameter: force : bool - Ignore the interval, used after the corpus changed
+        @returns bool - Whether the interval since the last sweep has passed and no sweep is running.
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_sweep < self.interval:
+                return False
+            if self._sweep_lock.locked():
+                return False
+            self._last_sweep = time.monotonic()
+            return True
+
+    def evict(self, client: Client, class_name: str, corpus_version: int) -> list[str]:
+        """Remove stale and expired entries, write the pending hits and evict the overflowing entries of a Cache_* class.
+        The hits are written before the overflow is counted, so the policy sees them and no evicted entry is rewritten
+        @parameter: client : Client - Weaviate client
+        @parameter: class_name : str - Name of the Cache_* class
+        @parameter: corpus_version : int - Current corpus version
+        @returns list[str] - Queries of the evicted entries.
+        """
+        with self._sweep_lock:
+            with self._lock:
+                pending_hits = self._pending_hits
+                self._pending_hits = {}
+
+            evicted = {}
+            for reason, where in get_eviction_filters(
+                time.time(), corpus_version, self.max_age
+            ).items():
+                evicted[reason] = self.delete_pages(client, class_name, where=where)
+
+            self.write_hits(client, class_name, pending_hits)
+
+            evicted["overflow"] = []
+            if self.max_entries > 0:
+                overflow = self.count(client, class_name) - self.max_entries
+                if overflow > 0:
+                    evicted["overflow"] = self.delete_pages(
+                        client,
+                        class_name,
+                        sort=get_overflow_sort(self.policy),
+                        limit=overflow,
+                    )
+
+            with self._lock:
+                self.sweeps += 1
+                for reason, queries in evicted.items():
+                    self.evictions[reason] += len(queries)
+
+            queries = [query for reason in evicted.values() for query in reason]
+            if len(queries) > 0:
+                msg.info(
+                    f"Evicted {len(queries)} entries from {class_name} ({', '.join(f'{len(v)} {k}' for k, v in evicted.items())})"
+                )
+            return queries
+
+    def invalidate(self, client: Client, class_name: str, where: dict) -> list[str]:
+        """Delete the entries matching a filter outside of a sweep and drop their pending hits
+        @parameter: client : Client - Weaviate client
+        @parameter: class_name : str - Name of the Cache_* class
+        @parameter: where : dict - Filter of the entries to delete
+        @returns list[str] - Queries of the deleted entries.
+        """
+        # Waits for a running sweep, which could otherwise write back hits of the deleted entries
+        with self._sweep_lock:
+            queries = self.delete_pages(client, class_name, where=where)
+        with self._lock:
+            for query in queries:
+                self._pending_hits.pop(query, None)
+        return queries
+
+    def delete_pages(
+        self,
+        client: Client,
+        class_name: str,
+        where: dict | None = None,
+        sort: list[dict] | None = None,
+        limit: int | None = None,
+    ) -> list[str]:
+        """Delete the entries matching a filter, or the first entries in a sort order, one page at a time.
+        Deleted entries drop out of the next page, so no cursor or offset is needed
+        @parameter: client : Client - Weaviate client
+        @parameter: class_name : str - Name of the Cache_* class
+        @parameter: where : dict | None - Filter of the entries to delete
+        @parameter: sort : list[dict] | None - Order of the entries to delete
+        @parameter: limit : int | None - Maximum number of entries to delete, None deletes all matching entries
+        @returns list[str] - Queries of the deleted entries.
+        """
+        queries = []
+        while limit is None or len(queries) < limit:
+            page_size = self.page_size
+            if limit is not None:
+                page_size = min(page_size, limit - len(queries))
+
+            query = (
+                client.query.get(class_name=class_name, properties=["query"])
+                .with_additional(["id"])
+                .with_limit(page_size)
+            )
+            if where is not None:
+                query = query.with_where(where)
+            if sort is not None:
+                query = query.with_sort(sort)
+
+            page = query.do()["data"]["Get"][class_name]
+            if not page:
+                break
+
+            client.batch.delete_objects(
+                class_name=class_name,
+                where={
+                    "path": ["id"],
+                    "operator": "ContainsAny",
+                    "valueTextArray": [entry["_additional"]["id"] for entry in page],
+                },
+            )
+            queries.extend(entry["query"] for entry in page)
+            if len(page) < page_size:
+                break
+        return queries
+
+    def write_hits(
+        self,
+        client: Client,
+        class_name: str,
+        pending_hits: dict[str, tuple[int, float]],
+    ) -> int:
+        """Add the counted hits to the stored entries. Weaviate has no batch update, the touched entries
+        are read with their vectors and written back in one batch under their deterministic UUIDs
+        through the evictor's own client. Without a client factory every entry is updated on its own
+        @parameter: client : Client - Weaviate client
+        @parameter: class_name : str - Name of the Cache_* class
+        @parameter: pending_hits : dict[str, tuple[int, float]] - Hits and time of the last hit per query
+        @returns int - Number of updated entries, evicted entries are skipped.
+        """
+        uuids = [semantic_cache_uuid(query, class_name) for query in pending_hits]
+        entries = []
+        for start in range(0, len(uuids), self.page_size):
+            page_uuids = uuids[start : start + self.page_size]
+            entries.extend(
+                client.query.get(class_name=class_name, properties=CACHE_PROPERTIES)
+                .with_additional(["id", "vector"])
+                .with_where(
+                    {
+                        "path": ["id"],
+                        "operator": "ContainsAny",
+                        "valueTextArray": page_uuids,
+                    }
+                )
+                .with_limit(len(page_uuids))
+                .do()["data"]["Get"][class_name]
+            )
+
+        if len(entries) == 0:
+            return 0
+
+        updates = []
+        for entry in entries:
+            additional = entry.pop("_additional")
+            hits, last_hit = pending_hits[entry["query"]]
+            entry["hit_count"] = (entry.get("hit_count") or 0) + hits
+            entry["last_hit"] = max(entry.get("last_hit") or 0, last_hit)
+            updates.append((entry, additional.get("vector")))
+
+        if self.client_factory is None:
+            for properties, _ in updates:
+                client.data_object.update(
+                    {
+                        "hit_count": properties["hit_count"],
+                        "last_hit": properties["last_hit"],
+                    },
+                    class_name=class_name,
+                    uuid=semantic_cache_uuid(properties["query"], class_name),
+                )
+            return len(updates)
+
+        if self._client is None:
+            self._client = self.client_factory()
+            self._client.batch.configure(batch_size=None, dynamic=False)
+        try:
+            for properties, vector in updates:
+                self._client.batch.add_data_object(
+                    properties,
+                    class_name,
+                    uuid=semantic_cache_uuid(properties["query"], class_name),
+                    vector=vector,
+                )
+            self._client.batch.create_objects()
+        except Exception:
+            # A failed request leaves its objects in the batch
+            self._client.batch.empty_objects()
+            raise
+        return len(updates)
+
+    def count(self, client: Client, class_name: str) -> int:
+        """
+        @parameter: client : Client - Weaviate client
+        @parameter: class_name : str - Name of the Cache_* class
+        @returns int - Number of entries.
+        """
+        results = client.query.aggregate(class_name).with_meta_count().do()
+        return int(results["data"]["Aggregate"][class_name][0]["meta"]["count"])
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Number of sweeps, evicted entries by reason and pending hits.
+        """
+        with self._lock:
+            return {
+                "sweeps": self.sweeps,
+                "evictions": dict(self.evictions),
+                "pending_hits": len(self._pending_hits),
+                "max_entries": self.max_entries,
+                "max_age": self.max_age,
+                "policy": self.policy,
+            }
+
+    def clear(self) -> None:
+        """Drop the pending hits."""
+        with self._lock:
+            self._pending_hits = {}
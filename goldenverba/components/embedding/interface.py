@@ -1,13 +1,31 @@
-import re
 import os
+import re
+import shutil
+import threading
 import time
-from dotenv import load_dotenv
 
+import numpy as np
+from dotenv import load_dotenv
 from tqdm import tqdm
 from wasabi import msg
 from weaviate import Client
+from weaviate.util import generate_uuid5
 
+from goldenverba.components.chunking.batch import ChunkBatch
+from goldenverba.components.chunking.chunk import Chunk, content_hash
 from goldenverba.components.component import VerbaComponent
+from goldenverba.components.embedding.cache import (
+    ChunkCache,
+    EmbeddingCache,
+    QueryVectorCache,
+    SemanticCacheMetrics,
+    SemanticCacheTier,
+)
+from goldenverba.components.embedding.cache_eviction import (
+    SemanticCacheEvictor,
+    semantic_cache_uuid,
+)
+from goldenverba.components.embedding.local_index import LocalIndex
 from goldenverba.components.reader.document import Document
 from goldenverba.components.reader.interface import InputForm
 from goldenverba.components.schema.schema_generation import (
@@ -18,6 +36,52 @@ from goldenverba.components.schema.schema_generation import (
 
 load_dotenv()
 
+
+def log_batch_errors(logs: list[dict]) -> list[str]:
+    """Batch callback that logs objects Weaviate failed to import
+    @parameter: logs : list[dict] - Results of a batch request
+    @returns list[str] - UUIDs of the failed objects.
+    """
+    failed = []
+    if logs is not None:
+        for result in logs:
+            if "result" in result and "errors" in result["result"]:
+                if "error" in result["result"]["errors"]:
+                    msg.fail(result["result"])
+                    failed.append(result.get("id"))
+    return failed
+
+
+def diff_chunks(
+    stored_chunks: list[dict], chunks: list[Chunk]
+) -> tuple[list[Chunk], list[tuple[str, int, Chunk]], list[str]]:
+    """Match the chunks of a new document version against the stored chunks by content hash
+    @parameter: stored_chunks : list[dict] - Stored chunks with chunk_id, chunk_hash and _additional id
+    @parameter: chunks : list[Chunk] - Chunks of the new document version
+    @returns tuple[list[Chunk], list[tuple[str, int, Chunk]], list[str]] - Chunks to insert, kept chunks as (uuid, stored chunk_id, new chunk) and uuids to delete.
+    """
+    stored_by_hash: dict[str, list[tuple[str, int]]] = {}
+    for stored_chunk in sorted(stored_chunks, key=lambda c: float(c["chunk_id"])):
+        stored_by_hash.setdefault(stored_chunk.get("chunk_hash"), []).append(
+            (stored_chunk["_additional"]["id"], int(float(stored_chunk["chunk_id"])))
+        )
+
+    inserted = []
+    kept = []
+    for chunk in chunks:
+        matches = stored_by_hash.get(chunk.chunk_hash)
+        if matches:
+            chunk_uuid, chunk_id = matches.pop(0)
+            kept.append((chunk_uuid, chunk_id, chunk))
+        else:
+            inserted.append(chunk)
+
+    deleted = [
+        chunk_uuid for matches in stored_by_hash.values() for chunk_uuid, _ in matches
+    ]
+    return inserted, kept, deleted
+
+
 class Embedder(VerbaComponent):
     """
     Interface for Verba Embedding.
@@ -27,6 +91,45 @@ class Embedder(VerbaComponent):
         super().__init__()
         self.input_form = InputForm.TEXT.value  # Default for all Embedders
         self.vectorizer = ""
+        self.embedding_cache: EmbeddingCache = None  # Only used by Embedders with custom vectors
+        self.query_cache = QueryVectorCache(
+            max_entries=int(os.getenv("VERBA_QUERY_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("VERBA_QUERY_CACHE_TTL", "3600")),
+        )
+        # Neighboring chunks fetched by the WindowRetriever, invalidated when a document changes
+        self.chunk_cache = ChunkCache(
+            max_entries=int(os.getenv("VERBA_CHUNK_CACHE_SIZE", "10000"))
+        )
+        # Process-local tier of the semantic cache, misses fall through to the Cache_* class in Weaviate
+        self.semantic_cache = SemanticCacheTier(
+            max_entries=int(os.getenv("VERBA_SEMANTIC_CACHE_SIZE", "1024"))
+        )
+        # Size limit, maximum age and corpus version of the Cache_* class, enforced by a periodic sweep
+        self.cache_evictor = SemanticCacheEvictor(
+            max_entries=int(os.getenv("VERBA_SEMANTIC_CACHE_MAX_ENTRIES", "10000")),
+            max_age=float(os.getenv("VERBA_SEMANTIC_CACHE_MAX_AGE", "0")),
+            policy=os.getenv("VERBA_SEMANTIC_CACHE_POLICY", "LRU"),
+            interval=float(os.getenv("VERBA_SEMANTIC_CACHE_EVICT_INTERVAL", "60")),
+        )
+        # Read from VERBA_SEMANTIC_CACHE_DISTANCE(_<EMBEDDER NAME>) on first use
+        self.semantic_cache_distance: float = None
+        self.semantic_cache_metrics = SemanticCacheMetrics()
+        # Set by the VerbaManager, queued answers citing invalidated documents are discarded from it
+        self.write_behind = None
+        # Stored in the CorpusVersion class and bumped whenever documents are imported, re-read every
+        # VERBA_CORPUS_VERSION_TTL seconds so imports of other processes like `verba load` are picked up
+        self.corpus_version: int = None
+        self.corpus_version_ttl = float(os.getenv("VERBA_CORPUS_VERSION_TTL", "5"))
+        self.corpus_version_read = float("-inf")
+        self.corpus_version_lock = threading.Lock()
+        # In-process hybrid index used by the LocalRetriever, kept in sync with imports and removals
+        self.local_index_enabled = os.getenv("VERBA_LOCAL_INDEX", "False") == "True"
+        self.local_index: LocalIndex = None
+        self.local_index_lock = threading.Lock()
+        # Bulk import streams all documents through one long-lived dynamic batch
+        self.bulk_import = os.getenv("VERBA_BULK_IMPORT", "False") == "True"
+        self.import_batch_size = int(os.getenv("VERBA_IMPORT_BATCH_SIZE", "200"))
+        self.import_num_workers = int(os.getenv("VERBA_IMPORT_NUM_WORKERS", "2"))
 
     def embed(documents: list[Document], client: Client, batch_size: int = 100) -> bool:
         """Embed verba documents and its chunks to Weaviate
@@ -37,15 +140,39 @@ class Embedder(VerbaComponent):
         """
         raise NotImplementedError("embed method must be implemented by a subclass.")
 
+    def vectorize_documents(self, documents: list[Document]) -> None:
+        """Set the vectors of the chunks before they are imported, only needed for Embedders with custom vectors
+        @parameter: documents : list[Document] - List of Verba documents
+        @returns None - The vectors are set on the Chunk objects.
+        """
+        pass
+
+    def vectorize_chunk_batch(self, chunk_batch: ChunkBatch) -> ChunkBatch:
+        """Set the vector matrix of a chunk batch, only needed for Embedders with custom vectors
+        @parameter: chunk_batch : ChunkBatch - Columnar chunks
+        @returns ChunkBatch - The same batch, Weaviate vectorizes the chunks on import by default.
+        """
+        return chunk_batch
+
+    def embed_batch(self, chunk_batch: ChunkBatch, client: Client) -> bool:
+        """Vectorize a chunk batch and import it to Weaviate
+        @parameter: chunk_batch : ChunkBatch - Columnar chunks
+        @parameter: client : Client - Weaviate Client
+        @returns bool - Bool whether the import was successful.
+        """
+        self.vectorize_chunk_batch(chunk_batch)
+        return self.import_chunk_batch(chunk_batch, client)
+
     def import_data(
         self,
         documents: list[Document],
         client: Client,
+        finalize: bool = True,
     ) -> bool:
         """Import verba documents and its chunks to Weaviate
         @parameter: documents : list[Document] - List of Verba documents
         @parameter: client : Client - Weaviate Client
-        @parameter: batch_size : int - Batch Size of Input
+        @parameter: finalize : bool - Call finish_import afterwards, callers that import in several calls finish once themselves
         @returns bool - Bool whether the embedding what successful.
         """
         try:
@@ -53,18 +180,21 @@ class Embedder(VerbaComponent):
                 msg.fail(f"Vectorizer of {self.name} not found")
                 return False
 
+            if self.bulk_import:
+                return self.bulk_import_data(documents, client, finalize)
+
             for i, document in enumerate(documents):
                 batches = []
                 uuid = ""
                 temp_batch = []
                 token_counter = 0
                 for chunk in document.chunks:
-                    if token_counter + len(chunk.tokens) <= 4000:
-                        token_counter += len(chunk.tokens)
+                    if token_counter + chunk.tokens <= 4000:
+                        token_counter += chunk.tokens
                         temp_batch.append(chunk)
                     else:
                         batches.append(temp_batch.copy())
-                        token_counter = len(chunk.tokens)
+                        token_counter = chunk.tokens
                         temp_batch = [chunk]
                 if len(temp_batch) > 0:
                     batches.append(temp_batch.copy())
@@ -77,14 +207,7 @@ class Embedder(VerbaComponent):
 
                 with client.batch as batch:
                     batch.batch_size = 1
-                    properties = {
-                        "text": str(document.text),
-                        "doc_name": str(document.name),
-                        "doc_type": str(document.type),
-                        "doc_link": str(document.link),
-                        "chunk_count": len(document.chunks),
-                        "timestamp": str(document.timestamp),
-                    }
+                    properties = self.get_document_properties(document)
 
                     class_name = "Document_" + strip_non_letters(self.vectorizer)
                     uuid = client.batch.add_data_object(properties, class_name)
@@ -101,13 +224,7 @@ class Embedder(VerbaComponent):
                         for i, chunk in enumerate(chunk_batch):
                             chunk_count += 1
 
-                            properties = {
-                                "text": chunk.text,
-                                "doc_name": str(document.name),
-                                "doc_uuid": chunk.doc_uuid,
-                                "doc_type": chunk.doc_type,
-                                "chunk_id": chunk.chunk_id,
-                            }
+                            properties = self.get_chunk_properties(document, chunk)
                             class_name = "Chunk_" + strip_non_letters(self.vectorizer)
 
                             # Check if vector already exists
@@ -117,7 +234,7 @@ class Embedder(VerbaComponent):
                                 client.batch.add_data_object(
                                     properties, class_name, vector=chunk.vector
                                 )
-                            
+
                             wait_time_ms = int(os.getenv("WAIT_TIME_BETWEEN_INGESTION_QUERIES_MS","0"))
                             if wait_time_ms>0:
                                 time.sleep(float(wait_time_ms)/1000)
@@ -130,10 +247,364 @@ class Embedder(VerbaComponent):
                     "Chunk_" + strip_non_letters(self.vectorizer),
                     len(document.chunks),
                 )
+
+                local_index = self.get_local_index(client)
+                if local_index is not None:
+                    local_index.add_document(
+                        uuid,
+                        document.name,
+                        document.type,
+                        [chunk.chunk_id for chunk in document.chunks],
+                        [chunk.text for chunk in document.chunks],
+                        np.stack([chunk.vector for chunk in document.chunks])
+                        if len(document.chunks) > 0
+                        and all(chunk.vector is not None for chunk in document.chunks)
+                        else None,
+                        [chunk.tokens for chunk in document.chunks],
+                    )
+
+            if finalize and len(documents) > 0:
+                self.finish_import(client)
             return True
         except Exception as e:
             raise Exception(e)
 
+    def bulk_import_data(
+        self,
+        documents: list[Document],
+        client: Client,
+        finalize: bool = True,
+    ) -> bool:
+        """Import verba documents and their chunks through one long-lived dynamic batch
+        @parameter: documents : list[Document] - List of Verba documents
+        @parameter: client : Client - Weaviate Client
+        @parameter: finalize : bool - Call finish_import afterwards
+        @returns bool - Bool whether the import was successful.
+        """
+        return self.import_chunk_batch(
+            ChunkBatch.from_documents(documents), client, finalize
+        )
+
+    def finish_import(self, client: Client) -> None:
+        """Persist the local index and bump the corpus version once after an import,
+        the version bump also triggers the semantic cache sweep
+        @parameter: client : Client - Weaviate Client.
+        """
+        if self.local_index is not None:
+            self.local_index.save()
+        self.bump_corpus_version(client)
+
+    def import_chunk_batch(
+        self, chunk_batch: ChunkBatch, client: Client, finalize: bool = True
+    ) -> bool:
+        """Import the documents of a chunk batch and their chunks through one long-lived dynamic batch.
+        The batch keeps at most import_num_workers requests in flight and blocks while they are sent,
+        which applies backpressure to the caller. Documents with failed objects are rolled back.
+        @parameter: chunk_batch : ChunkBatch - Columnar chunks
+        @parameter: client : Client - Weaviate Client
+        @parameter: finalize : bool - Call finish_import afterwards
+        @returns bool - Bool whether the import was successful.
+        """
+        doc_class_name = self.get_document_class()
+        chunk_class_name = self.get_chunk_class()
+        wait_time_ms = int(os.getenv("WAIT_TIME_BETWEEN_INGESTION_QUERIES_MS", "0"))
+        documents = chunk_batch.documents
+
+        failed_objects = set()
+
+        def batch_callback(logs: list[dict]):
+            failed_objects.update(log_batch_errors(logs))
+
+        # Convert the columns once instead of reading every chunk's attributes
+        texts = chunk_batch.texts
+        chunk_ids = chunk_batch.chunk_ids.tolist()
+        token_counts = chunk_batch.tokens.tolist()
+        chunk_hashes = [content_hash(text) for text in texts]
+        vectors = (
+            chunk_batch.vectors.tolist()
+            if chunk_batch.vectors is not None
+            else [None] * len(texts)
+        )
+
+        object_to_document = {}
+        document_uuids = []
+
+        client.batch.configure(
+            batch_size=self.import_batch_size,
+            dynamic=True,
+            num_workers=self.import_num_workers,
+            callback=batch_callback,
+        )
+        try:
+            with client.batch as batch:
+                for doc_index, document in enumerate(
+                    tqdm(documents, total=len(documents), desc="Importing documents")
+                ):
+                    uuid = batch.add_data_object(
+                        self.get_document_properties(document), doc_class_name
+                    )
+                    object_to_document[uuid] = doc_index
+                    document_uuids.append(uuid)
+
+                    doc_name = str(document.name)
+                    doc_type = document.type
+                    rows = chunk_batch.document_rows(doc_index)
+                    for row in range(rows.start, rows.stop):
+                        properties = {
+                            "text": texts[row],
+                            "doc_name": doc_name,
+                            "doc_uuid": uuid,
+                            "doc_type": doc_type,
+                            "chunk_id": chunk_ids[row],
+                            "chunk_hash": chunk_hashes[row],
+                            "token_count": token_counts[row],
+                        }
+                        chunk_uuid = batch.add_data_object(
+                            properties, chunk_class_name, vector=vectors[row]
+                        )
+                        object_to_document[chunk_uuid] = doc_index
+
+                        if wait_time_ms > 0:
+                            time.sleep(float(wait_time_ms) / 1000)
+        finally:
+            # Restore the default batch configuration of the client
+            client.batch.configure(callback=log_batch_errors)
+
+        for document, uuid in zip(documents, document_uuids):
+            for chunk in document.chunks:
+                chunk.set_uuid(uuid)
+
+        failed_documents = {
+            object_to_document[uuid]
+            for uuid in failed_objects
+            if uuid in object_to_document
+        }
+        self.remove_documents_by_id(
+            client,
+            [document_uuids[index] for index in failed_documents],
+            finalize=False,
+        )
+
+        local_index = self.get_local_index(client)
+        if local_index is not None:
+            for doc_index, (document, uuid) in enumerate(zip(documents, document_uuids)):
+                if doc_index in failed_documents:
+                    continue
+                rows = chunk_batch.document_rows(doc_index)
+                local_index.add_document(
+                    uuid,
+                    document.name,
+                    document.type,
+                    chunk_ids[rows],
+                    texts[rows],
+                    chunk_batch.vectors[rows]
+                    if chunk_batch.vectors is not None
+                    else None,
+                    token_counts[rows],
+                )
+
+        if finalize:
+            self.finish_import(client)
+
+        if len(failed_documents) > 0:
+            raise Exception(
+                f"Import failed for {len(failed_documents)}/{len(documents)} documents, they were rolled back"
+            )
+
+        msg.good(f"Imported {len(documents)} documents with {len(chunk_batch)} chunks")
+        return True
+
+    def get_document_properties(self, document: Document) -> dict:
+        """
+        @parameter: document : Document - Verba document
+        @returns dict - Properties of the Document object in Weaviate.
+        """
+        return {
+            "text": str(document.text),
+            "doc_name": str(document.name),
+            "doc_type": str(document.type),
+            "doc_link": str(document.link),
+            "chunk_count": len(document.chunks),
+            "timestamp": str(document.timestamp),
+            "doc_hash": document.doc_hash,
+            "chunking": document.chunking,
+        }
+
+    def get_chunk_properties(self, document: Document, chunk: Chunk) -> dict:
+        """
+        @parameter: document : Document - Verba document the chunk belongs to
+        @parameter: chunk : Chunk - Chunk of the document
+        @returns dict - Properties of the Chunk object in Weaviate.
+        """
+        return {
+            "text": chunk.text,
+            "doc_name": str(document.name),
+            "doc_uuid": chunk.doc_uuid,
+            "doc_type": chunk.doc_type,
+            "chunk_id": chunk.chunk_id,
+            "chunk_hash": chunk.chunk_hash,
+            "token_count": int(chunk.tokens),
+        }
+
+    def get_stored_chunks(
+        self, client: Client, doc_uuid: str, page_size: int = 1000
+    ) -> list[dict]:
+        """Return id, chunk_id and chunk_hash of all stored chunks of a document
+        @parameter: client : Client - Weaviate Client
+        @parameter: doc_uuid : str - Document UUID
+        @parameter: page_size : int - Number of chunks per request
+        @returns list[dict] - Stored chunks.
+        """
+        chunk_class_name = self.get_chunk_class()
+        stored_chunks = []
+        while True:
+            results = (
+                client.query.get(
+                    class_name=chunk_class_name,
+                    properties=["chunk_id", "chunk_hash"],
+                )
+                .with_where(
+                    {
+                        "path": ["doc_uuid"],
+                        "operator": "Equal",
+                        "valueText": doc_uuid,
+                    }
+                )
+                .with_additional(properties=["id"])
+                .with_limit(page_size)
+                .with_offset(len(stored_chunks))
+                .do()
+            )
+            page = results["data"]["Get"][chunk_class_name]
+            stored_chunks.extend(page)
+            if len(page) < page_size:
+                return stored_chunks
+
+    def update_document(
+        self, client: Client, document: Document, doc_uuid: str
+    ) -> dict:
+        """Incrementally update a stored document to the content of a chunked document.
+        Only chunks with a new content hash are embedded and inserted, moved chunks get their chunk_id patched
+        and chunks that no longer exist are deleted. Nothing is written if the document hash and chunking are unchanged.
+        @parameter: client : Client - Weaviate Client
+        @parameter: document : Document - Chunked Verba document with the new content
+        @parameter: doc_uuid : str - UUID of the stored document
+        @returns dict - Number of inserted, patched, deleted and unchanged chunks.
+        """
+        doc_class_name = self.get_document_class()
+        chunk_class_name = self.get_chunk_class()
+
+        stored_document = client.data_object.get_by_id(
+            doc_uuid, class_name=doc_class_name
+        )
+        if stored_document is None:
+            raise Exception(f"Document {doc_uuid} not found")
+        stored_properties = stored_document["properties"]
+
+        for chunk in document.chunks:
+            chunk.set_uuid(doc_uuid)
+
+        if (
+            stored_properties.get("doc_hash") == document.doc_hash
+            and stored_properties.get("doc_name") == document.name
+            and stored_properties.get("chunking") == document.chunking
+        ):
+            msg.info(f"Document {document.name} is unchanged")
+            return {
+                "inserted": 0,
+                "patched": 0,
+                "deleted": 0,
+                "unchanged": len(document.chunks),
+            }
+
+        self.chunk_cache.invalidate_document(chunk_class_name, doc_uuid)
+        inserted, kept, deleted = diff_chunks(
+            self.get_stored_chunks(client, doc_uuid), document.chunks
+        )
+        renamed = stored_properties.get("doc_name") != document.name
+
+        # Embed and insert the new chunks before anything is removed
+        failed_objects = []
+
+        def batch_callback(logs: list[dict]):
+            failed_objects.extend(log_batch_errors(logs))
+
+        if len(inserted) > 0:
+            changed_document = Document(name=document.name, type=document.type)
+            changed_document.chunks = inserted
+            self.vectorize_documents([changed_document])
+
+            client.batch.configure(callback=batch_callback)
+            try:
+                with client.batch as batch:
+                    batch.batch_size = min(len(inserted), 100)
+                    for chunk in inserted:
+                        batch.add_data_object(
+                            self.get_chunk_properties(document, chunk),
+                            chunk_class_name,
+                            vector=chunk.vector,
+                        )
+            finally:
+                client.batch.configure(callback=log_batch_errors)
+
+            if len(failed_objects) > 0:
+                raise Exception(
+                    f"Update of {document.name} failed for {len(failed_objects)} chunks"
+                )
+
+        patched = 0
+        for chunk_uuid, old_chunk_id, chunk in kept:
+            if renamed or old_chunk_id != int(chunk.chunk_id):
+                client.data_object.update(
+                    {"chunk_id": chunk.chunk_id, "doc_name": str(document.name)},
+                    class_name=chunk_class_name,
+                    uuid=chunk_uuid,
+                )
+                patched += 1
+
+        for i in range(0, len(deleted), 1000):
+            client.batch.delete_objects(
+                class_name=chunk_class_name,
+                where={
+                    "path": ["id"],
+                    "operator": "ContainsAny",
+                    "valueTextArray": deleted[i : i + 1000],
+                },
+            )
+
+        # The document hash is written last, an interrupted update is diffed again on the next run
+        client.data_object.update(
+            self.get_document_properties(document),
+            class_name=doc_class_name,
+            uuid=doc_uuid,
+        )
+
+        local_index = self.get_local_index(client)
+        if local_index is not None:
+            # Kept chunks reuse their indexed vectors, inserted chunks were just vectorized
+            local_index.update_document(
+                doc_uuid,
+                document.name,
+                document.type,
+                [chunk.chunk_id for chunk in document.chunks],
+                [chunk.text for chunk in document.chunks],
+                [chunk.vector for chunk in document.chunks],
+                [chunk.tokens for chunk in document.chunks],
+            )
+            local_index.save()
+
+        self.invalidate_semantic_cache(client, [doc_uuid])
+
+        msg.good(
+            f"Updated {document.name}: {len(inserted)} inserted, {patched} patched, {len(deleted)} deleted, {len(kept) - patched} unchanged chunks"
+        )
+        return {
+            "inserted": len(inserted),
+            "patched": patched,
+            "deleted": len(deleted),
+            "unchanged": len(kept) - patched,
+        }
+
     def check_document_status(
         self,
         client: Client,
@@ -194,6 +665,25 @@ class Embedder(VerbaComponent):
         @parameter: doc_class_name : str - Class name of Document
         @parameter: chunk_class_name : str - Class name of Chunks.
         """
+        self.chunk_cache.invalidate_document_name(chunk_class_name, doc_name)
+        local_index = self.get_local_index(client)
+        if local_index is not None:
+            local_index.remove_document_name(doc_name)
+            local_index.save()
+
+        documents = (
+            client.query.get(class_name=doc_class_name, properties=["doc_name"])
+            .with_where(
+                {"path": ["doc_name"], "operator": "Equal", "valueText": doc_name}
+            )
+            .with_additional(["id"])
+            .do()
+        )
+        doc_uuids = [
+            document["_additional"]["id"]
+            for document in documents["data"]["Get"][doc_class_name]
+        ]
+
         client.batch.delete_objects(
             class_name=doc_class_name,
             where={"path": ["doc_name"], "operator": "Equal", "valueText": doc_name},
@@ -204,20 +694,41 @@ class Embedder(VerbaComponent):
             where={"path": ["doc_name"], "operator": "Equal", "valueText": doc_name},
         )
 
+        self.invalidate_semantic_cache(client, doc_uuids)
         msg.warn(f"Deleted document {doc_name} and its chunks")
 
     def remove_document_by_id(self, client: Client, doc_id: str):
+        self.remove_documents_by_id(client, [doc_id])
+
+    def remove_documents_by_id(
+        self, client: Client, doc_ids: list[str], finalize: bool = True
+    ) -> None:
+        """Delete documents and their chunks, the local index is saved once for all of them
+        @parameter: client : Client - Weaviate Client
+        @parameter: doc_ids : list[str] - UUIDs of the documents
+        @parameter: finalize : bool - Save the local index afterwards, an import saves it in finish_import.
+        """
         doc_class_name = "Document_" + strip_non_letters(self.vectorizer)
         chunk_class_name = "Chunk_" + strip_non_letters(self.vectorizer)
 
-        client.data_object.delete(uuid=doc_id, class_name=doc_class_name)
+        local_index = self.get_local_index(client)
+        for doc_id in doc_ids:
+            self.chunk_cache.invalidate_document(chunk_class_name, doc_id)
+            if local_index is not None:
+                local_index.remove_document(doc_id)
 
-        client.batch.delete_objects(
-            class_name=chunk_class_name,
-            where={"path": ["doc_uuid"], "operator": "Equal", "valueText": doc_id},
-        )
+            client.data_object.delete(uuid=doc_id, class_name=doc_class_name)
 
-        msg.warn(f"Deleted document {doc_id} and its chunks")
+            client.batch.delete_objects(
+                class_name=chunk_class_name,
+                where={"path": ["doc_uuid"], "operator": "Equal", "valueText": doc_id},
+            )
+            msg.warn(f"Deleted document {doc_id} and its chunks")
+
+        if finalize and local_index is not None:
+            local_index.save()
+        if len(doc_ids) > 0:
+            self.invalidate_semantic_cache(client, doc_ids)
 
     def get_document_class(self) -> str:
         return "Document_" + strip_non_letters(self.vectorizer)
@@ -228,6 +739,219 @@ class Embedder(VerbaComponent):
     def get_cache_class(self) -> str:
         return "Cache_" + strip_non_letters(self.vectorizer)
 
+    def get_corpus_version_uuid(self) -> str:
+        return generate_uuid5(self.get_cache_class(), "CorpusVersion")
+
+    def get_corpus_version(self, client: Client) -> int:
+        """Return the corpus version stored in Weaviate, read at most every corpus_version_ttl seconds
+        @parameter: client : Client - Weaviate Client
+        @returns int - Current corpus version.
+        """
+        with self.corpus_version_lock:
+            if time.monotonic() - self.corpus_version_read >= self.corpus_version_ttl:
+                try:
+                    stored = client.data_object.get_by_id(
+                        self.get_corpus_version_uuid(), class_name="CorpusVersion"
+                    )
+                    version = int(stored["properties"]["version"]) if stored else 0
+                    # A bump this process could not store stays in effect locally
+                    self.corpus_version = max(self.corpus_version or 0, version)
+                    self.corpus_version_read = time.monotonic()
+                except Exception as e:
+                    msg.warn(f"Could not read the corpus version: {str(e)}")
+                    if self.corpus_version is None:
+                        self.corpus_version = 0
+            return self.corpus_version
+
+    def bump_corpus_version(self, client: Client) -> int:
+        """Mark all cached answers as stale after documents were added, new documents can change the answer to any query.
+        The new version is stored before the stale entries are swept, an interrupted sweep leaves them stale
+        @parameter: client : Client - Weaviate Client
+        @returns int - New corpus version.
+        """
+        with self.corpus_version_lock:
+            self.corpus_version_read = float("-inf")
+        version = self.get_corpus_version(client) + 1
+
+        properties = {"cache_class": self.get_cache_class(), "version": version}
+        try:
+            if client.data_object.exists(
+                self.get_corpus_version_uuid(), class_name="CorpusVersion"
+            ):
+                client.data_object.update(
+                    properties, "CorpusVersion", self.get_corpus_version_uuid()
+                )
+            else:
+                client.data_object.create(
+                    properties, "CorpusVersion", uuid=self.get_corpus_version_uuid()
+                )
+        except Exception as e:
+            msg.warn(f"Could not store the corpus version: {str(e)}")
+
+        with self.corpus_version_lock:
+            self.corpus_version = max(self.corpus_version, version)
+            version = self.corpus_version
+        self.semantic_cache.clear()
+        # Remove the stale entries from Weaviate right away instead of waiting for the next sweep
+        self.maybe_evict_semantic_cache(client, force=True)
+        return version
+
+    def invalidate_semantic_cache(self, client: Client, doc_uuids: list[str]) -> int:
+        """Remove the cached answers that cite updated or removed documents, all other answers stay valid
+        @parameter: client : Client - Weaviate Client
+        @parameter: doc_uuids : list[str] - UUIDs of the touched documents
+        @returns int - Number of removed answers.
+        """
+        if len(doc_uuids) == 0:
+            return 0
+
+        cache_class_name = self.get_cache_class()
+        if self.write_behind is not None:
+            # Answers that are still queued would otherwise be written after the invalidation
+            self.write_behind.discard([cache_class_name], doc_uuids)
+        try:
+            queries = self.cache_evictor.invalidate(
+                client,
+                cache_class_name,
+                where={
+                    "path": ["doc_uuids"],
+                    "operator": "ContainsAny",
+                    "valueTextArray": list(doc_uuids),
+                },
+            )
+        except Exception as e:
+            # Answers citing the documents can't be told apart anymore, all of them become stale
+            msg.warn(f"Invalidation of {cache_class_name} failed: {str(e)}")
+            self.bump_corpus_version(client)
+            return 0
+
+        self.semantic_cache.remove(queries)
+        if len(queries) > 0:
+            msg.info(f"Removed {len(queries)} cached answers citing changed documents")
+        return len(queries)
+
+    def maybe_evict_semantic_cache(self, client: Client, force: bool = False) -> None:
+        """Start an eviction sweep of the Cache_* class in the background if one is due
+        @parameter: client : Client - Weaviate Client
+        @parameter: force : bool - Start a sweep even if the interval hasn't passed.
+        """
+        if self.cache_evictor.is_due(force):
+            threading.Thread(
+                target=self.evict_semantic_cache,
+                args=(client,),
+                name="verba-cache-eviction",
+                daemon=True,
+            ).start()
+
+    def evict_semantic_cache(self, client: Client) -> int:
+        """Write the hit counters and evict stale, expired and overflowing entries of the Cache_* class
+        @parameter: client : Client - Weaviate Client
+        @returns int - Number of evicted entries.
+        """
+        try:
+            queries = self.cache_evictor.evict(
+                client,
+                self.get_cache_class(),
+                self.get_corpus_version(client),
+            )
+        except Exception as e:
+            msg.warn(f"Eviction of {self.get_cache_class()} failed: {str(e)}")
+            return 0
+        self.semantic_cache.remove(queries)
+        return len(queries)
+
+    def get_local_index_path(self) -> str:
+        return os.path.join(
+            os.getenv("VERBA_LOCAL_INDEX_PATH", "verba_local_index"),
+            self.get_chunk_class(),
+        )
+
+    def get_local_index(self, client: Client) -> LocalIndex | None:
+        """Return the local index, it's loaded from disk on first use or rebuilt from Weaviate if it was never saved
+        @parameter: client : Client - Weaviate Client
+        @returns LocalIndex | None - The local index, None if it's disabled.
+        """
+        if not self.local_index_enabled:
+            return None
+
+        with self.local_index_lock:
+            if self.local_index is None:
+                local_index = LocalIndex(
+                    self.get_local_index_path(),
+                    ivf_min_rows=int(
+                        os.getenv("VERBA_LOCAL_INDEX_IVF_MIN_ROWS", "50000")
+                    ),
+                    nprobe=int(os.getenv("VERBA_LOCAL_INDEX_NPROBE", "8")),
+                )
+                if not local_index.exists():
+                    self.rebuild_local_index(client, local_index)
+                self.local_index = local_index
+            else:
+                # Picks up imports and deletes saved by other processes
+                self.local_index.refresh()
+            return self.local_index
+
+    def rebuild_local_index(
+        self, client: Client, local_index: LocalIndex, page_size: int = 1000
+    ) -> None:
+        """Fill a local index with all chunks stored in Weaviate, paged with a cursor
+        @parameter: client : Client - Weaviate Client
+        @parameter: local_index : LocalIndex - Index to fill
+        @parameter: page_size : int - Number of chunks per request.
+        """
+        chunk_class_name = self.get_chunk_class()
+        local_index.clear()
+
+        cursor = None
+        while True:
+            query = (
+                client.query.get(
+                    class_name=chunk_class_name,
+                    properties=[
+                        "text",
+                        "doc_name",
+                        "doc_type",
+                        "doc_uuid",
+                        "chunk_id",
+                        "token_count",
+                    ],
+                )
+                .with_additional(["id", "vector"])
+                .with_limit(page_size)
+            )
+            if cursor is not None:
+                query = query.with_after(cursor)
+
+            page = query.do()["data"]["Get"][chunk_class_name]
+            if not page:
+                break
+
+            vectors = [chunk["_additional"].get("vector") for chunk in page]
+            local_index.add(
+                [chunk["doc_uuid"] for chunk in page],
+                [chunk["doc_name"] for chunk in page],
+                [chunk["doc_type"] for chunk in page],
+                [int(chunk["chunk_id"]) for chunk in page],
+                [chunk["text"] for chunk in page],
+                np.asarray(vectors, dtype=np.float32)
+                if all(vector for vector in vectors)
+                else None,
+                [chunk.get("token_count") or 0 for chunk in page],
+            )
+            cursor = page[-1]["_additional"]["id"]
+
+        local_index.save()
+        msg.good(f"Rebuilt local index of {chunk_class_name} with {len(local_index)} chunks")
+
+    def clear_local_index(self) -> None:
+        """Remove the local index and its files, it's rebuilt from Weaviate on next use."""
+        with self.local_index_lock:
+            if self.local_index is not None:
+                self.local_index.clear()
+                self.local_index = None
+            if os.path.exists(self.get_local_index_path()):
+                shutil.rmtree(self.get_local_index_path())
+
     def search_documents(self, client: Client, query: str, doc_type: str) -> list:
         """Search for documents from Weaviate
         @parameter query_string : str - Search query
@@ -278,6 +1002,65 @@ class Embedder(VerbaComponent):
             "vectorize_query method must be implemented by a subclass."
         )
 
+    def get_query_vector(self, query: str) -> list[float]:
+        """Vectorize a query, repeated queries are served from the query cache
+        @parameter query : str - User query
+        @returns list[float] - Vector of the query.
+        """
+        vector = self.query_cache.get(query)
+        if vector is None:
+            vector = self.vectorize_query(query)
+            self.query_cache.set(query, vector)
+        return vector
+
+    def vectorize_queries(self, queries: list[str]) -> list[list[float]]:
+        """Vectorize many queries, embedders that support batching vectorize them in one forward pass
+        @parameter queries : list[str] - User queries
+        @returns list[list[float]] - One vector per query, in input order.
+        """
+        return [self.vectorize_query(query) for query in queries]
+
+    def get_query_vectors(self, queries: list[str]) -> list[list[float]]:
+        """Vectorize queries, cached queries are served from the query cache and the rest is vectorized in one batch
+        @parameter queries : list[str] - User queries
+        @returns list[list[float]] - One vector per query, in input order.
+        """
+        vectors = [self.query_cache.get(query) for query in queries]
+        missing = list(
+            dict.fromkeys(
+                query for query, vector in zip(queries, vectors) if vector is None
+            )
+        )
+
+        if len(missing) > 0:
+            missing_vectors = dict(zip(missing, self.vectorize_queries(missing)))
+            for query, vector in missing_vectors.items():
+                self.query_cache.set(query, vector)
+            vectors = [
+                vector if vector is not None else missing_vectors[query]
+                for query, vector in zip(queries, vectors)
+            ]
+
+        return vectors
+
+    def get_cache_stats(self) -> dict:
+        """
+        @returns dict - Statistics of the query and embedding caches.
+        """
+        return {
+            "query_cache": self.query_cache.get_stats(),
+            "chunk_cache": self.chunk_cache.get_stats(),
+            "semantic_cache": self.semantic_cache.get_stats(),
+            "semantic_cache_eviction": self.cache_evictor.get_stats(),
+            "semantic_cache_lookups": self.semantic_cache_metrics.get_stats(),
+            "local_index": self.local_index.get_stats()
+            if self.local_index is not None
+            else None,
+            "embedding_cache": self.embedding_cache.get_stats()
+            if self.embedding_cache is not None
+            else None,
+        }
+
     def conversation_to_query(self, queries: list[str], conversation: dict) -> str:
         query = ""
 
@@ -292,54 +1075,56 @@ class Embedder(VerbaComponent):
 
         return query.lower()
 
-    def retrieve_semantic_cache(
-        self, client: Client, query: str, dist: float = 0.04
-    ) -> str:
-        """Retrieve results from semantic cache based on query and distance threshold
-        @parameter query - str - User query
-        @parameter dist - float - Distance threshold
-        @returns Optional[dict] - List of results or None.
+    def get_semantic_cache_distance(self) -> float:
+        """Distance threshold of the semantic cache, VERBA_SEMANTIC_CACHE_DISTANCE_<EMBEDDER NAME> overrides VERBA_SEMANTIC_CACHE_DISTANCE
+        @returns float - Maximum cosine distance of a cached query that answers a new query.
         """
-        needs_vectorization = self.get_need_vectorization()
-
-        match_results = (
-            client.query.get(
-                class_name=self.get_cache_class(),
-                properties=["query", "system"],
-            )
-            .with_where(
-                {
-                    "path": ["query"],
-                    "operator": "Equal",
-                    "valueText": query,
-                }
+        if self.semantic_cache_distance is None:
+            self.semantic_cache_distance = float(
+                os.getenv(
+                    "VERBA_SEMANTIC_CACHE_DISTANCE_" + self.name.upper(),
+                    os.getenv("VERBA_SEMANTIC_CACHE_DISTANCE", "0.04"),
+                )
             )
-            .with_limit(1)
-        ).do()
+        return self.semantic_cache_distance
 
-        if "data" in match_results and len(match_results["data"]["Get"][self.get_cache_class()]) > 0 and (
-            query
-            == match_results["data"]["Get"][self.get_cache_class()][0]["query"]
-        ):
-            msg.good("Direct match from cache")
-            return (
-                match_results["data"]["Get"][self.get_cache_class()][0][
-                    "system"
-                ],
-                0.0,
-            )
+    def get_current_version_filter(self, client: Client) -> dict:
+        """
+        @parameter client : Client - Weaviate Client
+        @returns dict - Where filter for cache entries of the current corpus version.
+        """
+        return {
+            "path": ["corpus_version"],
+            "operator": "GreaterThanEqual",
+            "valueInt": self.get_corpus_version(client),
+        }
 
+    def get_nearest_cached_query(
+        self, client: Client, query: str, vector: list[float] = None
+    ) -> dict | None:
+        """Find the nearest cached query of the current corpus version in the Cache_* class
+        @parameter client : Client - Weaviate Client
+        @parameter query : str - User query
+        @parameter vector : list[float] - Query vector, only used by Embedders with custom vectors
+        @returns dict | None - Cached query, system message and _additional distance, None if the cache is empty.
+        """
+        needs_vectorization = self.get_need_vectorization()
         query_results = (
             client.query.get(
                 class_name=self.get_cache_class(),
                 properties=["query", "system"],
             )
-            .with_additional(properties=["distance"])
+            .with_additional(
+                properties=["distance", "vector"] if needs_vectorization else ["distance"]
+            )
+            # Answers generated before documents were added are ignored until the sweep removes them
+            .with_where(self.get_current_version_filter(client))
             .with_limit(1)
         )
 
         if needs_vectorization:
-            vector = self.vectorize_query(query)
+            if vector is None:
+                vector = self.get_query_vector(query)
             query_results = query_results.with_near_vector(
                 content={"vector": vector},
             ).do()
@@ -351,43 +1136,147 @@ class Embedder(VerbaComponent):
 
         if "data" not in query_results:
             msg.warn(query_results)
-            return None, None
+            return None
 
         results = query_results["data"]["Get"][self.get_cache_class()]
+        return results[0] if results else None
 
-        if not results:
-            return None, None
+    def retrieve_semantic_cache(
+        self, client: Client, query: str, dist: float = None
+    ) -> str:
+        """Retrieve results from semantic cache based on query and distance threshold
+        @parameter query - str - User query
+        @parameter dist - float - Distance threshold, defaults to the threshold of the embedder
+        @returns Optional[dict] - List of results or None.
+        """
+        start = time.monotonic()
+        if dist is None:
+            dist = self.get_semantic_cache_distance()
+        needs_vectorization = self.get_need_vectorization()
+        vector = self.get_query_vector(query) if needs_vectorization else None
+
+        cached_query, system, distance = self.semantic_cache.match(query, vector, dist)
+        if system is not None:
+            msg.good("Retrieved from local cache")
+            self.cache_evictor.record_hit(cached_query)
+            self.maybe_evict_semantic_cache(client)
+            self.semantic_cache_metrics.record_lookup(
+                True, distance, time.monotonic() - start, "local"
+            )
+            return system, distance
+
+        match_results = (
+            client.query.get(
+                class_name=self.get_cache_class(),
+                properties=["query", "system"],
+            )
+            .with_where(
+                {
+                    "operator": "And",
+                    "operands": [
+                        {
+                            "path": ["query"],
+                            "operator": "Equal",
+                            "valueText": query,
+                        },
+                        self.get_current_version_filter(client),
+                    ],
+                }
+            )
+            .with_limit(1)
+        ).do()
+
+        if "data" in match_results and len(match_results["data"]["Get"][self.get_cache_class()]) > 0 and (
+            query
+            == match_results["data"]["Get"][self.get_cache_class()][0]["query"]
+        ):
+            msg.good("Direct match from cache")
+            system = match_results["data"]["Get"][self.get_cache_class()][0]["system"]
+            self.semantic_cache.set(query, system, vector)
+            self.cache_evictor.record_hit(query)
+            self.maybe_evict_semantic_cache(client)
+            self.semantic_cache_metrics.record_lookup(
+                True, 0.0, time.monotonic() - start, "exact"
+            )
+            return system, 0.0
 
-        result = results[0]
+        result = self.get_nearest_cached_query(client, query, vector)
+        distance = (
+            float(result["_additional"]["distance"]) if result is not None else None
+        )
 
-        if float(result["_additional"]["distance"]) <= dist:
+        if distance is not None and distance <= dist:
             msg.good("Retrieved similar from cache")
-            return result["system"], float(result["_additional"]["distance"])
+            # Later lookups of similar queries are answered locally
+            self.semantic_cache.set(
+                result["query"], result["system"], result["_additional"].get("vector")
+            )
+            self.cache_evictor.record_hit(result["query"])
+            self.maybe_evict_semantic_cache(client)
+            self.semantic_cache_metrics.record_lookup(
+                True, distance, time.monotonic() - start, "similar"
+            )
+            return result["system"], distance
 
         else:
+            self.semantic_cache_metrics.record_lookup(
+                False, distance, time.monotonic() - start
+            )
             return None, None
 
-    def add_to_semantic_cache(self, client: Client, query: str, system: str):
+    def add_to_semantic_cache(
+        self,
+        client: Client,
+        query: str,
+        system: str,
+        write_behind=None,
+        doc_uuids: list[str] = None,
+        corpus_version: int = None,
+    ):
         """Add results to semantic cache
         @parameter query : str - User query
         @parameter results : list[dict] - Results from Weaviate
         @parameter system : str - System message
+        @parameter write_behind : WriteBehindQueue - Queue for the Weaviate write, None writes synchronously
+        @parameter doc_uuids : list[str] - Documents cited by the answer, the entry is removed when one of them changes
+        @parameter corpus_version : int - Corpus version the context was retrieved at, defaults to the current version
         @returns None.
         """
+        if corpus_version is None:
+            corpus_version = self.get_corpus_version(client)
+        if corpus_version < self.get_corpus_version(client):
+            # Documents were added while the answer was generated
+            return
+
         needs_vectorization = self.get_need_vectorization()
+        vector = self.get_query_vector(query) if needs_vectorization else None
+        self.semantic_cache.set(str(query), system, vector)
+
+        now = time.time()
+        properties = {
+            "query": str(query),
+            "system": system,
+            "created_at": now,
+            "last_hit": now,
+            "hit_count": 0,
+            "corpus_version": corpus_version,
+            "doc_uuids": sorted(set(doc_uuids or [])),
+        }
+        self.maybe_evict_semantic_cache(client)
+
+        if write_behind is not None:
+            write_behind.add(
+                self.get_cache_class(), properties, vector=vector, key=str(query)
+            )
+            return
 
         with client.batch as batch:
             batch.batch_size = 1
-            properties = {
-                "query": str(query),
-                "system": system,
-            }
             msg.good("Saved to cache")
 
-            if needs_vectorization:
-                vector = self.vectorize_query(query)
-                client.batch.add_data_object(
-                    properties, self.get_cache_class(), vector=vector
-                )
-            else:
-                client.batch.add_data_object(properties, self.get_cache_class())
+            client.batch.add_data_object(
+                properties,
+                self.get_cache_class(),
+                uuid=semantic_cache_uuid(query, self.get_cache_class()),
+                vector=vector,
+            )
@@ -0,0 +1,697 @@
+import contextlib
+import heapq
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from goldenverba.components.chunking.chunk import Chunk
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock, saves of several processes aren't serialized there
+    fcntl = None
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a text into lowercase word tokens for the BM25 index
+    @parameter: text : str - Text to tokenize
+    @returns list[str] - Tokens.
+    """
+    return re.findall(r"\w+", text.lower())
+
+
+def autocut(scores: list[float], cut_off: int) -> int:
+    """Count the results to keep. Like Weaviate's autocut, the results are cut before the cut_off-th jump
+    in the descending scores. Jumps are the local maxima of the normalized scores above a straight line.
+    @parameter: scores : list[float] - Scores sorted in descending order
+    @parameter: cut_off : int - Number of jumps to keep
+    @returns int - Number of results to keep.
+    """
+    if len(scores) <= 1 or scores[0] == scores[-1]:
+        return len(scores)
+
+    step = 1 / (len(scores) - 1)
+    diff = [
+        (score - scores[-1]) / (scores[0] - scores[-1]) - (1 - i * step)
+        for i, score in enumerate(scores)
+    ]
+
+    extrema = 0
+    for i in range(1, len(diff) - 1):
+        if diff[i] > diff[i - 1] and diff[i] > diff[i + 1]:
+            extrema += 1
+            if extrema >= cut_off:
+                return i + 1
+    return len(scores)
+
+
+def relative_score_fusion(
+    vector_scores: dict[int, float], keyword_scores: dict[int, float], alpha: float
+) -> list[tuple[int, float]]:
+    """Fuse vector and keyword results like Weaviate's relativeScore fusion. Each result set is min-max
+    normalized and the normalized scores are added with the weights alpha and 1 - alpha
+    @parameter: vector_scores : dict[int, float] - Vector search scores per row
+    @parameter: keyword_scores : dict[int, float] - BM25 scores per row
+    @parameter: alpha : float - Weight of the vector search, 1 is pure vector and 0 pure keyword search
+    @returns list[tuple[int, float]] - Rows with their fused score, best first.
+    """
+    fused: dict[int, float] = {}
+    for scores, weight in ((vector_scores, alpha), (keyword_scores, 1 - alpha)):
+        if len(scores) == 0 or weight == 0:
+            continue
+        lowest = min(scores.values())
+        score_range = max(scores.values()) - lowest
+        for row, score in scores.items():
+            normalized = (score - lowest) / score_range if score_range > 0 else 1.0
+            fused[row] = fused.get(row, 0.0) + weight * normalized
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def grow(buffer: np.ndarray, used: int, rows: int) -> np.ndarray:
+    """Make room for rows in a buffer. The capacity at least doubles when the buffer is full,
+    so a memory-mapped or full buffer is copied O(log N) times while rows are appended.
+    @parameter: buffer : np.ndarray - Buffer whose first used rows are in use
+    @parameter: used : int - Number of rows in use
+    @parameter: rows : int - Number of rows needed
+    @returns np.ndarray - The buffer if it is large enough and writable, a larger copy otherwise.
+    """
+    if len(buffer) >= rows and buffer.flags.writeable:
+        return buffer
+    grown = np.zeros((max(rows, 2 * len(buffer)), *buffer.shape[1:]), buffer.dtype)
+    grown[:used] = buffer[:used]
+    return grown
+
+
+class LocalIndex:
+    """
+    In-process hybrid index of the chunks of one chunk class.
+    Vectors are kept normalized in one float32 matrix that is memory-mapped when loaded from disk.
+    The matrix is a view of a buffer whose capacity grows geometrically, so appends are amortized O(1) per row.
+    Vector search is exhaustive, or IVF once the index holds ivf_min_rows chunks.
+    Keyword search uses an in-memory BM25 inverted index.
+    Removed chunks are tombstoned and compacted away once they make up half of the rows.
+    Saves are serialized across processes by a file lock. Every save writes a new version,
+    an index whose version is outdated reloads and replays its unsaved documents on top.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ivf_min_rows: int = 50000,
+        nprobe: int = 8,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.path = path
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+        # Documents added or removed since the last save, replayed when another process saved in between
+        self._added_docs: set[str] = set()
+        self._removed_docs: set[str] = set()
+        self._version: str | None = None
+
+        if self.exists():
+            self.load()
+
+    def _reset(self) -> None:
+        self.texts: list[str] = []
+        self.doc_names: list[str] = []
+        self.doc_types: list[str] = []
+        self.doc_uuids: list[str] = []
+        self.chunk_ids: list[int] = []
+        self.token_counts: list[int] = []
+        self.lengths: list[int] = []
+        # deleted and vectors are views of the first len(texts) rows of their buffers
+        self._deleted_buffer = np.zeros(0, dtype=bool)
+        self.deleted = self._deleted_buffer
+        # Normalized vectors, None while no chunk came with a vector
+        self._vector_buffer: np.ndarray | None = None
+        self.vectors: np.ndarray | None = None
+        self.postings: dict[str, dict[int, int]] = {}
+        self.live_rows = 0
+        self.total_length = 0
+        self._doc_rows: dict[str, list[int]] = {}
+        self._centroids: np.ndarray | None = None
+        self._lists: list[list[int]] | None = None
+        self._trained_rows = 0
+
+    def __len__(self) -> int:
+        return self.live_rows
+
+    def add(
+        self,
+        doc_uuids: list[str],
+        doc_names: list[str],
+        doc_types: list[str],
+        chunk_ids: list[int],
+        texts: list[str],
+        vectors: np.ndarray | None = None,
+        token_counts: list[int] | None = None,
+    ) -> None:
+        """Add chunks to the index, all arguments hold one value per chunk
+        @parameter: doc_uuids : list[str] - UUIDs of the documents
+        @parameter: doc_names : list[str] - Names of the documents
+        @parameter: doc_types : list[str] - Types of the documents
+        @parameter: chunk_ids : list[int] - Chunk ids within their document
+        @parameter: texts : list[str] - Chunk texts
+        @parameter: vectors : np.ndarray | None - (N, d) vectors, None for chunks vectorized by Weaviate
+        @parameter: token_counts : list[int] | None - Token counts of the chunks, 0 if unknown.
+        """
+        with self._lock:
+            self._added_docs.update(doc_uuids)
+            self._add(
+                doc_uuids, doc_names, doc_types, chunk_ids, texts, vectors, token_counts
+            )
+
+    def _add(
+        self,
+        doc_uuids: list[str],
+        doc_names: list[str],
+        doc_types: list[str],
+        chunk_ids: list[int],
+        texts: list[str],
+        vectors: np.ndarray | None = None,
+        token_counts: list[int] | None = None,
+    ) -> None:
+        with self._lock:
+            start = len(self.texts)
+            self._append_vectors(vectors, len(texts))
+
+            for offset, text in enumerate(texts):
+                row = start + offset
+                terms = Counter(tokenize(text))
+                for term, frequency in terms.items():
+                    self.postings.setdefault(term, {})[row] = frequency
+                length = sum(terms.values())
+                self.lengths.append(length)
+                self.total_length += length
+                self._doc_rows.setdefault(doc_uuids[offset], []).append(row)
+
+            self.texts.extend(texts)
+            self.doc_names.extend(str(doc_name) for doc_name in doc_names)
+            self.doc_types.extend(doc_types)
+            self.doc_uuids.extend(doc_uuids)
+            self.chunk_ids.extend(int(chunk_id) for chunk_id in chunk_ids)
+            self.token_counts.extend(
+                [int(count) for count in token_counts]
+                if token_counts is not None
+                else [0] * len(texts)
+            )
+            self._deleted_buffer = grow(self._deleted_buffer, start, len(self.texts))
+            self._deleted_buffer[start:] = False
+            self.deleted = self._deleted_buffer[: len(self.texts)]
+            self.live_rows += len(texts)
+
+            if self._lists is not None and self.vectors is not None and len(texts) > 0:
+                assignments = np.argmax(
+                    self.vectors[start:] @ self._centroids.T, axis=1
+                )
+                for row, list_id in zip(range(start, len(self.texts)), assignments):
+                    self._lists[list_id].append(row)
+
+    def _append_vectors(self, vectors: np.ndarray | None, count: int) -> None:
+        start = len(self.texts)
+        if count == 0 or (vectors is None and self.vectors is None):
+            return
+
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(count, -1)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+
+            if self.vectors is None:
+                # Chunks added without vectors never match a vector search
+                self._vector_buffer = np.zeros((start, vectors.shape[1]), np.float32)
+            elif self.vectors.shape[1] != vectors.shape[1]:
+                raise ValueError(
+                    f"Expected vectors with {self.vectors.shape[1]} dimensions, got {vectors.shape[1]}"
+                )
+
+        self._vector_buffer = grow(self._vector_buffer, start, start + count)
+        self._vector_buffer[start : start + count] = 0 if vectors is None else vectors
+        self.vectors = self._vector_buffer[: start + count]
+
+    def add_document(
+        self,
+        doc_uuid: str,
+        doc_name: str,
+        doc_type: str,
+        chunk_ids: list[int],
+        texts: list[str],
+        vectors: np.ndarray | None = None,
+        token_counts: list[int] | None = None,
+    ) -> None:
+        """Add all chunks of one document
+        @parameter: doc_uuid : str - UUID of the document
+        @parameter: doc_name : str - Name of the document
+        @parameter: doc_type : str - Type of the document
+        @parameter: chunk_ids : list[int] - Chunk ids
+        @parameter: texts : list[str] - Chunk texts
+        @parameter: vectors : np.ndarray | None - (N, d) vectors of the chunks
+        @parameter: token_counts : list[int] | None - Token counts of the chunks.
+        """
+        count = len(texts)
+        self.add(
+            [doc_uuid] * count,
+            [doc_name] * count,
+            [doc_type] * count,
+            chunk_ids,
+            texts,
+            vectors,
+            token_counts,
+        )
+
+    def update_document(
+        self,
+        doc_uuid: str,
+        doc_name: str,
+        doc_type: str,
+        chunk_ids: list[int],
+        texts: list[str],
+        vectors: list[np.ndarray | None],
+        token_counts: list[int] | None = None,
+    ) -> None:
+        """Replace the chunks of a document. Chunks without a vector reuse the vector of a stored chunk with the same text
+        @parameter: doc_uuid : str - UUID of the document
+        @parameter: doc_name : str - Name of the document
+        @parameter: doc_type : str - Type of the document
+        @parameter: chunk_ids : list[int] - Chunk ids of the new version
+        @parameter: texts : list[str] - Chunk texts of the new version
+        @parameter: vectors : list[np.ndarray | None] - Vector per chunk, None for unchanged chunks
+        @parameter: token_counts : list[int] | None - Token counts of the chunks.
+        """
+        with self._lock:
+            stored_vectors = {}
+            if self.vectors is not None:
+                for row in self._doc_rows.get(doc_uuid, []):
+                    stored_vectors[self.texts[row]] = self.vectors[row]
+
+            matrix = None
+            if self.vectors is not None or any(v is not None for v in vectors):
+                dimensions = (
+                    self.vectors.shape[1]
+                    if self.vectors is not None
+                    else len(next(v for v in vectors if v is not None))
+                )
+                matrix = np.zeros((len(texts), dimensions), np.float32)
+                for row, (text, vector) in enumerate(zip(texts, vectors)):
+                    if vector is None:
+                        vector = stored_vectors.get(text)
+                    if vector is not None:
+                        matrix[row] = vector
+
+            self.remove_document(doc_uuid)
+            self.add_document(
+                doc_uuid, doc_name, doc_type, chunk_ids, texts, matrix, token_counts
+            )
+
+    def remove_document(self, doc_uuid: str) -> None:
+        """
+        @parameter: doc_uuid : str - UUID of the document whose chunks are removed.
+        """
+        with self._lock:
+            self._added_docs.discard(doc_uuid)
+            self._removed_docs.add(doc_uuid)
+            self._delete_rows(self._doc_rows.pop(doc_uuid, []))
+
+    def remove_document_name(self, doc_name: str) -> None:
+        """
+        @parameter: doc_name : str - Name of the documents whose chunks are removed.
+        """
+        with self._lock:
+            doc_uuids = [
+                doc_uuid
+                for doc_uuid, rows in self._doc_rows.items()
+                if self.doc_names[rows[0]] == doc_name
+            ]
+            for doc_uuid in doc_uuids:
+                self.remove_document(doc_uuid)
+
+    def _delete_rows(self, rows: list[int]) -> None:
+        for row in rows:
+            if self.deleted[row]:
+                continue
+            self.deleted[row] = True
+            for term in set(tokenize(self.texts[row])):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(row, None)
+                    if len(postings) == 0:
+                        del self.postings[term]
+            self.total_length -= self.lengths[row]
+            self.live_rows -= 1
+
+        if len(self.texts) - self.live_rows > self.live_rows:
+            self._compact()
+
+    def _columns(self, rows) -> tuple:
+        """
+        @parameter: rows : list[int] - Rows to copy
+        @returns tuple - Arguments for add with the chunks of the rows.
+        """
+        return (
+            [self.doc_uuids[row] for row in rows],
+            [self.doc_names[row] for row in rows],
+            [self.doc_types[row] for row in rows],
+            [self.chunk_ids[row] for row in rows],
+            [self.texts[row] for row in rows],
+            self.vectors[rows] if self.vectors is not None else None,
+            [self.token_counts[row] for row in rows],
+        )
+
+    def _compact(self) -> None:
+        """Rebuild the index from the live rows, row numbers change but the IVF centroids are kept."""
+        columns = self._columns(np.flatnonzero(~self.deleted))
+        centroids, trained_rows = self._centroids, self._trained_rows
+        self._reset()
+        self._add(*columns)
+        if centroids is not None:
+            self._assign_lists(centroids)
+            self._trained_rows = trained_rows
+
+    def search_vector(self, vector, limit: int) -> dict[int, float]:
+        """
+        @parameter: vector : list[float] - Query vector
+        @parameter: limit : int - Maximum number of results
+        @returns dict[int, float] - Cosine similarity per row of the best matches.
+        """
+        if self.vectors is None or self.live_rows == 0:
+            return {}
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        if self._lists is not None:
+            probed = np.argsort(-(self._centroids @ query))[: self.nprobe]
+            candidates = np.concatenate(
+                [np.asarray(self._lists[list_id], dtype=np.int64) for list_id in probed]
+            )
+        else:
+            candidates = np.arange(len(self.texts))
+        candidates = candidates[~self.deleted[candidates]]
+        if len(candidates) == 0:
+            return {}
+
+        scores = self.vectors[candidates] @ query
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        return dict(zip(candidates.tolist(), scores.tolist()))
+
+    def train(self) -> None:
+        """Train IVF once the index is large enough and retrain it when it doubled since.
+        Runs when the index is saved or loaded, searches never train.
+        """
+        with self._lock:
+            if self.vectors is None:
+                return
+            if (self._lists is None and self.live_rows >= self.ivf_min_rows) or (
+                self._lists is not None and self.live_rows > 2 * self._trained_rows
+            ):
+                self._train_ivf()
+
+    def _train_ivf(self) -> None:
+        """Cluster the live vectors with spherical k-means into sqrt(N) inverted lists."""
+        live = np.flatnonzero(~self.deleted)
+        n_lists = max(1, int(math.sqrt(len(live))))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[
+            np.sort(rng.choice(live, min(len(live), n_lists * 64), replace=False))
+        ]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(10):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = sample[assignments == list_id]
+                if len(members) > 0:
+                    centroid = members.sum(axis=0)
+                    centroids[list_id] = centroid / max(
+                        float(np.linalg.norm(centroid)), 1e-12
+                    )
+
+        self._assign_lists(centroids)
+        self._trained_rows = len(live)
+
+    def _assign_lists(self, centroids: np.ndarray) -> None:
+        """
+        @parameter: centroids : np.ndarray - (n_lists, d) normalized centroids the live rows are assigned to.
+        """
+        live = np.flatnonzero(~self.deleted)
+        lists = [[] for _ in range(len(centroids))]
+        for start in range(0, len(live), 65536):
+            rows = live[start : start + 65536]
+            for row, list_id in zip(
+                rows.tolist(), np.argmax(self.vectors[rows] @ centroids.T, axis=1)
+            ):
+                lists[list_id].append(row)
+
+        self._centroids = centroids
+        self._lists = lists
+
+    def search_keyword(self, query: str, limit: int) -> dict[int, float]:
+        """
+        @parameter: query : str - Keyword query
+        @parameter: limit : int - Maximum number of results
+        @returns dict[int, float] - BM25 score per row of the best matches.
+        """
+        if self.live_rows == 0:
+            return {}
+
+        average_length = max(self.total_length / self.live_rows, 1e-12)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(
+                1 + (self.live_rows - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for row, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[row] / average_length)
+                scores[row] = scores.get(row, 0.0) + idf * frequency * (
+                    self.k1 + 1
+                ) / (frequency + norm)
+
+        return dict(heapq.nlargest(limit, scores.items(), key=lambda item: item[1]))
+
+    def hybrid_search(
+        self,
+        query: str,
+        vector=None,
+        limit: int = 100,
+        alpha: float = 0.75,
+        autocut_limit: int = 2,
+    ) -> list[Chunk]:
+        """Search vectors and keywords and fuse the results by relative score
+        @parameter: query : str - User query
+        @parameter: vector : list[float] | None - Query vector, keyword search only if None
+        @parameter: limit : int - Maximum number of results of each search
+        @parameter: alpha : float - Weight of the vector search
+        @parameter: autocut_limit : int - Number of score jumps to keep, 0 disables autocut
+        @returns list[Chunk] - Retrieved chunks with their fused score, best first.
+        """
+        with self._lock:
+            vector_scores = (
+                self.search_vector(vector, limit) if vector is not None else {}
+            )
+            if vector is None or self.vectors is None:
+                alpha = 0.0
+            results = relative_score_fusion(
+                vector_scores, self.search_keyword(query, limit), alpha
+            )
+            if autocut_limit > 0:
+                results = results[: autocut([score for _, score in results], autocut_limit)]
+
+            chunks = []
+            for row, score in results:
+                chunk = Chunk(
+                    self.texts[row],
+                    self.doc_names[row],
+                    self.doc_types[row],
+                    self.doc_uuids[row],
+                    self.chunk_ids[row],
+                )
+                chunk.set_score(score)
+                chunk.set_tokens(self.token_counts[row])
+                chunks.append(chunk)
+            return chunks
+
+    def exists(self) -> bool:
+        return self.path is not None and os.path.exists(
+            os.path.join(self.path, "chunks.json")
+        )
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on the index files, shared by all processes using the path."""
+        Path(self.path).mkdir(parents=True, exist_ok=True)
+        with open(os.path.join(self.path, "index.lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Closing the file releases the lock
+            yield
+
+    def _stored_version(self) -> str | None:
+        """
+        @returns str | None - Version of the saved index, None if it has none.
+        """
+        try:
+            with open(os.path.join(self.path, "version")) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _reload(self) -> None:
+        """Load the saved index and replay the documents added or removed here since the last save."""
+        added = self._columns(
+            [
+                row
+                for doc_uuid in self._added_docs
+                for row in self._doc_rows.get(doc_uuid, [])
+            ]
+        )
+        added_docs, removed_docs = self._added_docs, self._removed_docs
+        self.load()
+        for doc_uuid in removed_docs | added_docs:
+            self._delete_rows(self._doc_rows.pop(doc_uuid, []))
+        self._add(*added)
+        self._added_docs, self._removed_docs = added_docs, removed_docs
+
+    def refresh(self) -> bool:
+        """Reload the index if another process saved it since it was loaded or saved here.
+        Only the small version file is read while nothing changed.
+        @returns bool - Whether the index was reloaded.
+        """
+        if self.path is None:
+            return False
+
+        with self._lock:
+            if self._stored_version() in (None, self._version):
+                return False
+            with self._file_lock():
+                if self._stored_version() in (None, self._version):
+                    return False
+                self._reload()
+                return True
+
+    def save(self) -> None:
+        """Write the index to its path and train IVF if it grew enough.
+        Unsaved documents are replayed on the saved index first if another process saved since.
+        """
+        if self.path is None:
+            self.train()
+            return
+
+        with self._lock, self._file_lock():
+            if self._stored_version() not in (None, self._version):
+                self._reload()
+            if len(self._added_docs) == 0 and len(self._removed_docs) == 0:
+                return
+
+            if self.live_rows < len(self.texts):
+                self._compact()
+            self.train()
+
+            # The written buffers stay in use, appends after a save don't copy the vectors
+            vectors_path = os.path.join(self.path, "vectors.npy")
+            if self.vectors is not None:
+                np.save(vectors_path + ".tmp.npy", self.vectors)
+                Path(vectors_path + ".tmp.npy").replace(vectors_path)
+            elif os.path.exists(vectors_path):
+                os.remove(vectors_path)
+
+            centroids_path = os.path.join(self.path, "centroids.npy")
+            if self._centroids is not None:
+                np.save(centroids_path + ".tmp.npy", self._centroids)
+                Path(centroids_path + ".tmp.npy").replace(centroids_path)
+            elif os.path.exists(centroids_path):
+                os.remove(centroids_path)
+
+            chunks_path = os.path.join(self.path, "chunks.json")
+            with open(chunks_path + ".tmp", "w") as f:
+                json.dump(
+                    {
+                        "doc_uuids": self.doc_uuids,
+                        "doc_names": self.doc_names,
+                        "doc_types": self.doc_types,
+                        "chunk_ids": self.chunk_ids,
+                        "texts": self.texts,
+                        "token_counts": self.token_counts,
+                        "trained_rows": self._trained_rows,
+                    },
+                    f,
+                )
+            Path(chunks_path + ".tmp").replace(chunks_path)
+
+            # The version is written last, other processes reload once it changed
+            version_path = os.path.join(self.path, "version")
+            with open(version_path + ".tmp", "w") as f:
+                f.write(uuid.uuid4().hex)
+            Path(version_path + ".tmp").replace(version_path)
+            self._version = self._stored_version()
+            self._added_docs, self._removed_docs = set(), set()
+
+    def load(self) -> None:
+        """Load the index from its path, the vectors stay on disk as a memory map."""
+        with self._lock:
+            self._reset()
+            self._added_docs, self._removed_docs = set(), set()
+            self._version = self._stored_version()
+            with open(os.path.join(self.path, "chunks.json")) as f:
+                columns = json.load(f)
+            self._add(
+                columns["doc_uuids"],
+                columns["doc_names"],
+                columns["doc_types"],
+                columns["chunk_ids"],
+                columns["texts"],
+                token_counts=columns.get("token_counts"),
+            )
+
+            vectors_path = os.path.join(self.path, "vectors.npy")
+            if os.path.exists(vectors_path):
+                self.vectors = np.load(vectors_path, mmap_mode="r")
+                self._vector_buffer = self.vectors
+
+            centroids_path = os.path.join(self.path, "centroids.npy")
+            if self.vectors is not None and os.path.exists(centroids_path):
+                self._assign_lists(np.load(centroids_path))
+                self._trained_rows = columns.get("trained_rows", self.live_rows)
+            self.train()
+
+    def clear(self) -> None:
+        """Remove all chunks and the files of the index."""
+        with self._lock:
+            self._reset()
+            self._added_docs, self._removed_docs = set(), set()
+            self._version = None
+            if self.path is not None and os.path.exists(self.path):
+                shutil.rmtree(self.path)
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Number of chunks, documents and terms and whether IVF is used.
+        """
+        with self._lock:
+            return {
+                "chunks": self.live_rows,
+                "documents": len(self._doc_rows),
+                "terms": len(self.postings),
+                "dimensions": self.vectors.shape[1] if self.vectors is not None else 0,
+                "ivf_lists": len(self._lists) if self._lists is not None else 0,
+            }
@@ -1,6 +1,7 @@
 from wasabi import msg
 from weaviate import Client
 
+from goldenverba.components.chunking.batch import ChunkBatch
 from goldenverba.components.embedding.ADAEmbedder import ADAEmbedder
 from goldenverba.components.embedding.CohereEmbedder import CohereEmbedder
 from goldenverba.components.embedding.interface import Embedder
@@ -28,6 +29,14 @@ class EmbeddingManager:
         """
         return self.selected_embedder.embed(documents, client)
 
+    def embed_batch(self, chunk_batch: ChunkBatch, client: Client) -> bool:
+        """Embed a columnar chunk batch and its documents to Weaviate
+        @parameter: chunk_batch : ChunkBatch - Chunks of the documents
+        @parameter: client : Client - Weaviate Client
+        @returns bool - Bool whether the embedding what successful.
+        """
+        return self.selected_embedder.embed_batch(chunk_batch, client)
+
     def set_embedder(self, embedder: str) -> bool:
         if embedder in self.embedders:
             self.selected_embedder = self.embedders[embedder]
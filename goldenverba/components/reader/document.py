@@ -1,7 +1,22 @@
-from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.chunking.chunk import Chunk, content_hash
 
 
 class Document:
+    # Slots instead of a per-instance __dict__ keep large imports compact
+    __slots__ = (
+        "_text",
+        "_type",
+        "_name",
+        "_path",
+        "_link",
+        "_timestamp",
+        "_reader",
+        "_meta",
+        "chunks",
+        "_doc_hash",
+        "_chunking",
+    )
+
     def __init__(
         self,
         text: str = "",
@@ -24,11 +39,36 @@ class Document:
         self._reader = reader
         self._meta = meta
         self.chunks: list[Chunk] = []
+        self._doc_hash = None
+        self._chunking = ""
 
     @property
     def text(self):
         return self._text
 
+    @text.setter
+    def text(self, text: str):
+        self._text = text
+        self._doc_hash = None
+
+    @property
+    def doc_hash(self):
+        if self._doc_hash is None:
+            self._doc_hash = content_hash(self._text)
+        return self._doc_hash
+
+    @property
+    def chunk_count(self):
+        return len(self.chunks)
+
+    @property
+    def chunking(self):
+        return self._chunking
+
+    @chunking.setter
+    def chunking(self, chunking: str):
+        self._chunking = chunking
+
     @property
     def type(self):
         return self._type
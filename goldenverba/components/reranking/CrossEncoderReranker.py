@@ -0,0 +1,78 @@
+import os
+import threading
+
+from wasabi import msg
+
+from goldenverba.components.reranking.interface import Reranker
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    CrossEncoderReranker for Verba.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.name = "CrossEncoderReranker"
+        self.requires_library = ["torch", "transformers"]
+        self.description = "Reranks retrieved chunks with the local cross-encoder ms-marco-MiniLM-L-6-v2"
+        self.model_id = os.getenv(
+            "VERBA_RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        )
+        self.model = None
+        self.tokenizer = None
+        self.device = None
+        self.failed = False
+        # Guards loading and the tokenizer, fast tokenizers can't be shared between threads
+        self.lock = threading.Lock()
+
+    def load(self) -> bool:
+        with self.lock:
+            if self.model is not None or self.failed:
+                return self.model is not None
+
+            try:
+                import torch
+                from transformers import (
+                    AutoModelForSequenceClassification,
+                    AutoTokenizer,
+                )
+
+                if torch.cuda.is_available():
+                    self.device = torch.device("cuda")
+                elif torch.backends.mps.is_available():
+                    self.device = torch.device("mps")
+                else:
+                    self.device = torch.device("cpu")
+
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+                model = AutoModelForSequenceClassification.from_pretrained(
+                    self.model_id
+                )
+                self.model = model.to(self.device).eval()
+                return True
+
+            except Exception as e:
+                # Retrieval keeps working with the fused scores
+                msg.warn(f"Could not load reranker {self.model_id}: {str(e)}")
+                self.failed = True
+                return False
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        import torch
+
+        with self.lock:
+            encoded = self.tokenizer(
+                [query for query, _ in pairs],
+                [text for _, text in pairs],
+                padding=True,
+                truncation=True,
+                return_tensors="pt",
+            )
+        encoded = {key: value.to(self.device) for key, value in encoded.items()}
+
+        with torch.no_grad():
+            logits = self.model(**encoded).logits
+
+        # Single-logit relevance models, the sigmoid maps the logit to a score between 0 and 1
+        return torch.sigmoid(logits[:, 0]).tolist()
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+
+class RerankScoreCache:
+    """
+    Bounded, thread-safe in-process LRU cache for reranker scores keyed by (query hash, chunk hash).
+    Chunks are identified by their content hash, so updated chunks never reuse a stale score.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def get(self, query_hash: str, chunk_hash: str) -> float | None:
+        """
+        @parameter: query_hash : str - Hash of the query
+        @parameter: chunk_hash : str - Content hash of the chunk
+        @returns float | None - Cached score or None if missing.
+        """
+        key = (query_hash, chunk_hash)
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def set(self, query_hash: str, chunk_hash: str, score: float) -> None:
+        """
+        @parameter: query_hash : str - Hash of the query
+        @parameter: chunk_hash : str - Content hash of the chunk
+        @parameter: score : float - Reranker score of the pair.
+        """
+        if self.max_entries < 1:
+            return
+
+        key = (query_hash, chunk_hash)
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Hit, miss and eviction counters and the number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self) -> None:
+        """Remove all cached scores."""
+        with self._lock:
+            self._entries.clear()
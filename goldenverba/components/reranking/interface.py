@@ -0,0 +1,109 @@
+import os
+import time
+
+from wasabi import msg
+
+from goldenverba.components.chunking.chunk import Chunk, content_hash
+from goldenverba.components.component import VerbaComponent
+from goldenverba.components.reranking.cache import RerankScoreCache
+
+
+class Reranker(VerbaComponent):
+    """
+    Interface for Verba Rerankers.
+    Candidates are scored in batches in the order of their fused retrieval score until the latency budget is used up,
+    candidates that weren't scored keep their fused order behind the reranked ones.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Number of candidates by fused score that are reranked
+        self.candidates = int(os.getenv("VERBA_RERANKER_CANDIDATES", "20"))
+        # Number of reranked chunks passed on to the context
+        self.top_k = int(os.getenv("VERBA_RERANKER_TOP_K", "5"))
+        self.budget_ms = float(os.getenv("VERBA_RERANKER_BUDGET_MS", "250"))
+        self.batch_size = int(os.getenv("VERBA_RERANKER_BATCH_SIZE", "16"))
+        self.score_cache = RerankScoreCache(
+            max_entries=int(os.getenv("VERBA_RERANKER_CACHE_SIZE", "10000"))
+        )
+        # Moving average of the scoring time per pair, used to skip batches that would exceed the budget
+        self.seconds_per_pair: float = None
+
+    def load(self) -> bool:
+        """Load the model on first use
+        @returns bool - Whether the reranker can score pairs.
+        """
+        return True
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """Score the relevance of chunk texts to queries
+        @parameter: pairs : list[tuple[str, str]] - (query, chunk text) pairs
+        @returns list[float] - Relevance between 0 and 1 per pair.
+        """
+        raise NotImplementedError(
+            "score_pairs method must be implemented by a subclass."
+        )
+
+    def rerank(self, queries: list[str], chunks: list[Chunk]) -> list[Chunk]:
+        """Rerank the top candidates of a retrieval, a chunk's score is its best score over all queries
+        @parameter: queries : list[str] - List of queries
+        @parameter: chunks : list[Chunk] - Retrieved chunks with their fused score
+        @returns list[Chunk] - The top_k chunks by relevance, reranked chunks carry their reranker score.
+        """
+        candidates = sorted(chunks, key=lambda chunk: chunk.score, reverse=True)[
+            : self.candidates
+        ]
+        if len(candidates) == 0 or not self.load():
+            return candidates[: self.top_k]
+
+        query_hashes = {query: content_hash(query) for query in queries}
+        chunk_hashes = [chunk.chunk_hash for chunk in candidates]
+        scores: dict[int, float] = {}
+        pending = []
+        for index, chunk_hash in enumerate(chunk_hashes):
+            for query, query_hash in query_hashes.items():
+                score = self.score_cache.get(query_hash, chunk_hash)
+                if score is None:
+                    pending.append((index, query))
+                else:
+                    scores[index] = max(scores.get(index, 0.0), score)
+
+        start = time.monotonic()
+        for batch_start in range(0, len(pending), self.batch_size):
+            batch = pending[batch_start : batch_start + self.batch_size]
+            elapsed = time.monotonic() - start
+            if (
+                self.seconds_per_pair is not None
+                and (elapsed + self.seconds_per_pair * len(batch)) * 1000 > self.budget_ms
+            ):
+                msg.warn(
+                    f"Reranking budget of {self.budget_ms}ms exceeded, {len(pending) - batch_start} pairs keep their fused order"
+                )
+                break
+
+            batch_scores = self.score_pairs(
+                [(query, candidates[index].text) for index, query in batch]
+            )
+            for (index, query), score in zip(batch, batch_scores):
+                self.score_cache.set(query_hashes[query], chunk_hashes[index], score)
+                scores[index] = max(scores.get(index, 0.0), score)
+
+            batch_seconds = (time.monotonic() - start - elapsed) / len(batch)
+            self.seconds_per_pair = (
+                batch_seconds
+                if self.seconds_per_pair is None
+                else 0.8 * self.seconds_per_pair + 0.2 * batch_seconds
+            )
+
+        for index, score in scores.items():
+            candidates[index].set_score(score)
+
+        reranked = sorted(scores, key=scores.get, reverse=True)
+        unscored = [index for index in range(len(candidates)) if index not in scores]
+        return [candidates[index] for index in reranked + unscored][: self.top_k]
+
+    def get_cache_stats(self) -> dict:
+        """
+        @returns dict - Statistics of the score cache.
+        """
+        return {"score_cache": self.score_cache.get_stats()}
@@ -0,0 +1,73 @@
+
+from wasabi import msg
+from weaviate import Client
+
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.embedding.interface import Embedder
+from goldenverba.components.retriever.interface import Retriever
+
+
+class LocalRetriever(Retriever):
+    """
+    LocalRetriever that retrieves chunks through hybrid search on the embedder's in-process index instead of Weaviate.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.description = "LocalRetriever uses Hybrid Search on an in-process index to retrieve relevant chunks without a round trip to Weaviate"
+        self.name = "LocalRetriever"
+
+    def retrieve(
+        self,
+        queries: list[str],
+        client: Client,
+        embedder: Embedder,
+        token_budget: int | None = None,
+        vectors: list | None = None,
+    ) -> list[Chunk]:
+        """Ingest data into Weaviate
+        @parameter: queries : list[str] - List of queries
+        @parameter: client : Client - Weaviate client
+        @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @parameter: vectors : list | None - Query vectors computed by the caller, vectorized here if None
+        @returns list[Chunk] - List of retrieved chunks.
+        """
+        chunks = self.hybrid_search(queries, client, embedder, vectors)
+
+        sorted_chunks = self.rank_chunks(queries, chunks)
+
+        context = self.assemble_context(sorted_chunks, token_budget)
+
+        return sorted_chunks, context
+
+    def hybrid_search(
+        self,
+        queries: list[str],
+        client: Client,
+        embedder: Embedder,
+        vectors: list | None = None,
+    ) -> list[Chunk]:
+        """Run a hybrid search with relative score fusion and autocut on the local index for every query
+        @parameter: queries : list[str] - List of queries
+        @parameter: client : Client - Weaviate client, only used to build the index on first use
+        @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: vectors : list | None - Query vectors computed by the caller, vectorized here if None
+        @returns list[Chunk] - Retrieved chunks, unique by doc_uuid and chunk_id with their best score.
+        """
+        local_index = embedder.get_local_index(client)
+        if local_index is None:
+            msg.warn("Local index is disabled (VERBA_LOCAL_INDEX), searching Weaviate")
+            return super().hybrid_search(queries, client, embedder, vectors)
+
+        if vectors is None:
+            vectors = self.get_query_vectors(queries, embedder)
+
+        chunks: dict[tuple[str, int], Chunk] = {}
+        for query, vector in zip(queries, vectors):
+            for chunk in local_index.hybrid_search(query, vector):
+                key = (chunk.doc_uuid, int(chunk.chunk_id))
+                if key not in chunks or chunks[key].score < chunk.score:
+                    chunks[key] = chunk
+
+        return list(chunks.values())
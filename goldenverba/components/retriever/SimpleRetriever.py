@@ -1,5 +1,5 @@
+
 from weaviate import Client
-from weaviate.gql.get import HybridFusion
 
 from goldenverba.components.chunking.chunk import Chunk
 from goldenverba.components.embedding.interface import Embedder
@@ -21,68 +21,21 @@ class SimpleRetriever(Retriever):
         queries: list[str],
         client: Client,
         embedder: Embedder,
+        token_budget: int | None = None,
+        vectors: list | None = None,
     ) -> list[Chunk]:
         """Ingest data into Weaviate
         @parameter: queries : list[str] - List of queries
         @parameter: client : Client - Weaviate client
         @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @parameter: vectors : list | None - Query vectors computed by the caller, vectorized here if None
         @returns list[Chunk] - List of retrieved chunks.
         """
-        chunk_class = embedder.get_chunk_class()
-        needs_vectorization = embedder.get_need_vectorization()
-        chunks = []
-
-        for query in queries:
-            query_results = (
-                client.query.get(
-                    class_name=chunk_class,
-                    properties=[
-                        "text",
-                        "doc_name",
-                        "chunk_id",
-                        "doc_uuid",
-                        "doc_type",
-                    ],
-                )
-                .with_additional(properties=["score"])
-                .with_autocut(2)
-            )
-
-            if needs_vectorization:
-                vector = embedder.vectorize_query(query)
-                query_results = query_results.with_hybrid(
-                    query=query,
-                    vector=vector,
-                    fusion_type=HybridFusion.RELATIVE_SCORE,
-                    properties=[
-                        "text",
-                    ],
-                ).do()
-
-            else:
-                query_results = query_results.with_hybrid(
-                    query=query,
-                    fusion_type=HybridFusion.RELATIVE_SCORE,
-                    properties=[
-                        "text",
-                    ],
-                ).do()
-
-            for chunk in query_results["data"]["Get"][chunk_class]:
-                chunk_obj = Chunk(
-                    chunk["text"],
-                    chunk["doc_name"],
-                    chunk["doc_type"],
-                    chunk["doc_uuid"],
-                    chunk["chunk_id"],
-                )
-                chunk_obj.set_score(chunk["_additional"]["score"])
-                chunks.append(chunk_obj)
+        chunks = self.hybrid_search(queries, client, embedder, vectors)
 
-        sorted_chunks = self.sort_chunks(chunks)
+        sorted_chunks = self.rank_chunks(queries, chunks)
 
-        context = ""
-        for chunk in sorted_chunks:
-            context += chunk.text + " "
+        context = self.assemble_context(sorted_chunks, token_budget)
 
         return sorted_chunks, context
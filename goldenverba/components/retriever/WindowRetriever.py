@@ -1,10 +1,15 @@
+import os
+
+from wasabi import msg
 from weaviate import Client
-from weaviate.gql.get import HybridFusion
 
 from goldenverba.components.chunking.chunk import Chunk
 from goldenverba.components.embedding.interface import Embedder
 from goldenverba.components.retriever.interface import Retriever
 
+# Returned by the chunk cache for chunks it doesn't know yet, None marks chunks that don't exist
+UNCACHED = object()
+
 
 class WindowRetriever(Retriever):
     """
@@ -15,73 +20,30 @@ class WindowRetriever(Retriever):
         super().__init__()
         self.description = "WindowRetriever uses Hybrid Search to retrieve relevant chunks and adds their surrounding context"
         self.name = "WindowRetriever"
+        # Number of neighboring chunks added on each side of a retrieved chunk
+        self.window = int(os.getenv("VERBA_RETRIEVER_WINDOW", "2"))
 
     def retrieve(
         self,
         queries: list[str],
         client: Client,
         embedder: Embedder,
+        token_budget: int | None = None,
+        vectors: list | None = None,
     ) -> list[Chunk]:
         """Ingest data into Weaviate
         @parameter: queries : list[str] - List of queries
         @parameter: client : Client - Weaviate client
         @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @parameter: vectors : list | None - Query vectors computed by the caller, vectorized here if None
         @returns list[Chunk] - List of retrieved chunks.
         """
-        chunk_class = embedder.get_chunk_class()
-        needs_vectorization = embedder.get_need_vectorization()
-        chunks = []
-
-        for query in queries:
-            query_results = (
-                client.query.get(
-                    class_name=chunk_class,
-                    properties=[
-                        "text",
-                        "doc_name",
-                        "chunk_id",
-                        "doc_uuid",
-                        "doc_type",
-                    ],
-                )
-                .with_additional(properties=["score"])
-                .with_autocut(2)
-            )
+        chunks = self.hybrid_search(queries, client, embedder, vectors)
 
-            if needs_vectorization:
-                vector = embedder.vectorize_query(query)
-                query_results = query_results.with_hybrid(
-                    query=query,
-                    vector=vector,
-                    fusion_type=HybridFusion.RELATIVE_SCORE,
-                    properties=[
-                        "text",
-                    ],
-                ).do()
-
-            else:
-                query_results = query_results.with_hybrid(
-                    query=query,
-                    fusion_type=HybridFusion.RELATIVE_SCORE,
-                    properties=[
-                        "text",
-                    ],
-                ).do()
-
-            for chunk in query_results["data"]["Get"][chunk_class]:
-                chunk_obj = Chunk(
-                    chunk["text"],
-                    chunk["doc_name"],
-                    chunk["doc_type"],
-                    chunk["doc_uuid"],
-                    chunk["chunk_id"],
-                )
-                chunk_obj.set_score(chunk["_additional"]["score"])
-                chunks.append(chunk_obj)
-
-        sorted_chunks = self.sort_chunks(chunks)
+        sorted_chunks = self.rank_chunks(queries, chunks)
 
-        context = self.combine_context(sorted_chunks, client, embedder)
+        context = self.combine_context(sorted_chunks, client, embedder, token_budget)
 
         return sorted_chunks, context
 
@@ -90,96 +52,199 @@ class WindowRetriever(Retriever):
         chunks: list[Chunk],
         client: Client,
         embedder: Embedder,
+        token_budget: int | None = None,
     ) -> str:
-        doc_name_map = {}
+        """Combine the retrieved chunks and their neighbors within the window into the context
+        @parameter: chunks : list[Chunk] - Retrieved chunks
+        @parameter: client : Client - Weaviate client
+        @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @returns str - Context ordered by document and chunk id.
+        """
+        chunk_class = embedder.get_chunk_class()
+        doc_chunk_map: dict[str, dict[int, Chunk]] = {}
+        for chunk in chunks:
+            doc_chunk_map.setdefault(chunk.doc_uuid, {})[int(chunk.chunk_id)] = chunk
+            # Retrieved chunks are neighbors of later hits in the same document
+            embedder.chunk_cache.set(
+                chunk_class,
+                chunk.doc_uuid,
+                int(chunk.chunk_id),
+                (chunk.text, chunk.doc_name, chunk.doc_type, chunk.tokens),
+            )
 
-        context = ""
+        for neighbor in self.fetch_neighbors(doc_chunk_map, client, embedder):
+            doc_chunk_map[neighbor.doc_uuid].setdefault(int(neighbor.chunk_id), neighbor)
 
-        for chunk in chunks:
-            if chunk.doc_name not in doc_name_map:
-                doc_name_map[chunk.doc_name] = {}
-
-            doc_name_map[chunk.doc_name][chunk.chunk_id] = chunk
-
-        for doc in doc_name_map:
-            chunk_map = doc_name_map[doc]
-            window = 2
-            added_chunks = {}
-            for chunk in chunk_map:
-                chunk_id = int(chunk)
-                all_chunk_range = list(range(chunk_id - window, chunk_id + window + 1))
-                for _range in all_chunk_range:
-                    if (
-                        _range >= 0
-                        and _range not in chunk_map
-                        and _range not in added_chunks
-                    ):
-                        chunk_retrieval_results = (
-                            client.query.get(
-                                class_name=embedder.get_chunk_class(),
-                                properties=[
-                                    "text",
-                                    "doc_name",
-                                    "chunk_id",
-                                    "doc_uuid",
-                                    "doc_type",
-                                ],
-                            )
-                            .with_where(
-                                {
-                                    "operator": "And",
-                                    "operands": [
-                                        {
-                                            "path": ["chunk_id"],
-                                            "operator": "Equal",
-                                            "valueNumber": _range,
-                                        },
-                                        {
-                                            "path": ["doc_name"],
-                                            "operator": "Equal",
-                                            "valueText": chunk_map[chunk].doc_name,
-                                        },
-                                    ],
-                                }
-                            )
-                            .with_limit(1)
-                            .do()
-                        )
-
-                        if "data" in chunk_retrieval_results:
-                            if chunk_retrieval_results["data"]["Get"][
-                                embedder.get_chunk_class()
-                            ]:
-                                chunk_obj = Chunk(
-                                    chunk_retrieval_results["data"]["Get"][
-                                        embedder.get_chunk_class()
-                                    ][0]["text"],
-                                    chunk_retrieval_results["data"]["Get"][
-                                        embedder.get_chunk_class()
-                                    ][0]["doc_name"],
-                                    chunk_retrieval_results["data"]["Get"][
-                                        embedder.get_chunk_class()
-                                    ][0]["doc_type"],
-                                    chunk_retrieval_results["data"]["Get"][
-                                        embedder.get_chunk_class()
-                                    ][0]["doc_uuid"],
-                                    chunk_retrieval_results["data"]["Get"][
-                                        embedder.get_chunk_class()
-                                    ][0]["chunk_id"],
-                                )
-                                added_chunks[str(_range)] = chunk_obj
-
-            for chunk in added_chunks:
-                if chunk not in doc_name_map[doc]:
-                    doc_name_map[doc][chunk] = added_chunks[chunk]
-
-        for doc in doc_name_map:
-            sorted_dict = {
-                k: doc_name_map[doc][k]
-                for k in sorted(doc_name_map[doc], key=lambda x: int(x))
+        return self.assemble_context(
+            [
+                chunk_map[chunk_id]
+                for chunk_map in doc_chunk_map.values()
+                for chunk_id in sorted(chunk_map)
+            ],
+            token_budget,
+            separator="",
+        )
+
+    def fetch_neighbors(
+        self,
+        doc_chunk_map: dict[str, dict[int, Chunk]],
+        client: Client,
+        embedder: Embedder,
+    ) -> list[Chunk]:
+        """Return all chunks within the window of the retrieved chunks,
+        chunks missing from the embedder's chunk cache are fetched in a single query
+        @parameter: doc_chunk_map : dict[str, dict[int, Chunk]] - Retrieved chunks per doc_uuid and chunk id
+        @parameter: client : Client - Weaviate client
+        @parameter: embedder : Embedder - Current selected Embedder
+        @returns list[Chunk] - Neighboring chunks.
+        """
+        chunk_class = embedder.get_chunk_class()
+        ranges = neighbor_ranges(
+            {doc_uuid: set(chunk_map) for doc_uuid, chunk_map in doc_chunk_map.items()},
+            self.window,
+        )
+
+        neighbors = []
+        uncached_ids: dict[str, set[int]] = {}
+        for doc_uuid, doc_ranges in ranges.items():
+            for start, end in doc_ranges:
+                for chunk_id in range(start, end + 1):
+                    entry = embedder.chunk_cache.get(
+                        chunk_class, doc_uuid, chunk_id, default=UNCACHED
+                    )
+                    if entry is UNCACHED:
+                        uncached_ids.setdefault(doc_uuid, set()).add(chunk_id)
+                    elif entry is not None:
+                        neighbors.append(self.make_neighbor(entry, doc_uuid, chunk_id))
+
+        if len(uncached_ids) == 0:
+            return neighbors
+
+        operands = []
+        limit = 0
+        for doc_uuid, chunk_ids in uncached_ids.items():
+            for start, end in merge_ranges(sorted(chunk_ids)):
+                operands.append(
+                    {
+                        "operator": "And",
+                        "operands": [
+                            {
+                                "path": ["doc_uuid"],
+                                "operator": "Equal",
+                                "valueText": doc_uuid,
+                            },
+                            {
+                                "path": ["chunk_id"],
+                                "operator": "GreaterThanEqual",
+                                "valueNumber": start,
+                            },
+                            {
+                                "path": ["chunk_id"],
+                                "operator": "LessThanEqual",
+                                "valueNumber": end,
+                            },
+                        ],
+                    }
+                )
+                limit += end - start + 1
+
+        results = (
+            client.query.get(
+                class_name=chunk_class,
+                properties=[
+                    "text",
+                    "doc_name",
+                    "chunk_id",
+                    "doc_uuid",
+                    "doc_type",
+                    "token_count",
+                ],
+            )
+            .with_where(
+                operands[0]
+                if len(operands) == 1
+                else {"operator": "Or", "operands": operands}
+            )
+            .with_limit(limit)
+            .do()
+        )
+
+        if "data" not in results:
+            msg.warn(results)
+            return neighbors
+
+        for chunk in results["data"]["Get"][chunk_class]:
+            doc_uuid = chunk["doc_uuid"]
+            chunk_id = int(chunk["chunk_id"])
+            if chunk_id not in uncached_ids.get(doc_uuid, set()):
+                continue
+
+            uncached_ids[doc_uuid].discard(chunk_id)
+            entry = (
+                chunk["text"],
+                chunk["doc_name"],
+                chunk["doc_type"],
+                chunk.get("token_count") or 0,
+            )
+            embedder.chunk_cache.set(chunk_class, doc_uuid, chunk_id, entry)
+            neighbors.append(self.make_neighbor(entry, doc_uuid, chunk_id))
+
+        # Ids that weren't returned are past the start or end of their document
+        for doc_uuid, chunk_ids in uncached_ids.items():
+            for chunk_id in chunk_ids:
+                embedder.chunk_cache.set(chunk_class, doc_uuid, chunk_id, None)
+
+        return neighbors
+
+    def make_neighbor(self, entry: tuple, doc_uuid: str, chunk_id: int) -> Chunk:
+        """
+        @parameter: entry : tuple - Chunk cache entry of text, doc_name, doc_type and token count
+        @parameter: doc_uuid : str - UUID of the document
+        @parameter: chunk_id : int - Chunk id
+        @returns Chunk - Neighboring chunk.
+        """
+        text, doc_name, doc_type, token_count = entry
+        chunk = Chunk(text, doc_name, doc_type, doc_uuid, chunk_id)
+        chunk.set_tokens(token_count)
+        return chunk
+
+
+def neighbor_ranges(
+    retrieved_ids: dict[str, set[int]], window: int
+) -> dict[str, list[tuple[int, int]]]:
+    """Compute the chunk id ranges around retrieved chunks that still have to be fetched
+    @parameter: retrieved_ids : dict[str, set[int]] - Retrieved chunk ids per doc_uuid
+    @parameter: window : int - Number of neighbors on each side of a retrieved chunk
+    @returns dict[str, list[tuple[int, int]]] - Inclusive, non-overlapping ranges of missing chunk ids per doc_uuid.
+    """
+    ranges = {}
+    for doc_uuid, chunk_ids in retrieved_ids.items():
+        missing = sorted(
+            {
+                neighbor
+                for chunk_id in chunk_ids
+                for neighbor in range(chunk_id - window, chunk_id + window + 1)
+                if neighbor >= 0
             }
+            - chunk_ids
+        )
+
+        if missing:
+            ranges[doc_uuid] = merge_ranges(missing)
 
-            for chunk in sorted_dict:
-                context += sorted_dict[chunk].text
+    return ranges
 
-        return context
+
+def merge_ranges(chunk_ids: list[int]) -> list[tuple[int, int]]:
+    """Merge sorted chunk ids into inclusive ranges of consecutive ids
+    @parameter: chunk_ids : list[int] - Sorted, unique chunk ids
+    @returns list[tuple[int, int]] - Inclusive ranges.
+    """
+    ranges = []
+    for chunk_id in chunk_ids:
+        if ranges and ranges[-1][1] == chunk_id - 1:
+            ranges[-1] = (ranges[-1][0], chunk_id)
+        else:
+            ranges.append((chunk_id, chunk_id))
+    return ranges
@@ -1,10 +1,26 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor
+
 import tiktoken
 from wasabi import msg
 from weaviate import Client
+from weaviate.gql.get import HybridFusion
 
 from goldenverba.components.chunking.chunk import Chunk
 from goldenverba.components.component import VerbaComponent
 from goldenverba.components.embedding.interface import Embedder
+from goldenverba.components.reranking.interface import Reranker
+
+
+@functools.cache
+def get_encoding(model: str = "gpt-3.5-turbo") -> "tiktoken.Encoding":
+    """Load the tiktoken encoding of a model once per process
+    @parameter: model : str - Model name
+    @returns tiktoken.Encoding - Cached encoding.
+    """
+    return tiktoken.encoding_for_model(model)
 
 
 class Retriever(VerbaComponent):
@@ -14,26 +30,195 @@ class Retriever(VerbaComponent):
 
     def __init__(self):
         super().__init__()
+        # Number of hybrid searches sent in one multi-part GraphQL request
+        self.query_batch_size = int(os.getenv("VERBA_RETRIEVER_QUERY_BATCH", "32"))
+        # Set by the RetrieverManager, chunks are ordered by document if None
+        self.reranker: Reranker | None = None
 
     def retrieve(
         self,
         queries: list[str],
         client: Client,
         embedder: Embedder,
+        token_budget: int | None = None,
+        vectors: list | None = None,
     ) -> tuple[list[Chunk], str]:
         """Ingest data into Weaviate
         @parameter: queries : list[str] - List of queries
         @parameter: client : Client - Weaviate client
         @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @parameter: vectors : list | None - Query vectors computed by the caller, vectorized here if None
         @returns tuple(list[Chunk],str) - List of retrieved chunks and the context string.
         """
         raise NotImplementedError("load method must be implemented by a subclass.")
 
+    async def aretrieve(
+        self,
+        queries: list[str],
+        client: Client,
+        embedder: Embedder,
+        executor: Executor | None = None,
+        token_budget: int | None = None,
+    ) -> tuple[list[Chunk], str]:
+        """Retrieve without blocking the event loop, the query vectors are computed in one batch
+        and the blocking Weaviate requests run on the executor
+        @parameter: queries : list[str] - List of queries
+        @parameter: client : Client - Weaviate client
+        @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: executor : Executor | None - Executor to run on, the loop's default executor if None
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @returns tuple(list[Chunk],str) - List of retrieved chunks and the context string.
+        """
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(
+            executor, self.get_query_vectors, queries, embedder
+        )
+
+        return await loop.run_in_executor(
+            executor, self.retrieve, queries, client, embedder, token_budget, vectors
+        )
+
+    def get_query_vectors(self, queries: list[str], embedder: Embedder) -> list:
+        """Vectorize the queries in one batch
+        @parameter: queries : list[str] - List of queries
+        @parameter: embedder : Embedder - Current selected Embedder
+        @returns list - One vector per query, None if Weaviate vectorizes the chunks and they are only searched by keywords.
+        """
+        if not embedder.get_need_vectorization():
+            return [None] * len(queries)
+        return embedder.get_query_vectors(queries)
+
+    def hybrid_search(
+        self,
+        queries: list[str],
+        client: Client,
+        embedder: Embedder,
+        vectors: list | None = None,
+    ) -> list[Chunk]:
+        """Run a hybrid search for every query, the queries are vectorized in one batch and
+        sent as multi-part GraphQL requests with one alias per query
+        @parameter: queries : list[str] - List of queries
+        @parameter: client : Client - Weaviate client
+        @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: vectors : list | None - Query vectors computed by the caller, vectorized here if None
+        @returns list[Chunk] - Retrieved chunks, unique by doc_uuid and chunk_id with their best score.
+        """
+        chunk_class = embedder.get_chunk_class()
+        if vectors is None:
+            vectors = self.get_query_vectors(queries, embedder)
+
+        chunks: dict[tuple[str, int], Chunk] = {}
+        for batch_start in range(0, len(queries), self.query_batch_size):
+            searches = []
+            for i in range(
+                batch_start, min(batch_start + self.query_batch_size, len(queries))
+            ):
+                searches.append(
+                    client.query.get(
+                        class_name=chunk_class,
+                        properties=[
+                            "text",
+                            "doc_name",
+                            "chunk_id",
+                            "doc_uuid",
+                            "doc_type",
+                            "token_count",
+                        ],
+                    )
+                    .with_additional(properties=["score"])
+                    .with_autocut(2)
+                    .with_hybrid(
+                        query=queries[i],
+                        vector=vectors[i],
+                        fusion_type=HybridFusion.RELATIVE_SCORE,
+                        properties=[
+                            "text",
+                        ],
+                    )
+                    .with_alias(f"query_{i}")
+                )
+
+            results = client.query.multi_get(searches).do()
+            if "errors" in results:
+                msg.warn(results["errors"])
+            if not results.get("data"):
+                continue
+
+            for search in searches:
+                for chunk in results["data"]["Get"].get(search.name) or []:
+                    key = (chunk["doc_uuid"], int(chunk["chunk_id"]))
+                    score = float(chunk["_additional"]["score"])
+                    if key in chunks and chunks[key].score >= score:
+                        continue
+
+                    chunk_obj = Chunk(
+                        chunk["text"],
+                        chunk["doc_name"],
+                        chunk["doc_type"],
+                        chunk["doc_uuid"],
+                        chunk["chunk_id"],
+                    )
+                    chunk_obj.set_score(score)
+                    # Chunks imported before token counts were stored have none
+                    chunk_obj.set_tokens(chunk.get("token_count") or 0)
+                    chunks[key] = chunk_obj
+
+        return list(chunks.values())
+
+    def rank_chunks(self, queries: list[str], chunks: list[Chunk]) -> list[Chunk]:
+        """Order the retrieved chunks for the context
+        @parameter: queries : list[str] - List of queries
+        @parameter: chunks : list[Chunk] - Retrieved chunks
+        @returns list[Chunk] - The reranked top chunks, most relevant first, or all chunks ordered by document without a reranker.
+        """
+        if self.reranker is None:
+            return self.sort_chunks(chunks)
+        return self.reranker.rerank(queries, chunks)
+
     def sort_chunks(self, chunks: list[Chunk]) -> list[Chunk]:
         return sorted(chunks, key=lambda chunk: (chunk.doc_uuid, int(chunk.chunk_id)))
 
+    def assemble_context(
+        self,
+        chunks: list[Chunk],
+        token_budget: int | None = None,
+        separator: str = " ",
+    ) -> str:
+        """Concatenate chunks until the token budget is used up. The stored token counts of the chunks are summed,
+        only the chunk at the budget boundary and chunks without a stored count are tokenized
+        @parameter: chunks : list[Chunk] - Chunks in context order
+        @parameter: token_budget : int | None - Maximum number of context tokens, unlimited if None
+        @parameter: separator : str - Added after every chunk
+        @returns str - Context string.
+        """
+        if token_budget is None:
+            return "".join(chunk.text + separator for chunk in chunks)
+
+        encoding = get_encoding()
+        separator_tokens = len(encoding.encode(separator)) if separator else 0
+        parts = []
+        used_tokens = 0
+        for chunk in chunks:
+            chunk_tokens = chunk.tokens or len(
+                encoding.encode(chunk.text, disallowed_special=())
+            )
+            if used_tokens + chunk_tokens > token_budget:
+                remaining = token_budget - used_tokens
+                if remaining > 0:
+                    encoded_tokens = encoding.encode(chunk.text, disallowed_special=())
+                    parts.append(encoding.decode(encoded_tokens[:remaining]))
+                msg.info(f"Truncated Context to {token_budget} tokens")
+                return "".join(parts)
+
+            parts.append(chunk.text + separator)
+            used_tokens += chunk_tokens + separator_tokens
+
+        msg.info(f"Retrieved Context of {used_tokens} tokens")
+        return "".join(parts)
+
     def cutoff_text(self, text: str, content_length: int) -> str:
-        encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        encoding = get_encoding()
 
         # Tokenize the input text
         encoded_tokens = encoding.encode(text, disallowed_special=())
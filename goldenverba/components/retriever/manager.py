@@ -1,10 +1,17 @@
+import os
+import threading
+from concurrent.futures import Executor
+
 from wasabi import msg
 from weaviate import Client
 
 from goldenverba.components.chunking.chunk import Chunk
 from goldenverba.components.embedding.interface import Embedder
 from goldenverba.components.generation.interface import Generator
+from goldenverba.components.reranking.CrossEncoderReranker import CrossEncoderReranker
+from goldenverba.components.reranking.interface import Reranker
 from goldenverba.components.retriever.interface import Retriever
+from goldenverba.components.retriever.LocalRetriever import LocalRetriever
 from goldenverba.components.retriever.SimpleRetriever import SimpleRetriever
 from goldenverba.components.retriever.WindowRetriever import WindowRetriever
 
@@ -14,8 +21,17 @@ class RetrieverManager:
         self.retrievers: dict[str, Retriever] = {
             "WindowRetriever": WindowRetriever(),
             "SimpleRetriever": SimpleRetriever(),
+            "LocalRetriever": LocalRetriever(),
         }
         self.selected_retriever: Retriever = self.retrievers["WindowRetriever"]
+        self.rerankers: dict[str, Reranker] = {
+            "CrossEncoderReranker": CrossEncoderReranker(),
+        }
+        self.selected_reranker: Reranker | None = None
+        # Reranking is disabled unless a reranker is configured
+        reranker = os.getenv("VERBA_RERANKER", "")
+        if reranker != "":
+            self.set_reranker(reranker)
 
     def retrieve(
         self,
@@ -30,9 +46,29 @@ class RetrieverManager:
         @parameter: embedder : Embedder - Current selected Embedder
         @returns list[Chunk] - List of retrieved chunks.
         """
-        chunks, context = self.selected_retriever.retrieve(queries, client, embedder)
-        managed_context = self.selected_retriever.cutoff_text(
-            context, generator.context_window
+        # The context is assembled within the generator's context window
+        chunks, managed_context = self.selected_retriever.retrieve(
+            queries, client, embedder, generator.context_window
+        )
+        return chunks, managed_context
+
+    async def aretrieve(
+        self,
+        queries: list[str],
+        client: Client,
+        embedder: Embedder,
+        generator: Generator,
+        executor: Executor | None = None,
+    ) -> list[Chunk]:
+        """Retrieve chunks without blocking the event loop
+        @parameter: queries : list[str] - List of queries
+        @parameter: client : Client - Weaviate client
+        @parameter: embedder : Embedder - Current selected Embedder
+        @parameter: executor : Executor | None - Executor for the blocking work
+        @returns list[Chunk] - List of retrieved chunks.
+        """
+        chunks, managed_context = await self.selected_retriever.aretrieve(
+            queries, client, embedder, executor, generator.context_window
         )
         return chunks, managed_context
 
@@ -46,3 +82,37 @@ class RetrieverManager:
 
     def get_retrievers(self) -> dict[str, Retriever]:
         return self.retrievers
+
+    def set_reranker(self, reranker: str) -> bool:
+        """Select the reranker of all retrievers, an empty name disables reranking
+        @parameter: reranker : str - Name of the reranker
+        @returns bool - Whether the reranker was found.
+        """
+        if reranker != "" and reranker not in self.rerankers:
+            msg.warn(f"Reranker {reranker} not found")
+            return False
+
+        self.selected_reranker = self.rerankers.get(reranker)
+        for retriever in self.retrievers.values():
+            retriever.reranker = self.selected_reranker
+        return True
+
+    def get_rerankers(self) -> dict[str, Reranker]:
+        return self.rerankers
+
+    def preload_reranker(self) -> None:
+        """Load the model of the selected reranker in the background, the first retrieval waits for it instead of loading it."""
+        if self.selected_reranker is not None:
+            threading.Thread(
+                target=self.selected_reranker.load,
+                name="verba-reranker-load",
+                daemon=True,
+            ).start()
+
+    def get_cache_stats(self) -> dict | None:
+        """
+        @returns dict | None - Statistics of the selected reranker's score cache, None without a reranker.
+        """
+        if self.selected_reranker is None:
+            return None
+        return self.selected_reranker.get_cache_stats()
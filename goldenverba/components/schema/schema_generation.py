@@ -1,5 +1,6 @@
-import re
 import os
+import re
+
 from dotenv import load_dotenv
 from wasabi import msg  # type: ignore[import]
 from weaviate import Client
@@ -34,7 +35,7 @@ def verify_vectorizer(
         model = os.getenv("AZURE_OPENAI_EMBEDDING_MODEL")
         if resourceName is None or model is None:
             raise Exception("AZURE_OPENAI_RESOURCE_NAME and AZURE_OPENAI_EMBEDDING_MODEL should be set when OPENAI_API_TYPE is azure. Resource name is XXX in http://XXX.openai.azure.com")
-        vectorizer_config = { 
+        vectorizer_config = {
             "text2vec-openai": {
                     "deploymentId": model,
                     "resourceName": resourceName
@@ -77,6 +78,21 @@ def add_suffix(schema: dict, vectorizer: str) -> tuple[dict, str]:
     return modified_schema, modified_schema["classes"][0]["class"]
 
 
+def add_missing_properties(client: Client, schema: dict) -> None:
+    """Add properties that were added to the schema after the class was created
+    @parameter client : Client - Weaviate client
+    @parameter schema : dict - Schema json of an existing class.
+    """
+    class_name = schema["classes"][0]["class"]
+    existing = {
+        property["name"] for property in client.schema.get(class_name)["properties"]
+    }
+    for property in schema["classes"][0]["properties"]:
+        if property["name"] not in existing:
+            client.schema.property.create(class_name, property)
+            msg.info(f"Added property {property['name']} to {class_name}")
+
+
 def reset_schemas(
     client: Client = None,
     vectorizer: str = None,
@@ -107,6 +123,7 @@ def init_schemas(
         init_documents(client, vectorizer, force, check)
         init_cache(client, vectorizer, force, check)
         init_suggestion(client, vectorizer, force, check)
+        init_corpus_version(client, vectorizer, force, check)
         return True
     except Exception as e:
         msg.fail(f"Schema initialization failed {str(e)}")
@@ -157,6 +174,18 @@ def init_documents(
                         "dataType": ["number"],
                         "description": "Document chunk from the whole document",
                     },
+                    {
+                        # Skip
+                        "name": "chunk_hash",
+                        "dataType": ["text"],
+                        "description": "Hash of the chunk content",
+                    },
+                    {
+                        # Skip
+                        "name": "token_count",
+                        "dataType": ["int"],
+                        "description": "Number of tokens of the chunk",
+                    },
                 ],
             }
         ]
@@ -198,6 +227,16 @@ def init_documents(
                         "dataType": ["number"],
                         "description": "Number of chunks",
                     },
+                    {
+                        "name": "doc_hash",
+                        "dataType": ["text"],
+                        "description": "Hash of the document content",
+                    },
+                    {
+                        "name": "chunking",
+                        "dataType": ["text"],
+                        "description": "Chunker, units and overlap the document was chunked with",
+                    },
                 ],
             }
         ]
@@ -207,7 +246,7 @@ def init_documents(
     chunk_schema = verify_vectorizer(
         SCHEMA_CHUNK,
         vectorizer,
-        ["doc_type", "doc_uuid", "chunk_id"],
+        ["doc_type", "doc_uuid", "chunk_id", "chunk_hash", "token_count"],
     )
 
     # Add Suffix
@@ -216,6 +255,8 @@ def init_documents(
 
     if client.schema.exists(document_name):
         if check:
+            add_missing_properties(client, document_schema)
+            add_missing_properties(client, chunk_schema)
             return document_schema, chunk_schema
         if not force:
             user_input = input(
@@ -268,6 +309,36 @@ def init_cache(
                         "dataType": ["text"],
                         "description": "System message",
                     },
+                    {
+                        # Skip
+                        "name": "created_at",
+                        "dataType": ["number"],
+                        "description": "Unix time the entry was created",
+                    },
+                    {
+                        # Skip
+                        "name": "last_hit",
+                        "dataType": ["number"],
+                        "description": "Unix time of the last hit",
+                    },
+                    {
+                        # Skip
+                        "name": "hit_count",
+                        "dataType": ["int"],
+                        "description": "Number of hits",
+                    },
+                    {
+                        # Skip
+                        "name": "corpus_version",
+                        "dataType": ["int"],
+                        "description": "Corpus version the answer was generated from",
+                    },
+                    {
+                        # Skip
+                        "name": "doc_uuids",
+                        "dataType": ["text[]"],
+                        "description": "Documents cited by the answer",
+                    },
                 ],
             }
         ]
@@ -277,7 +348,15 @@ def init_cache(
     cache_schema = verify_vectorizer(
         SCHEMA_CACHE,
         vectorizer,
-        ["system", "results"],
+        [
+            "system",
+            "results",
+            "created_at",
+            "last_hit",
+            "hit_count",
+            "corpus_version",
+            "doc_uuids",
+        ],
     )
 
     # Add Suffix
@@ -285,6 +364,8 @@ def init_cache(
 
     if client.schema.exists(cache_name):
         if check:
+            # Entries written before the metadata existed read it as null, they are never served and evicted first
+            add_missing_properties(client, cache_schema)
             return cache_schema
         if not force:
             user_input = input(
@@ -354,3 +435,60 @@ def init_suggestion(
         msg.good(f"{suggestion_name} schema created")
 
     return suggestion_schema
+
+
+def init_corpus_version(
+    client: Client, vectorizer: str = None, force: bool = False, check: bool = False
+) -> dict:
+    """Initializes the CorpusVersion schema, one object per Cache_* class holds the version its entries are checked against
+    @parameter client : Client - Weaviate client
+    @parameter vectorizer : str - Name of the vectorizer
+    @parameter force : bool - Delete existing schema without user input
+    @parameter check : bool - Only create if not exist
+    @returns dict - Modified schema.
+    """
+    SCHEMA_CORPUS_VERSION = {
+        "classes": [
+            {
+                "class": "CorpusVersion",
+                "description": "Corpus version of each semantic cache, bumped when documents are imported",
+                "vectorizer": "none",
+                "properties": [
+                    {
+                        "name": "cache_class",
+                        "dataType": ["text"],
+                        "description": "Name of the Cache_* class",
+                    },
+                    {
+                        "name": "version",
+                        "dataType": ["int"],
+                        "description": "Current corpus version",
+                    },
+                ],
+            }
+        ]
+    }
+
+    corpus_version_schema = SCHEMA_CORPUS_VERSION
+    corpus_version_name = "CorpusVersion"
+
+    if client.schema.exists(corpus_version_name):
+        if check:
+            return corpus_version_schema
+        if not force:
+            user_input = input(
+                f"{corpus_version_name} class already exists, do you want to delete it? (y/n): "
+            )
+        else:
+            user_input = "y"
+        if user_input.strip().lower() == "y":
+            client.schema.delete_class(corpus_version_name)
+            client.schema.create(corpus_version_schema)
+            msg.good(f"{corpus_version_name} schema created")
+        else:
+            msg.warn(f"Skipped deleting {corpus_version_name} schema, nothing changed")
+    else:
+        client.schema.create(corpus_version_schema)
+        msg.good(f"{corpus_version_name} schema created")
+
+    return corpus_version_schema
@@ -0,0 +1,246 @@
+import uuid as uuid_lib
+
+import pytest
+
+
+def get_value(properties, object_uuid, path):
+    if path == ["id"]:
+        return object_uuid
+    return properties.get(path[0])
+
+
+def matches(properties, object_uuid, where):
+    """Evaluate a Weaviate where filter against one stored object."""
+    operator = where["operator"]
+    if operator == "And":
+        return all(matches(properties, object_uuid, w) for w in where["operands"])
+    if operator == "Or":
+        return any(matches(properties, object_uuid, w) for w in where["operands"])
+
+    value = get_value(properties, object_uuid, where["path"])
+    if operator == "ContainsAny":
+        expected = set(where["valueTextArray"])
+        if isinstance(value, list):
+            return len(expected & set(value)) > 0
+        return value in expected
+
+    expected = next(v for k, v in where.items() if k.startswith("value"))
+    if "valueText" in where:
+        # GraphQL decodes escaped backslashes in string literals
+        expected = expected.replace("\\\\", "\\")
+    # Like Weaviate, null values don't match comparisons
+    if value is None:
+        return False
+    if operator == "Equal":
+        return value == expected
+    if operator == "NotEqual":
+        return value != expected
+    if operator == "LessThan":
+        return value < expected
+    if operator == "LessThanEqual":
+        return value <= expected
+    if operator == "GreaterThan":
+        return value > expected
+    if operator == "GreaterThanEqual":
+        return value >= expected
+    raise ValueError(f"Unsupported operator {operator}")
+
+
+class FakeQuery:
+    def __init__(self, client, class_name, properties):
+        self.client = client
+        self.class_name = class_name
+        self.properties = properties
+        self.where = None
+        self.sort = None
+        self.limit = None
+        self.after = None
+
+    def with_additional(self, properties):
+        return self
+
+    def with_where(self, where):
+        self.where = where
+        self.client.requests.append(where)
+        return self
+
+    def with_sort(self, sort):
+        self.sort = sort
+        return self
+
+    def with_limit(self, limit):
+        self.limit = limit
+        return self
+
+    def with_after(self, after):
+        self.after = after
+        return self
+
+    def do(self):
+        # Without a sort, Weaviate returns objects in UUID order, which cursors page through
+        objects = sorted(self.client.objects.get(self.class_name, {}).items())
+        if self.after is not None:
+            objects = [o for o in objects if o[0] > self.after]
+        if self.where is not None:
+            objects = [o for o in objects if matches(o[1], o[0], self.where)]
+        if self.sort is not None:
+            # Null values are sorted first
+            objects.sort(
+                key=lambda o: [
+                    (o[1].get(s["path"][0]) is not None, o[1].get(s["path"][0]) or 0)
+                    for s in self.sort
+                ]
+            )
+        page = [
+            {
+                **{key: properties.get(key) for key in self.properties},
+                "_additional": {
+                    "id": object_uuid,
+                    "vector": self.client.vectors.get(object_uuid),
+                },
+            }
+            for object_uuid, properties in objects[: self.limit]
+        ]
+        return {"data": {"Get": {self.class_name: page}}}
+
+
+class FakeAggregate:
+    def __init__(self, client, class_name):
+        self.client = client
+        self.class_name = class_name
+
+    def with_meta_count(self):
+        return self
+
+    def do(self):
+        count = len(self.client.objects.get(self.class_name, {}))
+        return {"data": {"Aggregate": {self.class_name: [{"meta": {"count": count}}]}}}
+
+
+class FakeWeaviateClient:
+    """In-memory stand-in for the query, data_object and batch APIs of a Weaviate v3 client.
+    Objects whose properties match fail_where are rejected by the batch and reported to its callback.
+    """
+
+    def __init__(self, fail_where=None):
+        self.objects: dict[str, dict[str, dict]] = {}
+        self.vectors: dict[str, list[float]] = {}
+        # Where filters of all queries and uuids and properties of all writes, in order
+        self.requests = []
+        self.written = []
+        self.fail_where = fail_where
+        self.callback = None
+        self.pending = []
+        self.query = self
+        self.batch = self
+        self.data_object = self
+
+    def add(self, class_name, properties, uuid=None, vector=None):
+        uuid = uuid or str(uuid_lib.uuid4())
+        self.objects.setdefault(class_name, {})[uuid] = dict(properties)
+        if vector is not None:
+            self.vectors[uuid] = vector
+        return uuid
+
+    def get_objects(self, class_name):
+        return list(self.objects.get(class_name, {}).values())
+
+    # client.query
+
+    def get(self, class_name, properties):
+        return FakeQuery(self, class_name, properties)
+
+    def aggregate(self, class_name):
+        return FakeAggregate(self, class_name)
+
+    # client.data_object
+
+    def get_by_id(self, uuid, class_name):
+        if uuid not in self.objects.get(class_name, {}):
+            return None
+        return {"properties": self.objects[class_name][uuid]}
+
+    def exists(self, uuid, class_name):
+        return uuid in self.objects.get(class_name, {})
+
+    def create(self, properties, class_name, uuid=None, vector=None):
+        self.written.append((uuid, properties))
+        return self.add(class_name, properties, uuid, vector)
+
+    def update(self, properties, class_name, uuid):
+        self.written.append((uuid, properties))
+        self.objects[class_name][uuid].update(properties)
+
+    def delete(self, uuid, class_name):
+        self.objects.get(class_name, {}).pop(uuid, None)
+
+    # client.batch
+
+    def configure(self, callback=None, **kwargs):
+        self.callback = callback
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        results = self.create_objects()
+        if self.callback is not None:
+            self.callback(results)
+
+    def add_data_object(self, properties, class_name, uuid=None, vector=None):
+        uuid = uuid or str(uuid_lib.uuid4())
+        self.written.append((uuid, properties))
+        self.pending.append((class_name, properties, uuid, vector))
+        return uuid
+
+    def create_objects(self):
+        results = []
+        for class_name, properties, uuid, vector in self.pending:
+            if self.fail_where is not None and matches(
+                properties, uuid, self.fail_where
+            ):
+                results.append(
+                    {
+                        "id": uuid,
+                        "result": {"errors": {"error": [{"message": "rejected"}]}},
+                    }
+                )
+                continue
+            self.add(class_name, properties, uuid, vector)
+            results.append({"id": uuid, "result": {}})
+        self.pending = []
+        return results
+
+    def empty_objects(self):
+        self.pending = []
+
+    def delete_objects(self, class_name, where):
+        stored = self.objects.get(class_name, {})
+        for uuid in [u for u, p in stored.items() if matches(p, u, where)]:
+            del stored[uuid]
+
+
+class RecordingQueue:
+    """Write-behind queue that keeps the added objects instead of writing them."""
+
+    def __init__(self):
+        self.objects = []
+
+    def add(self, class_name, properties, vector=None, key=None):
+        self.objects.append(properties)
+        return True
+
+
+@pytest.fixture
+def weaviate_client():
+    return FakeWeaviateClient()
+
+
+@pytest.fixture
+def make_weaviate_client():
+    return FakeWeaviateClient
+
+
+@pytest.fixture
+def recording_queue():
+    return RecordingQueue()
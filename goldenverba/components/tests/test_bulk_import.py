@@ -0,0 +1,61 @@
+import pytest
+
+from goldenverba.components.chunking.batch import ChunkBatch
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.embedding.interface import Embedder
+from goldenverba.components.reader.document import Document
+
+
+def make_documents():
+    documents = []
+    for name in ["good", "bad"]:
+        document = Document(text=name, name=name, type="Documentation")
+        document.chunks = [
+            Chunk(text=f"{name} chunk {index}", chunk_id=index) for index in range(3)
+        ]
+        for chunk in document.chunks:
+            chunk.set_tokens(2)
+        documents.append(document)
+    return documents
+
+
+def make_embedder():
+    embedder = Embedder()
+    embedder.vectorizer = "MiniLM"
+    embedder.import_batch_size = 2
+    return embedder
+
+
+def test_bulk_import_writes_documents_and_chunks(weaviate_client):
+    embedder = make_embedder()
+    documents = make_documents()
+
+    assert embedder.import_chunk_batch(
+        ChunkBatch.from_documents(documents), weaviate_client, finalize=False
+    )
+
+    stored_documents = weaviate_client.objects["Document_MiniLM"]
+    assert sorted(d["doc_name"] for d in stored_documents.values()) == ["bad", "good"]
+    for document in documents:
+        assert stored_documents[document.chunks[0].doc_uuid]["doc_name"] == document.name
+    assert len(weaviate_client.get_objects("Chunk_MiniLM")) == 6
+
+
+def test_failed_bulk_import_rolls_back_the_partial_documents(make_weaviate_client):
+    # Weaviate rejects a single chunk, the rest of its document was already written
+    client = make_weaviate_client(
+        fail_where={"path": ["text"], "operator": "Equal", "valueText": "bad chunk 1"}
+    )
+    embedder = make_embedder()
+
+    with pytest.raises(Exception, match="1/2 documents, they were rolled back"):
+        embedder.import_chunk_batch(
+            ChunkBatch.from_documents(make_documents()), client, finalize=False
+        )
+
+    assert [d["doc_name"] for d in client.get_objects("Document_MiniLM")] == ["good"]
+    assert sorted(c["text"] for c in client.get_objects("Chunk_MiniLM")) == [
+        "good chunk 0",
+        "good chunk 1",
+        "good chunk 2",
+    ]
@@ -0,0 +1,43 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from click.testing import CliRunner
+
+try:
+    from goldenverba.server import cli
+except Exception:
+    pytest.skip("server dependencies not available", allow_module_level=True)
+
+
+class StubEmbedder:
+    name = "MiniLMEmbedder"
+
+    def get_nearest_cached_query(self, client, query):
+        return {"query": query, "_additional": {"distance": 0.02}}
+
+
+class StubManager:
+    selected = []
+
+    def __init__(self):
+        self.client = None
+        self.embedder_manager = SimpleNamespace(selected_embedder=StubEmbedder())
+
+    def embedder_set_embedder(self, embedder):
+        StubManager.selected.append(embedder)
+        return True
+
+
+def test_calibrate_prints_the_threshold_of_the_embedder(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "VerbaManager", StubManager)
+    log = tmp_path / "queries.jsonl"
+    log.write_text(json.dumps({"query": "what is verba", "match": "what is verba"}))
+
+    result = CliRunner().invoke(
+        cli.cli, ["calibrate", "--log", str(log), "--embedder", "MiniLMEmbedder"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert StubManager.selected == ["MiniLMEmbedder"]
+    assert "VERBA_SEMANTIC_CACHE_DISTANCE_MINILMEMBEDDER=0.0200" in result.output
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from goldenverba.components.chunking.batch import ChunkBatch
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.reader.document import Document
+
+
+def make_documents():
+    first = Document(text="first", name="first")
+    first.chunks = [Chunk(text="a", chunk_id=0), Chunk(text="b", chunk_id=1)]
+    empty = Document(text="", name="empty")
+    last = Document(text="last", name="last")
+    last.chunks = [Chunk(text="c", chunk_id=0)]
+    for chunk in first.chunks + last.chunks:
+        chunk.set_tokens(1)
+    return [first, empty, last]
+
+
+def test_from_documents_builds_columns():
+    chunk_batch = ChunkBatch.from_documents(make_documents())
+    assert len(chunk_batch) == 3
+    assert chunk_batch.texts == ["a", "b", "c"]
+    assert chunk_batch.doc_indices.tolist() == [0, 0, 2]
+    assert chunk_batch.chunk_ids.tolist() == [0, 1, 0]
+    assert chunk_batch.tokens.tolist() == [1, 1, 1]
+    assert chunk_batch.vectors is None
+
+
+def test_document_rows():
+    chunk_batch = ChunkBatch.from_documents(make_documents())
+    assert chunk_batch.document_rows(0) == slice(0, 2)
+    assert chunk_batch.document_rows(1) == slice(2, 2)
+    assert chunk_batch.document_rows(2) == slice(2, 3)
+
+
+def test_set_vectors_checks_row_count():
+    chunk_batch = ChunkBatch.from_documents(make_documents())
+    with pytest.raises(ValueError):
+        chunk_batch.set_vectors([[1.0, 2.0]])
+
+
+def test_to_documents_shares_the_vector_matrix():
+    documents = make_documents()
+    chunk_batch = ChunkBatch.from_documents(documents)
+    chunk_batch.set_vectors(np.arange(6).reshape(3, 2))
+
+    chunk_batch.to_documents()
+    assert documents[2].chunks[0].vector.tolist() == [4.0, 5.0]
+    assert np.shares_memory(documents[0].chunks[1].vector, chunk_batch.vectors)
+
+
+def test_from_documents_stacks_existing_vectors():
+    documents = make_documents()
+    for chunk in documents[0].chunks + documents[2].chunks:
+        chunk.set_vector([1.0, 2.0])
+    chunk_batch = ChunkBatch.from_documents(documents)
+    assert chunk_batch.vectors.shape == (3, 2)
+    assert chunk_batch.vectors.dtype == np.float32
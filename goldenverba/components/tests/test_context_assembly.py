@@ -0,0 +1,44 @@
+import pytest
+
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.retriever.SimpleRetriever import SimpleRetriever
+from goldenverba.components.retriever.interface import get_encoding
+
+try:
+    encoding = get_encoding()
+except Exception:
+    pytest.skip("tiktoken encoding not available", allow_module_level=True)
+
+
+def make_chunks(texts, count_tokens=True):
+    chunks = []
+    for i, text in enumerate(texts):
+        chunk = Chunk(text, "doc", "type", "uuid", i)
+        if count_tokens:
+            chunk.set_tokens(len(encoding.encode(text)))
+        chunks.append(chunk)
+    return chunks
+
+
+TEXTS = ["first chunk of text", "second chunk of text", "third chunk of text"]
+
+
+def test_context_without_budget_keeps_every_chunk():
+    context = SimpleRetriever().assemble_context(make_chunks(TEXTS))
+    assert context == "first chunk of text second chunk of text third chunk of text "
+
+
+def test_context_stops_at_budget_and_truncates_boundary_chunk():
+    retriever = SimpleRetriever()
+    first_tokens = len(encoding.encode(TEXTS[0] + " "))
+    context = retriever.assemble_context(make_chunks(TEXTS), first_tokens + 2)
+
+    assert context == TEXTS[0] + " " + encoding.decode(encoding.encode(TEXTS[1])[:2])
+    assert len(encoding.encode(context)) <= first_tokens + 2
+
+
+def test_chunks_without_stored_counts_are_tokenized():
+    retriever = SimpleRetriever()
+    assert retriever.assemble_context(
+        make_chunks(TEXTS, count_tokens=False), 8
+    ) == retriever.assemble_context(make_chunks(TEXTS), 8)
@@ -0,0 +1,120 @@
+import time
+
+from goldenverba.components.embedding.cache import (
+    ChunkCache,
+    EmbeddingCache,
+    QueryVectorCache,
+    SemanticCacheTier,
+)
+
+
+def test_embedding_cache_hits_and_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.set_many("model", ["first chunk"], [[0.5, 1.0, 2.0]])
+
+    vectors = cache.get_many("model", ["first chunk", "second chunk"])
+    assert vectors == [[0.5, 1.0, 2.0], None]
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_embedding_cache_normalizes_whitespace(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.set_many("model", ["first  chunk\n"], [[1.0]])
+    assert cache.get_many("model", ["first chunk"]) == [[1.0]]
+
+
+def test_embedding_cache_is_keyed_by_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.set_many("model", ["first chunk"], [[1.0]])
+    assert cache.get_many("other_model", ["first chunk"]) == [None]
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    # Every vector takes 4 * 4 bytes, the cache holds two of them
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_size_mb=32 / 1024 / 1024)
+    cache.set_many("model", ["a"], [[1.0] * 4])
+    cache.set_many("model", ["b"], [[2.0] * 4])
+    cache.get_many("model", ["a"])
+    cache.set_many("model", ["c"], [[3.0] * 4])
+
+    assert cache.get_many("model", ["a", "b", "c"]) == [[1.0] * 4, None, [3.0] * 4]
+    assert cache.get_stats()["size_bytes"] == 32
+
+
+def test_embedding_cache_persists(tmp_path):
+    EmbeddingCache(str(tmp_path / "cache.sqlite")).set_many("model", ["a"], [[1.0]])
+    assert EmbeddingCache(str(tmp_path / "cache.sqlite")).get_many("model", ["a"]) == [[1.0]]
+
+
+def test_query_vector_cache_evicts_least_recently_used():
+    cache = QueryVectorCache(max_entries=2)
+    cache.set("first", [1.0])
+    cache.set("second", [2.0])
+    cache.get("first")
+    cache.set("third", [3.0])
+
+    assert cache.get("second") is None
+    assert cache.get("first") == [1.0]
+    assert cache.get("third") == [3.0]
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_query_vector_cache_expires_entries():
+    cache = QueryVectorCache(ttl=0.01)
+    cache.set("query", [1.0])
+    time.sleep(0.02)
+
+    assert cache.get("query") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_chunk_cache_invalidates_documents():
+    cache = ChunkCache()
+    cache.set("Chunk", "u1", 0, ("text", "doc", "type", 1))
+    cache.set("Chunk", "u1", 1, None)
+    cache.set("Chunk", "u2", 0, ("other", "other doc", "type", 1))
+    cache.invalidate_document("Chunk", "u1")
+
+    assert cache.get("Chunk", "u1", 0, default="missing") == "missing"
+    assert cache.get("Chunk", "u1", 1, default="missing") == "missing"
+    assert cache.get("Chunk", "u2", 0) == ("other", "other doc", "type", 1)
+
+    cache.invalidate_document_name("Chunk", "other doc")
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_chunk_cache_evicts_least_recently_used():
+    cache = ChunkCache(max_entries=2)
+    cache.set("Chunk", "u1", 0, ("a", "doc", "type", 1))
+    cache.set("Chunk", "u1", 1, ("b", "doc", "type", 1))
+    cache.get("Chunk", "u1", 0)
+    cache.set("Chunk", "u1", 2, ("c", "doc", "type", 1))
+
+    assert cache.get("Chunk", "u1", 1, default="missing") == "missing"
+    assert cache.get("Chunk", "u1", 0) == ("a", "doc", "type", 1)
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_semantic_cache_tier_matches_exact_and_similar_queries():
+    cache = SemanticCacheTier()
+    cache.set("what is verba", "answer", [1.0, 0.0])
+
+    assert cache.get("what is verba") == ("answer", 0.0)
+    system, distance = cache.get("what's verba", [0.99, 0.05], max_distance=0.04)
+    assert system == "answer" and distance < 0.04
+    assert cache.get("unrelated", [0.0, 1.0]) == (None, None)
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_semantic_cache_tier_reuses_rows_of_evicted_entries():
+    cache = SemanticCacheTier(max_entries=2)
+    cache.set("first", "a", [1.0, 0.0])
+    cache.set("second", "b", [0.0, 1.0])
+    cache.get("first")
+    cache.set("third", "c", [0.0, -1.0])
+
+    assert cache.get("second", [0.0, 1.0]) == (None, None)
+    assert cache.get("near first", [1.0, 0.01])[0] == "a"
+    assert cache.get("near third", [0.01, -1.0])[0] == "c"
+    assert cache.get_stats()["evictions"] == 1
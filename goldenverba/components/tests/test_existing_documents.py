@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from goldenverba.components.reader.document import Document
+from goldenverba.verba_manager import VerbaManager
+
+STORED_NAMES = [f"doc{index}.md" for index in range(5)] + ["C:\\docs\\windows.txt"]
+
+
+def make_manager(client):
+    # Skip __init__, which connects to Weaviate
+    manager = VerbaManager.__new__(VerbaManager)
+    manager.client = client
+    manager.embedder_manager = SimpleNamespace(
+        selected_embedder=SimpleNamespace(vectorizer="MiniLM")
+    )
+    for name in STORED_NAMES:
+        client.add("Document_MiniLM", {"doc_name": name})
+    return manager
+
+
+def test_existing_documents_are_paged_with_a_cursor(weaviate_client):
+    manager = make_manager(weaviate_client)
+
+    existing_documents = manager.get_existing_documents(page_size=2)
+
+    assert sorted(existing_documents) == sorted(STORED_NAMES)
+    assert existing_documents == {
+        properties["doc_name"]: uuid
+        for uuid, properties in weaviate_client.objects["Document_MiniLM"].items()
+    }
+
+
+def test_bulk_existence_check_matches_the_per_document_check(weaviate_client):
+    manager = make_manager(weaviate_client)
+    existing_documents = manager.get_existing_documents(page_size=4)
+    names = STORED_NAMES + ["new.md", "doc10.md", "C:\\docs\\other.txt", ""]
+
+    for name in names:
+        document = Document(name=name)
+        assert manager.check_if_document_exits(
+            document, existing_documents
+        ) == manager.check_if_document_exits(document), name
@@ -0,0 +1,131 @@
+import time
+
+import pytest
+
+from goldenverba import import_pipeline
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.reader.document import Document
+from goldenverba.import_pipeline import ImportPipeline
+
+
+def split_words(chunker, document, units, overlap):
+    # Runs in the worker processes instead of a ChunkerManager, which would load tiktoken
+    words = document.text.split()
+    document.chunks = [
+        Chunk(text=" ".join(words[i : i + units]), chunk_id=i // units)
+        for i in range(0, len(words), units)
+    ]
+    for chunk in document.chunks:
+        chunk.set_tokens(units)
+    return document
+
+
+def fail_chunking(chunker, document, units, overlap):
+    raise ValueError(f"Can't chunk {document.name}")
+
+
+class FakeReaderManager:
+    def load(self, bytes, contents, paths, fileNames, document_type):
+        return [
+            Document(text=content, name=name, type=document_type)
+            for content, name in zip(contents, fileNames)
+        ]
+
+
+class FakeChunkerManager:
+    def __init__(self):
+        self.selected_chunker = object()
+        self.chunker = {"WordChunker": self.selected_chunker}
+
+
+class FakeEmbedder:
+    bulk_import = True
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.imported_chunks = []
+        self.finished = 0
+
+    def vectorize_chunk_batch(self, chunk_batch):
+        return chunk_batch
+
+    def import_chunk_batch(self, chunk_batch, client, finalize=True):
+        assert not finalize
+        if self.fail_after is not None and len(self.imported_chunks) >= self.fail_after:
+            raise Exception("Weaviate is down")
+        # A slow writer keeps the bounded queues in front of it full
+        time.sleep(0.01)
+        for document in chunk_batch.documents:
+            for chunk in document.chunks:
+                chunk.set_uuid(f"uuid-{document.name}")
+        self.imported_chunks.extend(chunk_batch.texts)
+        return True
+
+    def finish_import(self, client):
+        self.finished += 1
+
+
+class FakeEmbedderManager:
+    def __init__(self, embedder):
+        self.selected_embedder = embedder
+
+
+class FakeManager:
+    def __init__(self, embedder):
+        self.reader_manager = FakeReaderManager()
+        self.chunker_manager = FakeChunkerManager()
+        self.embedder_manager = FakeEmbedderManager(embedder)
+        self.client = None
+
+    def get_existing_documents(self):
+        return set()
+
+    def check_if_document_exits(self, document, existing_documents):
+        return False
+
+
+def run_pipeline(manager, documents: int, words: int = 10):
+    contents = [" ".join(f"w{d}-{i}" for i in range(words)) for d in range(documents)]
+    names = [f"doc{d}" for d in range(documents)]
+    pipeline = ImportPipeline(
+        manager, queue_size=1, chunk_workers=2, embed_batch_chunks=4
+    )
+    return pipeline.run([], contents, [], names, "Documentation", 3, 0)
+
+
+def test_pipeline_writes_all_chunks_through_bounded_queues(monkeypatch):
+    monkeypatch.setattr(import_pipeline, "_chunk_document", split_words)
+    embedder = FakeEmbedder()
+
+    imported = run_pipeline(FakeManager(embedder), documents=20)
+
+    assert sorted(document.name for document in imported) == sorted(
+        f"doc{d}" for d in range(20)
+    )
+    assert all(document.chunk_count == 4 for document in imported)
+    assert all(document.uuid == f"uuid-{document.name}" for document in imported)
+    assert len(embedder.imported_chunks) == 20 * 4
+    assert embedder.finished == 1
+
+
+def test_pipeline_propagates_chunk_worker_errors(monkeypatch):
+    monkeypatch.setattr(import_pipeline, "_chunk_document", fail_chunking)
+    embedder = FakeEmbedder()
+
+    with pytest.raises(Exception, match="Can't chunk"):
+        run_pipeline(FakeManager(embedder), documents=20)
+    assert embedder.imported_chunks == []
+    assert embedder.finished == 0
+
+
+def test_pipeline_propagates_writer_errors_and_finishes_partial_imports(
+    monkeypatch,
+):
+    monkeypatch.setattr(import_pipeline, "_chunk_document", split_words)
+    embedder = FakeEmbedder(fail_after=8)
+
+    with pytest.raises(Exception, match="Weaviate is down"):
+        run_pipeline(FakeManager(embedder), documents=20)
+    assert 8 <= len(embedder.imported_chunks) < 20 * 4
+    # Written batches still get their index save and corpus version bump
+    assert embedder.finished == 1
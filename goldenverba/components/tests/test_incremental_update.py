@@ -0,0 +1,83 @@
+from goldenverba.components.chunking.chunk import Chunk, content_hash
+from goldenverba.components.chunking.sentencechunker import SentenceChunker
+from goldenverba.components.chunking.wordchunker import WordChunker
+from goldenverba.components.embedding.interface import diff_chunks
+from goldenverba.components.reader.document import Document
+
+
+def stored(uuid, chunk_id, text):
+    return {
+        "chunk_id": float(chunk_id),
+        "chunk_hash": Chunk(text=text).chunk_hash,
+        "_additional": {"id": uuid},
+    }
+
+
+def test_unchanged_chunks_are_kept():
+    chunks = [Chunk(text="a", chunk_id=0), Chunk(text="b", chunk_id=1)]
+    inserted, kept, deleted = diff_chunks(
+        [stored("u0", 0, "a"), stored("u1", 1, "b")], chunks
+    )
+    assert inserted == []
+    assert [(uuid, chunk_id) for uuid, chunk_id, _ in kept] == [("u0", 0), ("u1", 1)]
+    assert deleted == []
+
+
+def test_changed_chunks_are_inserted_and_deleted():
+    chunks = [Chunk(text="a", chunk_id=0), Chunk(text="new", chunk_id=1)]
+    inserted, kept, deleted = diff_chunks(
+        [stored("u0", 0, "a"), stored("u1", 1, "b")], chunks
+    )
+    assert inserted == [chunks[1]]
+    assert [uuid for uuid, _, _ in kept] == ["u0"]
+    assert deleted == ["u1"]
+
+
+def test_moved_chunks_keep_their_stored_chunk_id():
+    chunks = [Chunk(text="b", chunk_id=0)]
+    inserted, kept, deleted = diff_chunks(
+        [stored("u0", 0, "a"), stored("u1", 1, "b")], chunks
+    )
+    assert inserted == []
+    assert kept == [("u1", 1, chunks[0])]
+    assert deleted == ["u0"]
+
+
+def test_duplicate_chunks_are_matched_once():
+    chunks = [Chunk(text="a", chunk_id=0), Chunk(text="a", chunk_id=1)]
+    inserted, kept, deleted = diff_chunks([stored("u0", 0, "a")], chunks)
+    assert inserted == [chunks[1]]
+    assert kept == [("u0", 0, chunks[0])]
+    assert deleted == []
+
+
+def test_chunks_without_hash_are_replaced():
+    chunks = [Chunk(text="a", chunk_id=0)]
+    inserted, kept, deleted = diff_chunks(
+        [{"chunk_id": 0.0, "chunk_hash": None, "_additional": {"id": "u0"}}], chunks
+    )
+    assert inserted == chunks
+    assert kept == []
+    assert deleted == ["u0"]
+
+
+def test_hashes_follow_the_text():
+    chunk = Chunk(text="a")
+    document = Document(text="a")
+    assert chunk.chunk_hash == document.doc_hash == content_hash("a")
+
+    chunk.text = "b"
+    document.text = "b"
+    assert chunk.chunk_hash == document.doc_hash == content_hash("b")
+
+
+def test_chunking_names_the_chunker_and_its_parameters():
+    assert WordChunker().get_chunking(2, 1) == "WordChunker:2:1"
+    assert SentenceChunker().get_chunking(2, 1) == "SentenceChunker:2:1"
+
+
+def test_stored_chunking_is_parsed_back():
+    chunking = WordChunker().get_chunking(5000, 0)
+    assert WordChunker.parse_chunking(chunking) == (5000, 0)
+    assert WordChunker.parse_chunking("") is None
+    assert WordChunker.parse_chunking(None) is None
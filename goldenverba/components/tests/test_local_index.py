@@ -0,0 +1,195 @@
+import numpy as np
+
+from goldenverba.components.embedding.local_index import (
+    LocalIndex,
+    autocut,
+    relative_score_fusion,
+)
+
+
+def make_index(path=None, **kwargs):
+    index = LocalIndex(path, **kwargs)
+    index.add_document(
+        "u1",
+        "animals",
+        "t",
+        [0, 1, 2],
+        ["the cat sat on the mat", "dogs chase the cat", "birds sing"],
+        np.array([[1, 0, 0], [0.8, 0.6, 0], [0, 0, 1]], dtype=np.float32),
+    )
+    index.add_document(
+        "u2",
+        "weather",
+        "t",
+        [0],
+        ["rain and sun"],
+        np.array([[0, 1, 0]], dtype=np.float32),
+    )
+    return index
+
+
+def test_keyword_search_ranks_by_bm25():
+    scores = make_index().search_keyword("cat", 10)
+    assert set(scores) == {0, 1}
+    # The shorter chunk ranks higher for the same term frequency
+    assert scores[1] > scores[0]
+
+
+def test_vector_search_uses_cosine_similarity():
+    scores = make_index().search_vector([2, 0, 0], 2)
+    assert set(scores) == {0, 1}
+    assert round(scores[0], 5) == 1.0
+    assert round(scores[1], 5) == 0.8
+
+
+def test_relative_score_fusion_normalizes_both_searches():
+    fused = relative_score_fusion({1: 0.9, 2: 0.5}, {2: 4.0, 3: 2.0}, alpha=0.75)
+    assert fused == [(1, 0.75), (2, 0.25), (3, 0.0)]
+
+
+def test_autocut_cuts_at_score_jumps():
+    scores = [1.0, 0.99, 0.98, 0.3, 0.29, 0.28, 0.05]
+    assert autocut(scores, 1) == 3
+    assert autocut(scores, 2) == 6
+    assert autocut([0.5, 0.5], 1) == 2
+
+
+def test_hybrid_search_returns_chunks():
+    chunks = make_index().hybrid_search("cat", [1, 0, 0], autocut_limit=0)
+    # Chunk 1 is second in the vector search but first in the keyword search
+    assert [(chunk.doc_uuid, chunk.chunk_id) for chunk in chunks][:2] == [
+        ("u1", 1),
+        ("u1", 0),
+    ]
+    assert round(chunks[0].score, 5) == 0.85
+
+
+def test_removed_documents_are_not_found():
+    index = make_index()
+    index.remove_document_name("animals")
+    assert {chunk.doc_uuid for chunk in index.hybrid_search("cat", [1, 0, 0])} == {
+        "u2"
+    }
+    assert len(index) == 1
+    # Removing most rows compacts the index
+    assert len(index.texts) == 1
+
+
+def test_update_reuses_vectors_of_unchanged_chunks():
+    index = make_index()
+    index.update_document(
+        "u1",
+        "animals",
+        "t",
+        [0, 1],
+        ["dogs chase the cat", "fish swim"],
+        [None, np.array([0, 0, 1], dtype=np.float32)],
+    )
+    chunks = index.hybrid_search("", [0.8, 0.6, 0], autocut_limit=0)
+    assert (chunks[0].doc_uuid, chunks[0].chunk_id, chunks[0].text) == (
+        "u1",
+        0,
+        "dogs chase the cat",
+    )
+    assert len(index) == 3
+
+
+def test_index_persists_with_memory_mapped_vectors(tmp_path):
+    make_index(str(tmp_path)).save()
+    index = LocalIndex(str(tmp_path))
+
+    assert isinstance(index.vectors, np.memmap)
+    assert len(index) == 4
+    assert index.hybrid_search("rain", [0, 1, 0])[0].doc_name == "weather"
+
+
+def test_ivf_search_finds_nearest_vectors():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+    index = LocalIndex(ivf_min_rows=1000, nprobe=4)
+    index.add_document("u", "doc", "t", list(range(2000)), ["text"] * 2000, vectors)
+
+    # Searches never train, IVF is trained when the index is saved
+    index.search_vector(vectors[0], 5)
+    assert index.get_stats()["ivf_lists"] == 0
+    index.save()
+
+    scores = index.search_vector(vectors[123] + 0.01, 5)
+    assert max(scores, key=scores.get) == 123
+    assert index.get_stats()["ivf_lists"] == 44
+
+
+def test_appends_grow_the_vector_buffer_geometrically(tmp_path):
+    index = LocalIndex(str(tmp_path))
+    capacities = set()
+    for chunk_id in range(100):
+        index.add_document(
+            f"u{chunk_id}",
+            "doc",
+            "t",
+            [chunk_id],
+            [f"text {chunk_id}"],
+            np.array([[1, chunk_id, 0]], dtype=np.float32),
+        )
+        capacities.add(len(index._vector_buffer))
+    assert capacities == {1, 2, 4, 8, 16, 32, 64, 128}
+    assert index.vectors.shape == (100, 3)
+
+    index.save()
+    index = LocalIndex(str(tmp_path))
+    index.add_document("new", "doc", "t", [0], ["new text"], np.array([[0, 0, 1]]))
+    assert index.vectors.shape == (101, 3)
+    assert list(index.search_vector([0, 0, 1], 1)) == [100]
+
+
+def test_saving_keeps_the_vector_buffer(tmp_path):
+    index = make_index(str(tmp_path))
+    buffer = index._vector_buffer
+    index.save()
+    assert index._vector_buffer is buffer
+    assert index.vectors.flags.writeable
+
+
+def test_ivf_lists_are_restored_on_load(tmp_path):
+    vectors = np.random.default_rng(1).normal(size=(1000, 8)).astype(np.float32)
+    index = LocalIndex(str(tmp_path), ivf_min_rows=1000)
+    index.add_document("u", "doc", "t", list(range(1000)), ["text"] * 1000, vectors)
+    index.save()
+
+    loaded = LocalIndex(str(tmp_path), ivf_min_rows=1000)
+    np.testing.assert_array_equal(loaded._centroids, index._centroids)
+    assert loaded._lists == index._lists
+
+
+def test_saves_of_two_processes_are_merged(tmp_path):
+    first = make_index(str(tmp_path))
+    first.save()
+    second = LocalIndex(str(tmp_path))
+
+    first.add_document("u3", "first", "t", [0], ["first text"], np.array([[1, 1, 0]]))
+    first.save()
+    second.remove_document("u2")
+    second.add_document("u4", "second", "t", [0], ["second text"], np.array([[0, 1, 1]]))
+    # The outdated index reloads the first save and replays its own changes on top
+    second.save()
+
+    merged = LocalIndex(str(tmp_path))
+    assert {chunk.doc_name for chunk in merged.hybrid_search("text", None)} == {
+        "first",
+        "second",
+    }
+    assert "u2" not in merged._doc_rows
+    assert len(merged) == 5
+
+
+def test_outdated_index_is_refreshed(tmp_path):
+    first = make_index(str(tmp_path))
+    first.save()
+    second = LocalIndex(str(tmp_path))
+    assert not second.refresh()
+
+    first.remove_document_name("weather")
+    first.save()
+    assert second.refresh()
+    assert "u2" not in second._doc_rows
+    assert not second.refresh()
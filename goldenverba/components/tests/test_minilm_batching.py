@@ -0,0 +1,96 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    import torch
+except ImportError:
+    pytest.skip("torch is not installed", allow_module_level=True)
+
+from goldenverba.components.embedding.MiniLMEmbedder import MiniLMEmbedder
+
+CLS_ID = 1
+SEP_ID = 2
+# Far from every word id, so pooling over padding would shift the mean visibly
+PAD_ID = 1000
+
+
+class FakeTokenizer:
+    cls_token_id = CLS_ID
+    sep_token_id = SEP_ID
+    pad_token_id = PAD_ID
+    model_max_length = 512
+
+    def __call__(self, texts, **kwargs):
+        input_ids = []
+        offset_mapping = []
+        for text in texts:
+            ids = []
+            offsets = []
+            position = 0
+            for word in text.split(" "):
+                # The token id is the word itself, which the fake model echoes back
+                ids.append(int(word))
+                offsets.append((position, position + len(word)))
+                position += len(word) + 1
+            input_ids.append(ids)
+            offset_mapping.append(offsets)
+        return {"input_ids": input_ids, "offset_mapping": offset_mapping}
+
+
+class FakeModel:
+    def __init__(self):
+        self.batch_shapes = []
+
+    def __call__(self, input_ids, attention_mask):
+        self.batch_shapes.append(tuple(input_ids.shape))
+        # Every token's hidden state is its id, so the pooled value is the mean id
+        hidden = input_ids.to(torch.float32).unsqueeze(-1)
+        return SimpleNamespace(last_hidden_state=torch.cat([hidden, -hidden], dim=-1))
+
+
+def make_embedder(batch_size):
+    # Skip __init__, which downloads the real model
+    embedder = MiniLMEmbedder.__new__(MiniLMEmbedder)
+    embedder.tokenizer = FakeTokenizer()
+    embedder.model = FakeModel()
+    embedder.device = torch.device("cpu")
+    embedder.batch_size = batch_size
+    embedder.window_stride = 0
+    embedder.tokenizer_lock = threading.Lock()
+    embedder.embedding_cache = None
+    return embedder
+
+
+def expected_vector(text):
+    ids = [CLS_ID] + [int(word) for word in text.split(" ")] + [SEP_ID]
+    mean = sum(ids) / len(ids)
+    return [mean, -mean]
+
+
+def test_batched_vectors_keep_input_order():
+    # Lengths are out of order, so the length-sorted batches reorder the texts
+    texts = ["10 20 30 40 50", "7", "3 4 5", "100 200", "9 9 9 9"]
+    embedder = make_embedder(batch_size=2)
+
+    vectors = embedder.vectorize_batch(texts)
+
+    assert len(embedder.model.batch_shapes) == 3
+    assert len(vectors) == len(texts)
+    for text, vector in zip(texts, vectors):
+        assert vector == pytest.approx(expected_vector(text))
+
+
+def test_masked_mean_ignores_padding():
+    short = "5 6"
+    long = "10 11 12 13 14 15 16 17"
+    embedder = make_embedder(batch_size=2)
+
+    padded = embedder.vectorize_batch([short, long])
+    alone = embedder.vectorize_batch([short])
+
+    # The short text was padded to the long one's length in the first call
+    assert embedder.model.batch_shapes == [(2, 10), (1, 4)]
+    assert padded[0] == pytest.approx(alone[0])
+    assert padded[0] == pytest.approx(expected_vector(short))
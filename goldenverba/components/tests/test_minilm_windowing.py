@@ -0,0 +1,52 @@
+import pytest
+
+from goldenverba.components.embedding.MiniLMEmbedder import split_token_windows
+
+
+def word_offsets(word_lengths):
+    # One token per entry, words separated by a single space
+    offsets = []
+    position = 0
+    for length in word_lengths:
+        offsets.append((position, position + length))
+        position += length + 1
+    return offsets
+
+
+def test_short_text_is_single_window():
+    windows = split_token_windows([1, 2, 3], word_offsets([1, 1, 1]), 5)
+    assert windows == [[1, 2, 3]]
+
+
+def test_empty_text_is_single_window():
+    assert split_token_windows([], [], 5) == [[]]
+
+
+def test_windows_without_stride():
+    ids = list(range(10))
+    windows = split_token_windows(ids, word_offsets([1] * 10), 4)
+    assert windows == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_windows_with_stride():
+    ids = list(range(10))
+    windows = split_token_windows(ids, word_offsets([1] * 10), 4, stride=2)
+    assert windows == [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7], [6, 7, 8, 9]]
+
+
+def test_windows_do_not_split_words():
+    # Tokens 2 and 3 are subwords of the same word
+    offsets = [(0, 3), (4, 7), (8, 11), (11, 14), (15, 18), (19, 22)]
+    windows = split_token_windows(list(range(6)), offsets, 3)
+    assert windows == [[0, 1], [2, 3, 4], [5]]
+
+
+def test_single_long_word_is_split():
+    offsets = [(i, i + 1) for i in range(6)]
+    windows = split_token_windows(list(range(6)), offsets, 4)
+    assert windows == [[0, 1, 2, 3], [4, 5]]
+
+
+def test_invalid_stride():
+    with pytest.raises(ValueError):
+        split_token_windows(list(range(6)), word_offsets([1] * 6), 4, stride=4)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.reranking.interface import Reranker
+from goldenverba.components.retriever.manager import RetrieverManager
+from goldenverba.components.retriever.SimpleRetriever import SimpleRetriever
+
+
+class FakeReranker(Reranker):
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+        self.scored = []
+        self.batch_size = 2
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        time.sleep(self.delay * len(pairs))
+        self.scored.extend(pairs)
+        # Shorter chunks are more relevant
+        return [1 / len(text) for _, text in pairs]
+
+
+def make_chunks():
+    chunks = []
+    for i, text in enumerate(["a" * 4, "b" * 3, "c" * 2, "d"]):
+        chunk = Chunk(text, "doc", "type", "uuid", i)
+        chunk.set_score(1 - i * 0.1)
+        chunks.append(chunk)
+    return chunks
+
+
+def test_rerank_orders_by_relevance_and_keeps_top_k():
+    reranker = FakeReranker()
+    reranker.top_k = 3
+
+    chunks = reranker.rerank(["query"], make_chunks())
+
+    assert [chunk.text for chunk in chunks] == ["d", "cc", "bbb"]
+    assert chunks[0].score == 1.0
+
+
+def test_rerank_scores_are_cached_per_query_and_chunk():
+    reranker = FakeReranker()
+    reranker.rerank(["query"], make_chunks())
+    reranker.rerank(["query"], make_chunks())
+    reranker.rerank(["other query"], make_chunks())
+
+    assert len(reranker.scored) == 8
+    assert reranker.get_cache_stats()["score_cache"]["hits"] == 4
+
+
+def test_multi_query_rerank_scores_only_the_missing_pairs():
+    reranker = FakeReranker()
+    reranker.rerank(["query"], make_chunks())
+    reranker.scored = []
+
+    chunks = reranker.rerank(["query", "other query"], make_chunks())
+
+    assert reranker.scored == [("other query", chunk.text) for chunk in make_chunks()]
+    assert chunks[0].score == 1.0
+
+
+def test_selected_reranker_is_preloaded_and_reports_its_cache():
+    manager = RetrieverManager()
+    assert manager.get_cache_stats() is None
+
+    reranker = FakeReranker()
+    loaded = threading.Event()
+    reranker.load = lambda: loaded.set() or True
+    manager.rerankers["FakeReranker"] = reranker
+    manager.set_reranker("FakeReranker")
+    manager.preload_reranker()
+
+    assert loaded.wait(5)
+    reranker.rerank(["query"], make_chunks())
+    assert manager.get_cache_stats()["score_cache"]["misses"] == 4
+
+
+def test_rerank_falls_back_to_fused_order_when_over_budget():
+    reranker = FakeReranker(delay=0.02)
+    reranker.budget_ms = 50
+
+    chunks = reranker.rerank(["query"], make_chunks())
+
+    # The first batch is scored, the rest would exceed the budget
+    assert len(reranker.scored) == 2
+    assert [chunk.text for chunk in chunks] == ["bbb", "aaaa", "cc", "d"]
+
+
+def test_retriever_uses_reranker_order_for_context():
+    retriever = SimpleRetriever()
+    retriever.reranker = FakeReranker()
+    chunks = retriever.rank_chunks(["query"], make_chunks())
+
+    assert retriever.assemble_context(chunks) == "d cc bbb aaaa "
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+from weaviate.gql.get import GetBuilder
+
+from goldenverba.components.embedding.cache import QueryVectorCache
+from goldenverba.components.embedding.interface import Embedder
+from goldenverba.components.retriever.SimpleRetriever import SimpleRetriever
+
+
+class FakeEmbedder(Embedder):
+    def __init__(self):
+        self.query_cache = QueryVectorCache()
+        self.batches = []
+
+    def get_chunk_class(self) -> str:
+        return "Chunk_Fake"
+
+    def get_need_vectorization(self) -> bool:
+        return True
+
+    def vectorize_queries(self, queries: list[str]) -> list[list[float]]:
+        self.batches.append(queries)
+        return [[float(len(query))] for query in queries]
+
+
+def stored(doc_uuid, chunk_id, score):
+    return {
+        "text": f"{doc_uuid}-{chunk_id}",
+        "doc_name": doc_uuid,
+        "doc_type": "t",
+        "doc_uuid": doc_uuid,
+        "chunk_id": float(chunk_id),
+        "_additional": {"score": str(score)},
+    }
+
+
+def make_client(results_per_query, requests):
+    def multi_get(searches):
+        requests.append([search.build(wrap_get=False) for search in searches])
+        return SimpleNamespace(
+            do=lambda: {
+                "data": {
+                    "Get": {
+                        search.name: results_per_query[int(search.name.split("_")[1])]
+                        for search in searches
+                    }
+                }
+            }
+        )
+
+    return SimpleNamespace(
+        query=SimpleNamespace(
+            get=lambda class_name, properties: GetBuilder(class_name, properties, None),
+            multi_get=multi_get,
+        )
+    )
+
+
+def test_queries_are_vectorized_and_searched_in_one_batch():
+    requests = []
+    client = make_client(
+        [[stored("u1", 0, 0.5)], [stored("u1", 0, 0.9), stored("u2", 3, 0.4)]],
+        requests,
+    )
+    embedder = FakeEmbedder()
+
+    chunks, context = SimpleRetriever().retrieve(["first", "second"], client, embedder)
+
+    assert embedder.batches == [["first", "second"]]
+    assert len(requests) == 1
+    assert "query_0: Chunk_Fake" in requests[0][0]
+    assert "query_1: Chunk_Fake" in requests[0][1]
+    assert [(chunk.doc_uuid, chunk.chunk_id) for chunk in chunks] == [
+        ("u1", 0.0),
+        ("u2", 3.0),
+    ]
+    assert chunks[0].score == 0.9
+    assert context == "u1-0 u2-3 "
+
+
+def test_queries_are_split_into_request_batches():
+    requests = []
+    client = make_client([[], [], []], requests)
+    embedder = FakeEmbedder()
+    retriever = SimpleRetriever()
+    retriever.query_batch_size = 2
+
+    retriever.retrieve(["a", "b", "a"], client, embedder)
+
+    assert [len(request) for request in requests] == [2, 1]
+    assert embedder.batches == [["a", "b"]]
+
+
+def test_async_retrieval_vectorizes_the_queries_once():
+    requests = []
+    client = make_client([[stored("u1", 0, 0.5)]], requests)
+    embedder = FakeEmbedder()
+    embedder.query_cache = QueryVectorCache(max_entries=0)
+
+    chunks, _ = asyncio.run(SimpleRetriever().aretrieve(["first"], client, embedder))
+
+    assert embedder.batches == [["first"]]
+    assert [chunk.doc_uuid for chunk in chunks] == ["u1"]
@@ -0,0 +1,98 @@
+import json
+
+from goldenverba.components.embedding.cache import SemanticCacheMetrics
+from goldenverba.components.embedding.cache_calibration import (
+    calibrate_threshold,
+    read_query_log,
+    replay_query_log,
+)
+from goldenverba.components.embedding.interface import Embedder
+
+
+def test_calibration_picks_the_highest_hit_rate_at_the_target_precision():
+    samples = [
+        (0.0, True),
+        (0.02, True),
+        (0.03, True),
+        (0.05, False),
+        (0.06, True),
+        (0.2, False),
+        (None, False),
+    ]
+    result = calibrate_threshold(samples, target_precision=0.8)
+
+    assert result["threshold"] == 0.06
+    assert result["hit_rate"] == 5 / 7
+    assert result["precision"] == 0.8
+    assert result["queries"] == 7
+    assert len(result["curve"]) == 6
+
+
+def test_calibration_without_a_precise_threshold():
+    result = calibrate_threshold([(0.01, False), (0.02, True)], target_precision=0.9)
+    assert result["threshold"] is None
+
+
+class FakeEmbedder:
+    def __init__(self, nearest):
+        self.nearest = nearest
+
+    def get_nearest_cached_query(self, client, query):
+        return self.nearest.get(query)
+
+
+def test_replay_compares_the_nearest_query_with_the_expected_match(tmp_path):
+    log = tmp_path / "queries.jsonl"
+    log.write_text(
+        "\n".join(
+            json.dumps(entry)
+            for entry in [
+                {"query": "what is verba", "match": "what's verba"},
+                {"query": "how to install", "match": None},
+                {"query": "unknown"},
+            ]
+        )
+    )
+    embedder = FakeEmbedder(
+        {
+            "what is verba": {"query": "what's verba", "_additional": {"distance": 0.02}},
+            "how to install": {"query": "how to import", "_additional": {"distance": 0.1}},
+        }
+    )
+
+    assert replay_query_log(None, embedder, read_query_log(str(log))) == [
+        (0.02, True),
+        (0.1, False),
+        (None, False),
+    ]
+
+
+def test_metrics_track_hits_distances_and_saved_time():
+    metrics = SemanticCacheMetrics()
+    metrics.record_generation(2.0)
+    metrics.record_lookup(True, 0.0, 0.5, "local")
+    metrics.record_lookup(True, 0.035, 0.5, "similar")
+    metrics.record_lookup(False, 0.3, 0.5)
+    metrics.record_lookup(False, None, 0.5)
+
+    stats = metrics.get_stats()
+    assert stats["hit_rate"] == 0.5
+    assert stats["hits_by_tier"] == {"local": 1, "similar": 1}
+    assert stats["distance_histogram"]["<=0.01"] == 1
+    assert stats["distance_histogram"]["<=0.04"] == 1
+    assert stats["distance_histogram"]["<=0.3"] == 1
+    assert stats["saved_seconds"] == 3.0
+    assert stats["saved_seconds_per_hit"] == 1.5
+
+
+def test_distance_threshold_per_embedder(monkeypatch):
+    monkeypatch.setenv("VERBA_SEMANTIC_CACHE_DISTANCE", "0.05")
+    monkeypatch.setenv("VERBA_SEMANTIC_CACHE_DISTANCE_MINILMEMBEDDER", "0.1")
+
+    embedder = Embedder()
+    embedder.name = "MiniLMEmbedder"
+    other_embedder = Embedder()
+    other_embedder.name = "ADAEmbedder"
+
+    assert embedder.get_semantic_cache_distance() == 0.1
+    assert other_embedder.get_semantic_cache_distance() == 0.05
@@ -0,0 +1,139 @@
+from goldenverba.components.embedding.cache import SemanticCacheTier
+from goldenverba.components.embedding.cache_eviction import (
+    SemanticCacheEvictor,
+    get_eviction_filters,
+    get_overflow_sort,
+    semantic_cache_uuid,
+)
+
+CLASS_NAME = "Cache_MiniLM"
+
+
+def entry(query, created_at=0.0, last_hit=0.0, hit_count=0, corpus_version=1):
+    return {
+        "id": semantic_cache_uuid(query, CLASS_NAME),
+        "query": query,
+        "created_at": created_at,
+        "last_hit": last_hit,
+        "hit_count": hit_count,
+        "corpus_version": corpus_version,
+    }
+
+
+def seeded_client(make_weaviate_client, entries):
+    client = make_weaviate_client()
+    for e in entries:
+        client.add(CLASS_NAME, e, uuid=e["id"])
+    return client
+
+
+def stored_queries(client):
+    return [e["query"] for e in client.get_objects(CLASS_NAME)]
+
+
+def test_stale_and_expired_entries_are_filtered_by_weaviate():
+    filters = get_eviction_filters(now=100, corpus_version=2, max_age=50)
+
+    assert filters["stale"] == {
+        "path": ["corpus_version"],
+        "operator": "LessThan",
+        "valueInt": 2,
+    }
+    assert filters["expired"]["valueNumber"] == 50
+    assert "expired" not in get_eviction_filters(now=100, corpus_version=2)
+
+
+def test_overflow_is_sorted_by_policy():
+    assert [s["path"] for s in get_overflow_sort("LRU")] == [["last_hit"], ["created_at"]]
+    assert [s["path"] for s in get_overflow_sort("LFU")] == [["hit_count"], ["last_hit"]]
+
+
+def test_sweep_evicts_stale_expired_and_overflowing_entries(make_weaviate_client):
+    client = seeded_client(
+        make_weaviate_client,
+        [
+            entry("old version", created_at=1e12, corpus_version=0),
+            entry("expired", created_at=0, last_hit=1e12),
+            *[entry(f"q{index}", created_at=1e12, last_hit=index) for index in range(5)],
+        ],
+    )
+    evictor = SemanticCacheEvictor(max_entries=3, max_age=60, page_size=2)
+
+    evicted = evictor.evict(client, CLASS_NAME, corpus_version=1)
+
+    assert sorted(evicted) == ["expired", "old version", "q0", "q1"]
+    assert stored_queries(client) == ["q2", "q3", "q4"]
+    assert evictor.get_stats()["evictions"] == {"stale": 1, "expired": 1, "overflow": 2}
+
+
+def test_entries_without_metadata_are_evicted_first(make_weaviate_client):
+    legacy = {"id": semantic_cache_uuid("legacy", CLASS_NAME), "query": "legacy"}
+    client = seeded_client(make_weaviate_client, [entry("recent", last_hit=10), legacy])
+    evictor = SemanticCacheEvictor(max_entries=1)
+
+    assert evictor.evict(client, CLASS_NAME, corpus_version=1) == ["legacy"]
+    assert stored_queries(client) == ["recent"]
+
+
+def test_sweep_writes_hits_before_the_overflow(make_weaviate_client):
+    client = seeded_client(
+        make_weaviate_client,
+        [entry(f"q{index}", created_at=index, last_hit=index) for index in range(4)],
+    )
+    evictor = SemanticCacheEvictor(max_entries=3)
+    evictor.record_hit("q0", now=1000)
+    evictor.record_hit("q0", now=1001)
+
+    assert evictor.evict(client, CLASS_NAME, corpus_version=1) == ["q1"]
+    assert client.written == [
+        (semantic_cache_uuid("q0", CLASS_NAME), {"hit_count": 2, "last_hit": 1001})
+    ]
+    assert evictor.get_stats()["pending_hits"] == 0
+
+
+def test_hits_are_written_in_one_batch_of_a_dedicated_client(make_weaviate_client):
+    client = seeded_client(make_weaviate_client, [entry("q0"), entry("q1")])
+    sweep_client = make_weaviate_client()
+    evictor = SemanticCacheEvictor(max_entries=0, client_factory=lambda: sweep_client)
+    evictor.record_hit("q0", now=1000)
+    evictor.record_hit("missing", now=1000)
+
+    evictor.evict(client, CLASS_NAME, corpus_version=1)
+
+    assert client.written == []
+    assert [
+        (uuid, properties["hit_count"]) for uuid, properties in sweep_client.written
+    ] == [(semantic_cache_uuid("q0", CLASS_NAME), 1)]
+
+
+def test_invalidated_entries_drop_their_pending_hits(make_weaviate_client):
+    client = seeded_client(make_weaviate_client, [entry("q0"), entry("q1")])
+    evictor = SemanticCacheEvictor(max_entries=0)
+    evictor.record_hit("q0", now=1000)
+    evictor.record_hit("q1", now=1000)
+
+    assert evictor.invalidate(
+        client,
+        CLASS_NAME,
+        {
+            "path": ["id"],
+            "operator": "ContainsAny",
+            "valueTextArray": [semantic_cache_uuid("q0", CLASS_NAME)],
+        },
+    ) == ["q0"]
+    evictor.evict(client, CLASS_NAME, corpus_version=1)
+
+    assert [uuid for uuid, _ in client.written] == [
+        semantic_cache_uuid("q1", CLASS_NAME)
+    ]
+    assert stored_queries(client) == ["q1"]
+
+
+def test_evicted_queries_are_removed_from_the_local_tier():
+    cache = SemanticCacheTier()
+    cache.set("evicted", "a", [1.0, 0.0])
+    cache.set("kept", "b", [0.0, 1.0])
+    cache.remove(["evicted"])
+
+    assert cache.match("evicted", [1.0, 0.0]) == (None, None, None)
+    assert cache.match("similar to kept", [0.01, 1.0])[:2] == ("kept", "b")
@@ -0,0 +1,77 @@
+from goldenverba.components.embedding.interface import Embedder
+from goldenverba.write_behind import WriteBehindQueue
+
+
+def make_embedder(corpus_version=3):
+    embedder = Embedder()
+    embedder.vectorizer = "MiniLM"
+    embedder.corpus_version = corpus_version
+    embedder.corpus_version_ttl = float("inf")
+    embedder.vectorize_query = lambda query: [1.0, 0.0]
+    embedder.cache_evictor.page_size = 1
+    return embedder
+
+
+def test_invalidation_removes_only_answers_citing_the_documents(weaviate_client):
+    embedder = make_embedder()
+    weaviate_client.add("Cache_MiniLM", {"query": "cites a", "doc_uuids": ["a", "b"]})
+    weaviate_client.add("Cache_MiniLM", {"query": "cites b", "doc_uuids": ["b"]})
+    weaviate_client.add("Cache_MiniLM", {"query": "cites c", "doc_uuids": ["c"]})
+    embedder.semantic_cache.set("cites a", "answer a", [1.0, 0.0])
+    embedder.semantic_cache.set("cites c", "answer c", [0.0, 1.0])
+
+    assert embedder.invalidate_semantic_cache(weaviate_client, ["b"]) == 2
+    assert [
+        entry["query"] for entry in weaviate_client.get_objects("Cache_MiniLM")
+    ] == ["cites c"]
+    assert embedder.semantic_cache.get("cites a") == (None, None)
+    assert embedder.semantic_cache.get("cites c") == ("answer c", 0.0)
+    assert embedder.corpus_version == 3
+
+
+def test_invalidation_discards_pending_answers_citing_the_documents(weaviate_client):
+    embedder = make_embedder()
+    queue = WriteBehindQueue(None, flush_interval=60)
+    queue.add("Cache_MiniLM", {"query": "a", "doc_uuids": ["a"]}, key="a")
+    queue.add("Cache_MiniLM", {"query": "c", "doc_uuids": ["c"]}, key="c")
+    queue.add("Suggestion", {"suggestion": "a"}, key="a")
+    embedder.write_behind = queue
+
+    embedder.invalidate_semantic_cache(weaviate_client, ["a"])
+    assert queue.get_stats()["pending"] == 2
+    assert queue.discard(["Cache_MiniLM"]) == 1
+    queue.discard()
+    queue.close()
+
+
+def test_corpus_version_is_stored_in_weaviate(weaviate_client):
+    embedder = make_embedder(corpus_version=None)
+    other_process = make_embedder(corpus_version=None)
+    other_process.corpus_version_ttl = 0
+    # The sweep after a bump is covered by the eviction tests
+    embedder.maybe_evict_semantic_cache = lambda client, force=False: None
+
+    assert embedder.get_corpus_version(weaviate_client) == 0
+    embedder.bump_corpus_version(weaviate_client)
+    embedder.bump_corpus_version(weaviate_client)
+
+    assert embedder.get_corpus_version(weaviate_client) == 2
+    assert other_process.get_corpus_version(weaviate_client) == 2
+
+
+def test_answers_are_stamped_with_their_sources(recording_queue):
+    embedder = make_embedder()
+    embedder.add_to_semantic_cache(
+        None, "query", "answer", recording_queue, ["b", "a", "b"], 3
+    )
+
+    assert recording_queue.objects[0]["doc_uuids"] == ["a", "b"]
+    assert recording_queue.objects[0]["corpus_version"] == 3
+
+
+def test_answers_from_an_older_corpus_version_are_not_cached(recording_queue):
+    embedder = make_embedder()
+    embedder.add_to_semantic_cache(None, "query", "answer", recording_queue, ["a"], 2)
+
+    assert recording_queue.objects == []
+    assert embedder.semantic_cache.get("query") == (None, None)
@@ -0,0 +1,87 @@
+import pytest
+
+from goldenverba.components.reader.document import Document
+
+try:
+    from goldenverba.components.chunking.tiktokenchunker import TokenChunker
+
+    chunker = TokenChunker()
+except Exception:
+    pytest.skip("tiktoken encoding not available", allow_module_level=True)
+
+TEXT = "Grüße aus Köln 🌍! " * 40 + "The end of a long document with ünïcödé."
+
+
+def chunk_texts(slice_by_offsets, units, overlap):
+    chunker.slice_by_offsets = slice_by_offsets
+    try:
+        documents = chunker.chunk([Document(text=TEXT)], units, overlap)
+    finally:
+        chunker.slice_by_offsets = True
+    return [chunk.text for chunk in documents[0].chunks]
+
+
+@pytest.mark.parametrize(("units", "overlap"), [(7, 3), (10, 0), (50, 25), (1000, 10)])
+def test_offset_slicing_matches_decoding(units, overlap):
+    assert chunk_texts(True, units, overlap) == chunk_texts(False, units, overlap)
+
+
+def test_chunks_cover_document_without_overlap():
+    text = "Plain ascii text is never split inside a character. " * 20
+    documents = chunker.chunk([Document(text=text)], 10, 0)
+    assert "".join(chunk.text for chunk in documents[0].chunks) == text
+
+
+def test_overlap_greater_than_units():
+    assert chunk_texts(True, 5, 5) == []
+
+
+def test_chunk_stream_is_lazy():
+    def documents():
+        yield Document(text="first document text", name="first")
+        raise AssertionError("second document requested too early")
+
+    stream = chunker.chunk_stream(documents(), 2, 1)
+    document = next(stream)
+    assert document.name == "first"
+    assert [chunk.chunk_id for chunk in document.chunks] == list(
+        range(len(document.chunks))
+    )
+
+
+def test_iter_chunks_yields_ids_in_order():
+    chunks = chunker.iter_chunks(Document(text=TEXT), 20, 5)
+    assert next(chunks).chunk_id == 0
+    assert next(chunks).chunk_id == 1
+
+
+def test_parallel_chunking_matches_sequential():
+    texts = [TEXT[i * 7 :] for i in range(6)]
+    sequential = chunker.chunk([Document(text=text) for text in texts], 20, 5)
+    parallel = chunker.chunk([Document(text=text) for text in texts], 20, 5, workers=2)
+    for sequential_doc, parallel_doc in zip(sequential, parallel):
+        assert [(chunk.chunk_id, chunk.text) for chunk in parallel_doc.chunks] == [
+            (chunk.chunk_id, chunk.text) for chunk in sequential_doc.chunks
+        ]
+
+
+def test_chunks_report_token_counts():
+    documents = chunker.chunk([Document(text=TEXT)], 20, 5)
+    counts = [chunk.tokens for chunk in documents[0].chunks]
+    assert counts[:-1] == [20] * (len(counts) - 1)
+    assert 0 < counts[-1] <= 20
+
+
+def test_check_chunks_only_counts_unknown_chunks():
+    from goldenverba.components.chunking.chunk import Chunk
+    from goldenverba.components.chunking.manager import ChunkerManager
+
+    document = Document(text="two chunks")
+    document.chunks = [Chunk(text="counted"), Chunk(text="not counted yet")]
+    document.chunks[0].set_tokens(7)
+
+    assert ChunkerManager().check_chunks([document])
+    assert document.chunks[0].tokens == 7
+    assert document.chunks[1].tokens == len(
+        chunker.encoding.encode("not counted yet", disallowed_special=())
+    )
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.embedding.cache import ChunkCache
+from goldenverba.components.retriever.WindowRetriever import (
+    WindowRetriever,
+    neighbor_ranges,
+)
+
+
+def test_neighbor_ranges_merge_overlapping_windows():
+    assert neighbor_ranges({"doc": {5, 7}}, 2) == {"doc": [(3, 4), (6, 6), (8, 9)]}
+
+
+def test_neighbor_ranges_skip_negative_ids():
+    assert neighbor_ranges({"doc": {0}}, 2) == {"doc": [(1, 2)]}
+
+
+def test_neighbor_ranges_without_missing_chunks():
+    assert neighbor_ranges({"doc": {0, 1}}, 1) == {"doc": [(2, 2)]}
+    assert neighbor_ranges({"doc": {3}}, 0) == {}
+
+
+STORED = [
+    {"text": "b", "doc_name": "d", "doc_type": "t", "doc_uuid": "u1", "chunk_id": 1.0},
+    {"text": "x", "doc_name": "e", "doc_type": "t", "doc_uuid": "u2", "chunk_id": 4.0},
+]
+
+
+def make_setup(client):
+    for chunk in STORED:
+        client.add("Chunk_MiniLM", chunk)
+    embedder = SimpleNamespace(
+        get_chunk_class=lambda: "Chunk_MiniLM", chunk_cache=ChunkCache()
+    )
+    retriever = WindowRetriever()
+    retriever.window = 1
+    return retriever, embedder
+
+
+def retrieved_chunks():
+    return [
+        Chunk("a", "d", "t", "u1", 0),
+        Chunk("c", "d", "t", "u1", 2),
+        Chunk("y", "e", "t", "u2", 5.0),
+    ]
+
+
+def test_combine_context_fetches_neighbors_in_one_query(weaviate_client):
+    retriever, embedder = make_setup(weaviate_client)
+    requests = weaviate_client.requests
+    context = retriever.combine_context(retrieved_chunks(), weaviate_client, embedder)
+
+    assert len(requests) == 1
+    assert requests[0]["operator"] == "Or"
+    assert len(requests[0]["operands"]) == 4
+    assert context == "abcxy"
+
+
+def test_combine_context_serves_repeated_neighbors_from_cache(weaviate_client):
+    retriever, embedder = make_setup(weaviate_client)
+    requests = weaviate_client.requests
+    retriever.combine_context(retrieved_chunks(), weaviate_client, embedder)
+    context = retriever.combine_context(retrieved_chunks(), weaviate_client, embedder)
+
+    assert len(requests) == 1
+    assert context == "abcxy"
+
+
+def test_invalidated_document_is_fetched_again(weaviate_client):
+    retriever, embedder = make_setup(weaviate_client)
+    requests = weaviate_client.requests
+    retriever.combine_context(retrieved_chunks(), weaviate_client, embedder)
+    embedder.chunk_cache.invalidate_document("Chunk_MiniLM", "u2")
+    retriever.combine_context(retrieved_chunks(), weaviate_client, embedder)
+
+    assert len(requests) == 2
+    assert len(requests[1]["operands"]) == 2
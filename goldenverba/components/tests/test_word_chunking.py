@@ -68,3 +68,16 @@ def test_long_lengths():
     ]
     modified_documents = chunker.chunk(documents, 11, 2)
     assert len(modified_documents[0].chunks) == 2
+
+
+def test_parallel_chunking_matches_sequential():
+    texts = [f"Document {i} has a few words. " * (i + 3) for i in range(6)]
+    sequential = chunker.chunk([Document(text=text) for text in texts], 5, 2)
+    parallel = chunker.chunk([Document(text=text) for text in texts], 5, 2, workers=2)
+    for sequential_doc, parallel_doc in zip(sequential, parallel):
+        assert [chunk.text for chunk in parallel_doc.chunks] == [
+            chunk.text for chunk in sequential_doc.chunks
+        ]
+        assert [chunk.chunk_id for chunk in parallel_doc.chunks] == list(
+            range(len(parallel_doc.chunks))
+        )
@@ -0,0 +1,122 @@
+import threading
+from types import SimpleNamespace
+
+from goldenverba.write_behind import WriteBehindQueue
+
+
+class RecordingQueue(WriteBehindQueue):
+    def __init__(self, **kwargs):
+        super().__init__(None, **kwargs)
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def _write(self, items):
+        self.release.wait()
+        self.batches.append(items)
+        return 0
+
+
+def written_properties(queue):
+    return [
+        properties for batch in queue.batches for _, (_, properties, _) in batch
+    ]
+
+
+def test_write_behind_coalesces_writes_with_the_same_key():
+    queue = RecordingQueue(flush_interval=60)
+    queue.add("Suggestion", {"suggestion": "first"}, key="first")
+    queue.add("Suggestion", {"suggestion": "second"}, key="second")
+    queue.add("Suggestion", {"suggestion": "first"}, key="first")
+    queue.close()
+
+    assert written_properties(queue) == [
+        {"suggestion": "second"},
+        {"suggestion": "first"},
+    ]
+    assert len(queue.batches) == 1
+    assert queue.get_stats()["coalesced"] == 1
+    assert queue.get_stats()["written"] == 2
+
+
+def test_write_behind_drops_writes_when_full():
+    queue = RecordingQueue(max_pending=2, flush_interval=60)
+    queue.release.clear()
+    assert queue.add("Suggestion", {"suggestion": "a"})
+    assert queue.add("Suggestion", {"suggestion": "b"})
+    assert not queue.add("Suggestion", {"suggestion": "c"})
+
+    queue.release.set()
+    queue.close()
+    assert written_properties(queue) == [{"suggestion": "a"}, {"suggestion": "b"}]
+    assert queue.get_stats()["dropped"] == 1
+    assert not queue.add("Suggestion", {"suggestion": "d"})
+
+
+def test_write_behind_flushes_full_batches_without_waiting():
+    queue = RecordingQueue(batch_size=2, flush_interval=60)
+    for index in range(5):
+        queue.add("Cache", {"query": str(index)})
+    queue.close()
+
+    assert [len(batch) for batch in queue.batches] == [2, 2, 1]
+    assert queue.get_stats()["pending"] == 0
+
+
+def test_write_behind_discards_pending_writes_of_a_class():
+    queue = RecordingQueue(flush_interval=60)
+    queue.release.clear()
+    queue.add("Cache_MiniLM", {"query": "a"})
+    queue.add("Suggestion", {"suggestion": "a"})
+
+    assert queue.discard(["Cache_MiniLM"]) == 1
+    queue.release.set()
+    queue.close()
+    assert written_properties(queue) == [{"suggestion": "a"}]
+
+
+def test_write_behind_close_drains_pending_writes_and_stops_the_thread():
+    queue = RecordingQueue(flush_interval=60)
+    queue.release.clear()
+    for index in range(3):
+        queue.add("Suggestion", {"suggestion": str(index)})
+
+    queue.release.set()
+    queue.close()
+    assert len(written_properties(queue)) == 3
+    assert queue.get_stats()["pending"] == 0
+    assert not queue._thread.is_alive()
+
+
+class FakeBatch:
+    def __init__(self):
+        self.objects = []
+        self.created = []
+
+    def configure(self, **kwargs):
+        pass
+
+    def add_data_object(self, properties, class_name, uuid=None, vector=None):
+        self.objects.append(properties)
+
+    def create_objects(self):
+        self.created.append(self.objects)
+        self.objects = []
+        return []
+
+
+def test_write_behind_writes_through_its_own_client():
+    clients = []
+
+    def client_factory():
+        clients.append(SimpleNamespace(batch=FakeBatch()))
+        return clients[-1]
+
+    queue = WriteBehindQueue(client_factory, flush_interval=60)
+    queue.add("Suggestion", {"suggestion": "a"})
+    queue.add("Suggestion", {"suggestion": "b"})
+    queue.close()
+
+    assert len(clients) == 1
+    assert clients[0].batch.created == [[{"suggestion": "a"}, {"suggestion": "b"}]]
+    assert queue.get_stats()["written"] == 2
@@ -0,0 +1,325 @@
+import glob
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from wasabi import msg
+
+from goldenverba.components.chunking.batch import ChunkBatch
+from goldenverba.components.chunking.manager import ChunkerManager
+from goldenverba.components.reader.document import Document
+
+# Marks the end of the stream between two stages
+END_OF_STREAM = None
+
+# ChunkerManager of a chunking worker process, created on first use
+_worker_chunker_manager: ChunkerManager = None
+
+
+def _chunk_document(
+    chunker: str, document: Document, units: int, overlap: int
+) -> Document:
+    """Chunk a single document inside a worker process
+    @parameter: chunker : str - Name of the chunker
+    @parameter: document : Document - Verba document
+    @parameter: units : int - How many units per chunk
+    @parameter: overlap : int - How much overlap between the chunks
+    @returns Document - Document that contains the chunks.
+    """
+    global _worker_chunker_manager
+    if _worker_chunker_manager is None:
+        _worker_chunker_manager = ChunkerManager()
+
+    selected_chunker = _worker_chunker_manager.chunker[chunker]
+    chunked_docs = selected_chunker.chunk([document], units, overlap)
+    _worker_chunker_manager.check_chunks(chunked_docs)
+    chunked_docs[0].chunking = selected_chunker.get_chunking(units, overlap)
+    return chunked_docs[0]
+
+
+class ImportedDocument:
+    """Summary of a document the pipeline wrote, its text and chunks are dropped after writing."""
+
+    __slots__ = ("name", "type", "uuid", "chunk_count")
+
+    def __init__(self, name: str, type: str, uuid: str, chunk_count: int):
+        self.name = name
+        self.type = type
+        self.uuid = uuid
+        self.chunk_count = chunk_count
+
+
+class ImportPipeline:
+    """
+    Streaming import pipeline with bounded queues between the stages
+    reader -> existence filter -> chunker -> embedder -> Weaviate writer.
+    Chunking runs in a process pool, all other stages run in their own thread.
+    """
+
+    def __init__(
+        self,
+        manager,
+        queue_size: int = 16,
+        chunk_workers: int = None,
+        embed_batch_chunks: int = 256,
+    ):
+        self.manager = manager
+        self.queue_size = queue_size
+        self.chunk_workers = chunk_workers or os.cpu_count() or 1
+        self.embed_batch_chunks = embed_batch_chunks
+        self._stop = threading.Event()
+        self._errors: list[Exception] = []
+        self._written = False
+
+    def run(
+        self,
+        bytes: list[str],
+        contents: list[str],
+        paths: list[str],
+        fileNames: list[str],
+        document_type: str,
+        units: int,
+        overlap: int,
+    ) -> list[ImportedDocument]:
+        """Run all stages until every input is imported
+        @parameter: bytes : list[str] - List of bytes
+        @parameter: contents : list[str] - List of string content
+        @parameter: paths : list[str] - List of paths to files
+        @parameter: fileNames : list[str] - List of file names
+        @parameter: document_type : str - Document type
+        @parameter: units : int - How many units per chunk
+        @parameter: overlap : int - How much overlap between the chunks
+        @returns list[ImportedDocument] - Summaries of the imported documents.
+        """
+        read_queue = queue.Queue(self.queue_size)
+        chunk_queue = queue.Queue(self.queue_size)
+        embed_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+        imported_documents = []
+
+        stages = [
+            threading.Thread(
+                target=self._guard,
+                args=(
+                    self._read,
+                    bytes,
+                    contents,
+                    paths,
+                    fileNames,
+                    document_type,
+                    read_queue,
+                ),
+            ),
+            threading.Thread(
+                target=self._guard, args=(self._filter, read_queue, chunk_queue)
+            ),
+            threading.Thread(
+                target=self._guard,
+                args=(self._chunk, chunk_queue, embed_queue, units, overlap),
+            ),
+            threading.Thread(
+                target=self._guard, args=(self._embed, embed_queue, write_queue)
+            ),
+            threading.Thread(
+                target=self._guard, args=(self._write, write_queue, imported_documents)
+            ),
+        ]
+
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        # The local index is saved and the corpus version bumped once per run, also after partial imports
+        if self._written:
+            self.manager.embedder_manager.selected_embedder.finish_import(
+                self.manager.client
+            )
+
+        if self._errors:
+            raise Exception(f"Import pipeline failed: {self._errors[0]}")
+
+        msg.good(f"Import pipeline imported {len(imported_documents)} documents")
+        return imported_documents
+
+    def _guard(self, stage, *args):
+        try:
+            stage(*args)
+        except Exception as e:
+            msg.fail(f"Import pipeline stage {stage.__name__} failed: {str(e)}")
+            self._errors.append(e)
+            self._stop.set()
+
+    def _put(self, target: queue.Queue, item) -> None:
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return END_OF_STREAM
+
+    def _drain(self, source: queue.Queue, first: Document) -> tuple[list[Document], bool]:
+        """Collect documents that are already waiting, up to embed_batch_chunks chunks
+        @returns tuple[list[Document], bool] - Batch of documents and whether the stream ended.
+        """
+        batch = [first]
+        chunk_count = len(first.chunks)
+        while chunk_count < self.embed_batch_chunks:
+            try:
+                document = source.get_nowait()
+            except queue.Empty:
+                break
+            if document is END_OF_STREAM:
+                return batch, True
+            batch.append(document)
+            chunk_count += len(document.chunks)
+        return batch, False
+
+    def _read(
+        self,
+        bytes: list[str],
+        contents: list[str],
+        paths: list[str],
+        fileNames: list[str],
+        document_type: str,
+        target: queue.Queue,
+    ) -> None:
+        reader_manager = self.manager.reader_manager
+
+        # Load every input on its own so documents enter the pipeline one by one
+        inputs = []
+        for path in paths:
+            if path == "":
+                continue
+            if Path(path).is_dir():
+                for file_type in reader_manager.selected_reader.file_types:
+                    for file in glob.glob(f"{path}/**/*{file_type}", recursive=True):
+                        inputs.append(([], [], [file], []))
+            else:
+                inputs.append(([], [], [path], []))
+        if len(bytes) == len(fileNames):
+            for byte, fileName in zip(bytes, fileNames):
+                inputs.append(([byte], [], [], [fileName]))
+        if len(contents) == len(fileNames):
+            for content, fileName in zip(contents, fileNames):
+                inputs.append(([], [content], [], [fileName]))
+
+        try:
+            for _bytes, _contents, _paths, _fileNames in inputs:
+                if self._stop.is_set():
+                    return
+                for document in reader_manager.load(
+                    _bytes, _contents, _paths, _fileNames, document_type
+                ):
+                    self._put(target, document)
+        finally:
+            self._put(target, END_OF_STREAM)
+
+    def _filter(self, source: queue.Queue, target: queue.Queue) -> None:
+        try:
+            existing_documents = self.manager.get_existing_documents()
+            while (document := self._get(source)) is not END_OF_STREAM:
+                if not self.manager.check_if_document_exits(
+                    document, existing_documents
+                ):
+                    self._put(target, document)
+        finally:
+            self._put(target, END_OF_STREAM)
+
+    def _chunk(
+        self, source: queue.Queue, target: queue.Queue, units: int, overlap: int
+    ) -> None:
+        chunker_manager = self.manager.chunker_manager
+        chunker = next(
+            name
+            for name, component in chunker_manager.chunker.items()
+            if component is chunker_manager.selected_chunker
+        )
+
+        # Bounds the number of documents inside the process pool
+        max_in_flight = self.chunk_workers * 2
+        in_flight = set()
+        ended = False
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.chunk_workers) as executor:
+                while not self._stop.is_set() and (not ended or in_flight):
+                    accepting = not ended and len(in_flight) < max_in_flight
+                    if accepting:
+                        try:
+                            document = source.get(timeout=0.05 if in_flight else 0.5)
+                        except queue.Empty:
+                            pass
+                        else:
+                            if document is END_OF_STREAM:
+                                ended = True
+                            else:
+                                in_flight.add(
+                                    executor.submit(
+                                        _chunk_document, chunker, document, units, overlap
+                                    )
+                                )
+                            continue
+
+                    if in_flight:
+                        # Results are forwarded from this thread, a full queue never blocks the pool's result handling
+                        done, in_flight = wait(
+                            in_flight,
+                            timeout=0 if accepting else 0.5,
+                            return_when=FIRST_COMPLETED,
+                        )
+                        for future in done:
+                            self._put(target, future.result())
+        finally:
+            self._put(target, END_OF_STREAM)
+
+    def _embed(self, source: queue.Queue, target: queue.Queue) -> None:
+        embedder = self.manager.embedder_manager.selected_embedder
+        try:
+            ended = False
+            while not ended and (document := self._get(source)) is not END_OF_STREAM:
+                batch, ended = self._drain(source, document)
+                # Micro-batches travel to the writer as columnar chunk batches
+                self._put(
+                    target, embedder.vectorize_chunk_batch(ChunkBatch.from_documents(batch))
+                )
+        finally:
+            self._put(target, END_OF_STREAM)
+
+    def _write(
+        self, source: queue.Queue, imported_documents: list[ImportedDocument]
+    ) -> None:
+        embedder = self.manager.embedder_manager.selected_embedder
+        while (chunk_batch := self._get(source)) is not END_OF_STREAM:
+            self._written = True
+            if embedder.bulk_import:
+                imported = embedder.import_chunk_batch(
+                    chunk_batch, self.manager.client, finalize=False
+                )
+            else:
+                imported = embedder.import_data(
+                    chunk_batch.to_documents(), self.manager.client, finalize=False
+                )
+            if not imported:
+                raise Exception("Embedding failed")
+
+            # Only a summary is kept, the written documents are dropped with the batch
+            for document in chunk_batch.documents:
+                imported_documents.append(
+                    ImportedDocument(
+                        document.name,
+                        document.type,
+                        document.chunks[0].doc_uuid if document.chunks else "",
+                        len(document.chunks),
+                    )
+                )
@@ -126,6 +126,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+async def preload_reranker():
+    # The cross-encoder is loaded while the server starts instead of during the first query
+    manager.retriever_manager.preload_reranker()
+
+
+@app.on_event("shutdown")
+async def flush_write_behind():
+    # Write the queued suggestions and semantic cache entries before the process exits
+    if manager.write_behind is not None:
+        manager.write_behind.close()
+
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # Serve the assets (JS, CSS, images, etc.)
@@ -402,6 +416,7 @@ async def get_status():
         "libraries": manager.installed_libraries,
         "variables": manager.environment_variables,
         "schemas": manager.get_schemas(),
+        "caches": manager.get_cache_stats(),
     }
 
     return JSONResponse(content=data)
@@ -494,7 +509,7 @@ async def load_data(payload: LoadPayload):
                 )
 
             document_count = len(documents)
-            chunks_count = sum([len(document.chunks) for document in documents])
+            chunks_count = sum([document.chunk_count for document in documents])
 
             return JSONResponse(
                 content={
@@ -523,7 +538,7 @@ async def load_data(payload: LoadPayload):
 async def query(payload: QueryPayload):
     msg.good(f"Received query: {payload.query}")
     try:
-        chunks, context = manager.retrieve_chunks([payload.query])
+        chunks, context = await manager.aretrieve_chunks([payload.query])
 
         results = [
             {
@@ -732,8 +747,7 @@ async def delete_documents(payload: GetManyDocumentsPayload):
 
     msg.info(f"Document IDs received: {payload.document_ids}")
 
-    for document_id in payload.document_ids:
-        manager.delete_document_by_id(document_id)
+    manager.delete_documents_by_id(payload.document_ids)
     return JSONResponse(content={})
 
 
@@ -3,6 +3,11 @@ import uvicorn
 from dotenv import load_dotenv
 from wasabi import msg
 
+from goldenverba.components.embedding.cache_calibration import (
+    calibrate_threshold,
+    read_query_log,
+    replay_query_log,
+)
 from goldenverba.verba_manager import VerbaManager
 
 load_dotenv()
@@ -92,5 +97,57 @@ def reset():
     msg.warn("Verba Resetted")
 
 
+@cli.command()
+@click.option(
+    "--log",
+    required=True,
+    help='JSONL query log, one {"query": ..., "match": ...} object per line',
+)
+@click.option(
+    "--embedder",
+    default="ADAEmbedder",
+    help="Embedder",
+)
+@click.option(
+    "--precision",
+    default=0.95,
+    help="Target precision of semantic cache hits",
+)
+def calibrate(log, embedder, precision):
+    """
+    Pick the semantic cache distance threshold by replaying a query log.
+    """
+    manager = VerbaManager()
+    manager.embedder_set_embedder(embedder)
+    selected_embedder = manager.embedder_manager.selected_embedder
+
+    samples = replay_query_log(manager.client, selected_embedder, read_query_log(log))
+    result = calibrate_threshold(samples, precision)
+
+    msg.table(
+        [
+            (
+                f"{point['threshold']:.4f}",
+                f"{point['hit_rate']:.1%}",
+                f"{point['precision']:.1%}",
+            )
+            for point in result["curve"]
+        ],
+        header=("Threshold", "Hit rate", "Precision"),
+    )
+    if result["threshold"] is None:
+        msg.warn(
+            f"No threshold reaches a precision of {precision:.1%} on {result['queries']} queries"
+        )
+        return
+
+    msg.good(
+        f"Threshold {result['threshold']:.4f} answers {result['hit_rate']:.1%} of {result['queries']} queries from the cache with {result['precision']:.1%} precision"
+    )
+    msg.info(
+        f"Set VERBA_SEMANTIC_CACHE_DISTANCE_{selected_embedder.name.upper()}={result['threshold']:.4f}"
+    )
+
+
 if __name__ == "__main__":
     cli()
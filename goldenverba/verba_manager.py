@@ -1,5 +1,10 @@
+import asyncio
 import os
 import ssl
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import weaviate
@@ -9,11 +14,11 @@ from weaviate import Client
 from weaviate.embedded import EmbeddedOptions
 
 import goldenverba.components.schema.schema_generation as schema_manager
-from goldenverba.components.chunking.chunk import Chunk
+from goldenverba.components.chunking.chunk import Chunk, content_hash
 from goldenverba.components.chunking.interface import Chunker
 from goldenverba.components.chunking.manager import ChunkerManager
 from goldenverba.components.component import VerbaComponent
-from goldenverba.components.embedding.interface import Embedder
+from goldenverba.components.embedding.interface import Embedder, log_batch_errors
 from goldenverba.components.embedding.manager import EmbeddingManager
 from goldenverba.components.generation.interface import Generator
 from goldenverba.components.generation.manager import GeneratorManager
@@ -22,6 +27,8 @@ from goldenverba.components.reader.interface import Reader
 from goldenverba.components.reader.manager import ReaderManager
 from goldenverba.components.retriever.interface import Retriever
 from goldenverba.components.retriever.manager import RetrieverManager
+from goldenverba.import_pipeline import ImportedDocument, ImportPipeline
+from goldenverba.write_behind import WriteBehindQueue
 
 load_dotenv()
 
@@ -39,6 +46,36 @@ class VerbaManager:
         self.installed_libraries = {}
         self.weaviate_type = ""
         self.client = self.setup_client()
+        # Stream imports through the staged ImportPipeline instead of loading everything at once
+        self.import_pipeline = os.getenv("VERBA_IMPORT_PIPELINE", "False") == "True"
+        # Bounded pool for the blocking Weaviate requests and query inference of async retrieval
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("VERBA_RETRIEVAL_WORKERS", "8")),
+            thread_name_prefix="verba-retrieval",
+        )
+        # Update existing documents chunk by chunk instead of skipping them
+        self.incremental_import = (
+            os.getenv("VERBA_INCREMENTAL_IMPORT", "False") == "True"
+        )
+        # Cited documents and corpus version of recently retrieved contexts by context hash,
+        # /api/generate only receives the context string back from the frontend
+        self.context_sources: OrderedDict[str, tuple[list[str], int]] = OrderedDict()
+        self.context_sources_size = int(os.getenv("VERBA_CONTEXT_SOURCES_SIZE", "1024"))
+        self.context_sources_lock = threading.Lock()
+        # Suggestions and semantic cache entries are written in the background after the answer
+        self.write_behind = None
+        if os.getenv("VERBA_WRITE_BEHIND", "True") == "True":
+            self.write_behind = WriteBehindQueue(
+                self.setup_client,
+                max_pending=int(os.getenv("VERBA_WRITE_BEHIND_MAX_PENDING", "10000")),
+                batch_size=int(os.getenv("VERBA_WRITE_BEHIND_BATCH_SIZE", "100")),
+                flush_interval=float(os.getenv("VERBA_WRITE_BEHIND_INTERVAL", "2.0")),
+            )
+            for embedder in self.embedder_manager.embedders.values():
+                embedder.write_behind = self.write_behind
+        for embedder in self.embedder_manager.embedders.values():
+            # Eviction sweeps run in the background and write through a client of their own
+            embedder.cache_evictor.client_factory = self.setup_client
 
         self.verify_installed_libraries()
         self.verify_variables()
@@ -59,29 +96,102 @@ class VerbaManager:
         document_type: str,
         units: int = 100,
         overlap: int = 50,
-    ) -> list[Document]:
+        incremental: bool | None = None,
+    ) -> list[Document] | list[ImportedDocument]:
+        if incremental is None:
+            incremental = self.incremental_import
+
+        if self.import_pipeline and not incremental:
+            pipeline = ImportPipeline(
+                self,
+                queue_size=int(os.getenv("VERBA_PIPELINE_QUEUE_SIZE", "16")),
+                chunk_workers=int(os.getenv("VERBA_PIPELINE_CHUNK_WORKERS", "0")),
+            )
+            return pipeline.run(
+                bytes, contents, paths, fileNames, document_type, units, overlap
+            )
+
         loaded_documents = self.reader_manager.load(
             bytes, contents, paths, fileNames, document_type
         )
 
         filtered_documents = []
+        changed_documents = []
 
-        # Check if document names exist in DB
+        # Check if document names exist in DB, fetched once for the whole import
+        existing_documents = self.get_existing_documents()
         for document in loaded_documents:
-            if not self.check_if_document_exits(document):
+            if incremental and document.name in existing_documents:
+                changed_documents.append(document)
+            elif not self.check_if_document_exits(document, existing_documents):
                 filtered_documents.append(document)
 
-        modified_documents = self.chunker_manager.chunk(
-            filtered_documents, units, overlap
-        )
+        # Existing documents are diffed against their stored chunks instead of being skipped
+        updated_documents = []
+        if len(changed_documents) > 0:
+            for document in self.chunker_manager.chunk(
+                changed_documents, units, overlap
+            ):
+                self.embedder_manager.selected_embedder.update_document(
+                    self.client, document, existing_documents[document.name]
+                )
+                updated_documents.append(document)
 
-        if self.embedder_manager.embed(modified_documents, client=self.client):
+        if self.embedder_manager.selected_embedder.bulk_import:
+            # Bulk imports hand the chunks from stage to stage as one columnar batch
+            chunk_batch = self.chunker_manager.chunk_batch(
+                filtered_documents, units, overlap
+            )
+            embedded = self.embedder_manager.embed_batch(chunk_batch, self.client)
+            modified_documents = chunk_batch.to_documents()
+        else:
+            modified_documents = self.chunker_manager.chunk(
+                filtered_documents, units, overlap
+            )
+            embedded = self.embedder_manager.embed(
+                modified_documents, client=self.client
+            )
+
+        if embedded:
             msg.good("Embedding successful")
-            return modified_documents
+            return modified_documents + updated_documents
         else:
             msg.fail("Embedding failed")
             return []
 
+    def update_document(
+        self,
+        doc_uuid: str,
+        document: Document,
+        units: int | None = None,
+        overlap: int | None = None,
+    ) -> dict:
+        """Chunk a new version of a stored document and update only its changed chunks
+        @parameter doc_uuid : str - UUID of the stored document
+        @parameter document : Document - New version of the document
+        @parameter units : int | None - How many units per chunk, None reuses the stored chunking
+        @parameter overlap : int | None - How much overlap between the chunks, None reuses the stored chunking
+        @returns dict - Number of inserted, patched, deleted and unchanged chunks.
+        """
+        if units is None or overlap is None:
+            # Rechunking with other parameters than the import would replace every chunk
+            stored_document = self.client.data_object.get_by_id(
+                doc_uuid,
+                class_name=self.embedder_manager.selected_embedder.get_document_class(),
+            )
+            stored_units, stored_overlap = Chunker.parse_chunking(
+                stored_document["properties"].get("chunking")
+                if stored_document is not None
+                else None
+            ) or (100, 50)
+            units = stored_units if units is None else units
+            overlap = stored_overlap if overlap is None else overlap
+
+        chunked_documents = self.chunker_manager.chunk([document], units, overlap)
+        return self.embedder_manager.selected_embedder.update_document(
+            self.client, chunked_documents[0], doc_uuid
+        )
+
     def reader_set_reader(self, reader: str) -> bool:
         available, message = self.check_verba_component(
             self.reader_manager.readers[reader]
@@ -235,14 +345,7 @@ class VerbaManager:
             msg.good("Connected to Weaviate")
 
             # Batch Configuration
-            def batch_callback(logs: dict):
-                if logs is not None:
-                    for result in logs:
-                        if "result" in result and "errors" in result["result"]:
-                            if "error" in result["result"]["errors"]:
-                                msg.fail(result["result"])
-
-            client.batch.configure(callback=batch_callback)
+            client.batch.configure(callback=log_batch_errors)
 
         else:
             msg.fail("Connection to Weaviate failed")
@@ -407,6 +510,15 @@ class VerbaManager:
 
         
 
+    def get_cache_stats(self) -> dict:
+        """
+        @returns dict - Statistics of the caches of the selected embedder and reranker.
+        """
+        return {
+            **self.embedder_manager.selected_embedder.get_cache_stats(),
+            "reranker": self.retriever_manager.get_cache_stats(),
+        }
+
     def get_schemas(self) -> dict:
         """
         @returns dict - A dictionary with the schema names and their object count.
@@ -449,7 +561,8 @@ class VerbaManager:
         suggestions = []
 
         for result in results:
-            suggestions.append(result["suggestion"])
+            if result["suggestion"] not in suggestions:
+                suggestions.append(result["suggestion"])
 
         return suggestions
 
@@ -461,6 +574,12 @@ class VerbaManager:
         production_key = os.environ.get("VERBA_PRODUCTION", "")
         if production_key == "True":
             return
+
+        if self.write_behind is not None:
+            # The UUID is derived from the query, writing it again overwrites the existing suggestion
+            self.write_behind.add("Suggestion", {"suggestion": query}, key=query)
+            return
+
         check_results = (
             self.client.query.get(
                 class_name="Suggestion",
@@ -494,14 +613,76 @@ class VerbaManager:
         msg.info("Added query to suggestions")
 
     def retrieve_chunks(self, queries: list[str]) -> list[Chunk]:
+        corpus_version = self.embedder_manager.selected_embedder.get_corpus_version(
+            self.client
+        )
         chunks, context = self.retriever_manager.retrieve(
             queries,
             self.client,
             self.embedder_manager.selected_embedder,
             self.generator_manager.selected_generator,
         )
+        self.set_context_sources(context, chunks, corpus_version)
         return chunks, context
 
+    async def aretrieve_chunks(self, queries: list[str]) -> list[Chunk]:
+        """Retrieve chunks on the retrieval thread pool, concurrent queries overlap instead of blocking the event loop
+        @parameter queries : list[str] - List of queries
+        @returns tuple(list[Chunk],str) - List of retrieved chunks and the context string.
+        """
+        # The corpus version is read before the chunks and off the event loop, it can be a Weaviate request
+        corpus_version = await asyncio.get_running_loop().run_in_executor(
+            self.retrieval_executor,
+            self.embedder_manager.selected_embedder.get_corpus_version,
+            self.client,
+        )
+        chunks, context = await self.retriever_manager.aretrieve(
+            queries,
+            self.client,
+            self.embedder_manager.selected_embedder,
+            self.generator_manager.selected_generator,
+            self.retrieval_executor,
+        )
+        self.set_context_sources(context, chunks, corpus_version)
+        return chunks, context
+
+    def set_context_sources(
+        self, context: str, chunks: list[Chunk], corpus_version: int
+    ) -> None:
+        """Remember which documents a context was built from, stamped on the semantic cache entry of its answer
+        @parameter context : str - Context string
+        @parameter chunks : list[Chunk] - Chunks of the context
+        @parameter corpus_version : int - Corpus version before the chunks were retrieved.
+        """
+        if self.context_sources_size < 1:
+            return
+
+        key = content_hash(context)
+        doc_uuids = sorted({chunk.doc_uuid for chunk in chunks})
+        with self.context_sources_lock:
+            self.context_sources[key] = (doc_uuids, corpus_version)
+            self.context_sources.move_to_end(key)
+            while len(self.context_sources) > self.context_sources_size:
+                self.context_sources.popitem(last=False)
+
+    def get_context_sources(
+        self, contexts: list[str]
+    ) -> tuple[list[str], int | None]:
+        """
+        @parameter contexts : list[str] - Context strings of a generation
+        @returns tuple[list[str], int | None] - Cited documents and the oldest corpus version, None if a context is unknown.
+        """
+        doc_uuids = set()
+        corpus_versions = []
+        with self.context_sources_lock:
+            for context in contexts:
+                sources = self.context_sources.get(content_hash(context))
+                if sources is None:
+                    return sorted(doc_uuids), None
+                doc_uuids.update(sources[0])
+                corpus_versions.append(sources[1])
+        return sorted(doc_uuids), min(corpus_versions, default=None)
+
     def retrieve_all_documents(self, doc_type: str, limit: int = 10000) -> list:
         """Return all documents from Weaviate
         @param limit: a limit on the number of records that will be returned. Set the value to 0 to disable limitation
@@ -596,11 +777,22 @@ class VerbaManager:
             }
 
         else:
+            start = time.monotonic()
             full_text = await self.generator_manager.selected_generator.generate(
                 queries, contexts, conversation
             )
+            # The generation time is what a cache hit saves
+            self.embedder_manager.selected_embedder.semantic_cache_metrics.record_generation(
+                time.monotonic() - start
+            )
+            doc_uuids, corpus_version = self.get_context_sources(contexts)
             self.embedder_manager.selected_embedder.add_to_semantic_cache(
-                self.client, semantic_query, full_text
+                self.client,
+                semantic_query,
+                full_text,
+                self.write_behind,
+                doc_uuids,
+                corpus_version,
             )
             self.set_suggestions(" ".join(queries))
             return full_text
@@ -627,19 +819,36 @@ class VerbaManager:
             }
 
         else:
+            start = time.monotonic()
             full_text = ""
             async for result in self.generator_manager.selected_generator.generate_stream(
                 queries, contexts, conversation
             ):
                 full_text += result["message"]
                 yield result
+            self.embedder_manager.selected_embedder.semantic_cache_metrics.record_generation(
+                time.monotonic() - start
+            )
             self.set_suggestions(" ".join(queries))
+            doc_uuids, corpus_version = self.get_context_sources(contexts)
             self.embedder_manager.selected_embedder.add_to_semantic_cache(
-                self.client, semantic_query, full_text
+                self.client,
+                semantic_query,
+                full_text,
+                self.write_behind,
+                doc_uuids,
+                corpus_version,
             )
 
     def reset(self):
+        if self.write_behind is not None:
+            self.write_behind.discard()
         self.client.schema.delete_class("Suggestion")
+        for embedder in self.embedder_manager.embedders.values():
+            embedder.chunk_cache.clear()
+            embedder.semantic_cache.clear()
+            embedder.cache_evictor.clear()
+            embedder.clear_local_index()
         # Check if all schemas exist for all possible vectorizers
         for vectorizer in schema_manager.VECTORIZERS:
             schema_manager.reset_schemas(self.client, vectorizer)
@@ -654,6 +863,16 @@ class VerbaManager:
             schema_manager.init_schemas(self.client, embedding, False, True)
 
     def reset_cache(self):
+        if self.write_behind is not None:
+            self.write_behind.discard(
+                [
+                    "Cache_" + schema_manager.strip_non_letters(name)
+                    for name in schema_manager.VECTORIZERS | schema_manager.EMBEDDINGS
+                ]
+            )
+        for embedder in self.embedder_manager.embedders.values():
+            embedder.semantic_cache.clear()
+            embedder.cache_evictor.clear()
         # Check if all schemas exist for all possible vectorizers
         for vectorizer in schema_manager.VECTORIZERS:
             class_name = "Cache_" + schema_manager.strip_non_letters(vectorizer)
@@ -666,14 +885,55 @@ class VerbaManager:
             schema_manager.init_schemas(self.client, embedding, False, True)
 
     def reset_suggestion(self):
+        if self.write_behind is not None:
+            self.write_behind.discard(["Suggestion"])
         self.client.schema.delete_class("Suggestion")
         schema_manager.init_suggestion(self.client, "", False, True)
 
-    def check_if_document_exits(self, document: Document) -> bool:
+    def get_existing_documents(self, page_size: int = 10000) -> dict[str, str]:
+        """Return the names of all documents of the selected embedder, paged with a cursor
+        @parameter page_size : int - Number of documents per request
+        @returns dict[str, str] - Doc names in the cluster mapped to their UUID.
+        """
+        class_name = "Document_" + schema_manager.strip_non_letters(
+            self.embedder_manager.selected_embedder.vectorizer
+        )
+
+        existing_documents = {}
+        cursor = None
+        while True:
+            query = (
+                self.client.query.get(class_name=class_name, properties=["doc_name"])
+                .with_additional(["id"])
+                .with_limit(page_size)
+            )
+            if cursor is not None:
+                query = query.with_after(cursor)
+
+            next_batch = query.do()["data"]["Get"][class_name]
+            if not next_batch:
+                break
+
+            for document in next_batch:
+                existing_documents[document["doc_name"]] = document["_additional"]["id"]
+            cursor = next_batch[-1]["_additional"]["id"]
+
+        return existing_documents
+
+    def check_if_document_exits(
+        self, document: Document, existing_documents: dict[str, str] | None = None
+    ) -> bool:
         """Return a document by it's ID (UUID format) from Weaviate
         @parameter document : Document - Document object
+        @parameter existing_documents : dict[str, str] | None - Doc names from get_existing_documents, skips the query if given
         @returns bool - Whether the doc name exist in the cluster.
         """
+        if existing_documents is not None:
+            if document.name in existing_documents:
+                msg.warn(f"{document.name} already exists")
+                return True
+            return False
+
         class_name = "Document_" + schema_manager.strip_non_letters(
             self.embedder_manager.selected_embedder.vectorizer
         )
@@ -724,6 +984,11 @@ class VerbaManager:
             self.client, doc_id
         )
 
+    def delete_documents_by_id(self, doc_ids: list[str]) -> None:
+        self.embedder_manager.selected_embedder.remove_documents_by_id(
+            self.client, doc_ids
+        )
+
     def search_documents(self, query: str, doc_type: str) -> list:
         return self.embedder_manager.selected_embedder.search_documents(
             self.client, query, doc_type
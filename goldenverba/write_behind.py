@@ -0,0 +1,172 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+from wasabi import msg
+from weaviate import Client
+from weaviate.util import generate_uuid5
+
+from goldenverba.components.embedding.interface import log_batch_errors
+
+
+class WriteBehindQueue:
+    """
+    Bounded write-behind queue for Weaviate objects that are not needed to answer the current request,
+    like suggestions and semantic cache entries. A background thread writes them in bulk batches.
+    Every object gets a deterministic UUID from its key, so repeated writes coalesce in the queue
+    and overwrite the stored object instead of creating duplicates.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Client],
+        max_pending: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+    ):
+        # client.batch is shared with imports and is not thread-safe, the worker connects its own client
+        self.client_factory = client_factory
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self._pending: OrderedDict[
+            str, tuple[str, dict, list[float] | None]
+        ] = OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread: threading.Thread = None
+        self._client: Client = None
+
+    def add(
+        self,
+        class_name: str,
+        properties: dict,
+        vector: list[float] | None = None,
+        key: str | None = None,
+    ) -> bool:
+        """Queue an object without waiting for Weaviate, a pending object with the same key is replaced
+        @parameter: class_name : str - Weaviate class of the object
+        @parameter: properties : dict - Properties of the object
+        @parameter: vector : list[float] | None - Vector of the object, None lets Weaviate vectorize it
+        @parameter: key : str | None - Identity of the object, defaults to its properties
+        @returns bool - False if the object was dropped because the queue is full or closed.
+        """
+        uuid = generate_uuid5(properties if key is None else key, class_name)
+        with self._condition:
+            if self._closed:
+                self.dropped += 1
+                return False
+
+            if uuid in self._pending:
+                self.coalesced += 1
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+
+            self._pending[uuid] = (class_name, properties, vector)
+            self._pending.move_to_end(uuid)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="verba-write-behind", daemon=True
+                )
+                self._thread.start()
+            elif len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def discard(
+        self, class_names: list[str] = None, doc_uuids: list[str] = None
+    ) -> int:
+        """Drop pending objects, used before their classes are deleted or the documents they cite change
+        @parameter: class_names : list[str] - Classes to drop, None drops all pending objects
+        @parameter: doc_uuids : list[str] - Only drop objects whose doc_uuids property cites one of these documents
+        @returns int - Number of dropped objects.
+        """
+        cited = set(doc_uuids) if doc_uuids is not None else None
+        with self._condition:
+            uuids = [
+                uuid
+                for uuid, (class_name, properties, _) in self._pending.items()
+                if (class_names is None or class_name in class_names)
+                and (cited is None or cited & set(properties.get("doc_uuids") or []))
+            ]
+            for uuid in uuids:
+                del self._pending[uuid]
+            return len(uuids)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write all pending objects and stop the background thread
+        @parameter: timeout : float - Seconds to wait for the pending objects to be written.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                with self._condition:
+                    lost = len(self._pending)
+                msg.warn(
+                    f"Write-behind queue did not flush within {timeout}s, {lost} objects are lost"
+                )
+
+    def get_stats(self) -> dict:
+        """
+        @returns dict - Written, coalesced, dropped and failed objects and the number of pending objects.
+        """
+        with self._condition:
+            return {
+                "written": self.written,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                items = []
+                while self._pending and len(items) < self.batch_size:
+                    items.append(self._pending.popitem(last=False))
+                closed = self._closed
+
+            if items:
+                try:
+                    failed = self._write(items)
+                except Exception as e:
+                    msg.warn(f"Write-behind batch of {len(items)} objects failed: {str(e)}")
+                    # A failed request leaves its objects in the batch
+                    if self._client is not None:
+                        self._client.batch.empty_objects()
+                    failed = len(items)
+                with self._condition:
+                    self.written += len(items) - failed
+                    self.failed += failed
+            elif closed:
+                return
+
+    def _write(self, items: list[tuple[str, tuple[str, dict, list[float] | None]]]) -> int:
+        """Write a batch of objects to Weaviate
+        @parameter: items : list[tuple[str, tuple]] - (uuid, (class name, properties, vector)) per object
+        @returns int - Number of objects Weaviate failed to write.
+        """
+        if self._client is None:
+            self._client = self.client_factory()
+            self._client.batch.configure(batch_size=None, dynamic=False)
+
+        for uuid, (class_name, properties, vector) in items:
+            self._client.batch.add_data_object(
+                properties, class_name, uuid=uuid, vector=vector
+            )
+        return len(log_batch_errors(self._client.batch.create_objects()))